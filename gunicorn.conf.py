@@ -0,0 +1,9 @@
+"""gunicorn settings shared by Procfile, Dockerfile and render.yaml (read from the working directory)."""
+import os
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the Prometheus multiprocess directory
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,73 @@
+"""Merge bookmarks into user_bookmarks and recount organizations.bookmark_count
+
+Revision ID: f2a6c8e1d945
+Revises: e5b9c3d7a412
+Create Date: 2026-10-19 18:24:37.118264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6c8e1d945'
+down_revision = 'e5b9c3d7a412'
+branch_labels = None
+depends_on = None
+
+organizations = sa.table(
+    'organizations',
+    sa.column('id', sa.Integer),
+    sa.column('bookmark_count', sa.Integer),
+)
+user_bookmarks = sa.table(
+    'user_bookmarks',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('organization_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+bookmarks = sa.table(
+    'bookmarks',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('organization_id', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade():
+    # Copy bookmarks only present in the legacy table, one per (user, organization)
+    already = sa.select(user_bookmarks.c.id).where(
+        user_bookmarks.c.user_id == bookmarks.c.user_id,
+        user_bookmarks.c.organization_id == bookmarks.c.organization_id)
+    legacy = sa.select(bookmarks.c.user_id, bookmarks.c.organization_id, sa.func.min(bookmarks.c.created_at)) \
+        .where(~sa.exists(already)) \
+        .group_by(bookmarks.c.user_id, bookmarks.c.organization_id)
+    op.execute(user_bookmarks.insert().from_select(['user_id', 'organization_id', 'created_at'], legacy))
+    op.drop_table('bookmarks')
+
+    with op.batch_alter_table('user_bookmarks', schema=None) as batch_op:
+        batch_op.create_index('ix_user_bookmarks_organization_id', ['organization_id'], unique=False)
+
+    op.execute(organizations.update().values(bookmark_count=sa.select(sa.func.count(user_bookmarks.c.id))
+                                             .where(user_bookmarks.c.organization_id == organizations.c.id)
+                                             .scalar_subquery()))
+
+
+def downgrade():
+    with op.batch_alter_table('user_bookmarks', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_bookmarks_organization_id')
+
+    op.create_table('bookmarks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(bookmarks.insert().from_select(
+        ['user_id', 'organization_id', 'created_at'],
+        sa.select(user_bookmarks.c.user_id, user_bookmarks.c.organization_id, user_bookmarks.c.created_at)))
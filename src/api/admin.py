@@ -1,6 +1,5 @@
 
 import os
-from datetime import datetime, timedelta
 from flask import redirect, url_for, request, flash, Response
 from flask_login import current_user
 from markupsafe import Markup
@@ -10,7 +9,9 @@ from flask_admin.form import Select2Widget
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from wtforms import SelectField, PasswordField, StringField
 from wtforms.validators import Optional
+from .dashboard_metrics import get_dashboard_metrics, get_admin_notification_count
 from .models import (db, User, Organization, Category, Location, UserBookmark, SearchHistory, OrganizationPhoto, OrganizationSocialLink, ContactMessage, Notification, AuditLog, Advertisement)
+from .org_cache import invalidate_organization
 
 
 class SecureModelView(ModelView):
@@ -94,6 +95,7 @@ class OrganizationAdminView(SecureModelView):
         old_status = org.status
         org.status = 'approved'
         db.session.commit()
+        invalidate_organization(id)
 
         # Send approval notification
         if old_status != 'approved':
@@ -112,6 +114,7 @@ class OrganizationAdminView(SecureModelView):
         old_status = org.status
         org.status = 'rejected'
         db.session.commit()
+        invalidate_organization(id)
 
         # Send rejection notification
         if old_status != 'rejected':
@@ -180,191 +183,41 @@ class CustomAdminIndexView(AdminIndexView):
 
     @expose('/')
     def index(self):
-        # Get current date and time ranges for analytics
-        now = datetime.utcnow()
-        today = now.date()
-        yesterday = today - timedelta(days=1)
-        week_ago = now - timedelta(days=7)
-
-        # Core statistics for template context
-        context = {
-            # User statistics
-            'total_users': User.query.count(),
-            'visitor_count': User.query.filter_by(role='visitor').count(),
-            'org_admin_count': User.query.filter_by(role='org_admin').count(),
-            'new_users_today': User.query.filter(User.created_at >= today).count(),
-            'new_users': User.query.filter(User.created_at >= today).count(),  # For notification
-
-            # Organization statistics
-            'total_orgs': Organization.query.count(),
-            'pending_orgs': Organization.query.filter_by(status='pending').count(),
-            'approved_orgs': Organization.query.filter_by(status='approved').count(),
-            'rejected_orgs': Organization.query.filter_by(status='rejected').count(),
-
-            # Content statistics
-            'total_categories': Category.query.count(),
-            'total_locations': Location.query.count(),
-            'total_notifications': Notification.query.count(),
-
-            # System statistics
-            'recent_logs': AuditLog.query.filter(AuditLog.timestamp >= week_ago).count(),
-            'total_ads': Advertisement.query.count(),
-            'active_ads': Advertisement.query.filter_by(is_active=True).count(),
+        # All counters come from one cached snapshot of a few aggregate queries
+        metrics = get_dashboard_metrics()
+
+        context = dict(metrics)
+        context.update({
+            'new_users': metrics['new_users_today'],  # For notification
 
             # Metrics for dashboard
-            'unread_messages': ContactMessage.query.filter_by(is_read=False).count(),
             'flagged_content': 0,  # Can implement later
             'system_health': 95,   # Can implement real health check
             'ad_revenue': 0,       # Can implement revenue tracking
 
             # Notification count for navbar
-            'notification_count': (
-                Organization.query.filter_by(status='pending').count() +
-                ContactMessage.query.filter_by(is_read=False).count() +
-                User.query.filter(User.created_at >= today).count()
-            ),
+            'notification_count': get_admin_notification_count(),
 
             # Recent activities (sample implementation)
             'recent_activities': [
                 {
                     'icon': 'user-plus',
-                    'message': f'{User.query.filter(User.created_at >= today).count()} new users registered today',
+                    'message': f'{metrics["new_users_today"]} new users registered today',
                     'time_ago': 'Today'
                 },
                 {
                     'icon': 'building',
-                    'message': f'{Organization.query.filter_by(status="pending").count()} organizations pending approval',
+                    'message': f'{metrics["pending_orgs"]} organizations pending approval',
                     'time_ago': 'Now'
                 },
                 {
                     'icon': 'envelope',
-                    'message': f'{ContactMessage.query.filter_by(is_read=False).count()} unread messages',
+                    'message': f'{metrics["unread_messages"]} unread messages',
                     'time_ago': 'Recent'
                 }
             ]
-        }
-
-        # Build embedded dashboard HTML with enhanced metrics
-        total_pageviews = db.session.query(db.func.sum(Organization.view_count)).scalar() or 0
-        approval_rate = (context['approved_orgs'] / context['total_orgs'] * 100) if context['total_orgs'] > 0 else 0
-
-        # Derived metrics
-        total_pageviews = db.session.query(db.func.sum(Organization.view_count)).scalar() or 0
-        approval_rate = (context['approved_orgs'] / context['total_orgs'] * 100) if context['total_orgs'] > 0 else 0
-        context['total_pageviews'] = total_pageviews
-        context['approval_rate'] = round(approval_rate, 1)
-
-        dashboard_html = f"""
-        <style>
-        .alert .close {{ display: none !important; }}
-        .alert {{ margin-bottom: 0; }}
-        .clickable-panel {{ cursor: pointer; transition: all 0.3s; }}
-        .clickable-panel:hover {{ transform: translateY(-2px); box-shadow: 0 4px 8px rgba(0,0,0,0.2); }}
-        .notification-dot {{
-            display: inline-block;
-            width: 8px;
-            height: 8px;
-            background-color: #dc3545;
-            border-radius: 50%;
-            margin-left: 5px;
-            animation: pulse 2s infinite;
-        }}
-        @keyframes pulse {{ 0% {{ opacity: 1; }} 50% {{ opacity: 0.5; }} 100% {{ opacity: 1; }} }}
-        </style>
-        <div class="row" style="margin: 20px 0;">
-            <div class="col-md-12">
-                <div class="panel panel-primary">
-                    <div class="panel-heading">
-                        <h3 class="panel-title">🏥 Charity Directory Smart Dashboard - Real-time Analytics</h3>
-                    </div>
-                    <div class="panel-body">
-                        <!-- Alerts for immediate action -->
-                        {f'<div class="alert alert-warning"><strong><span class="notification-dot"></span> {context["pending_orgs"]} organizations need review!</strong> <a href="/admin/organization/?flt1_0=pending" class="btn btn-sm btn-warning">Review Now</a></div>' if context["pending_orgs"] > 0 else ''}
-                        {f'<div class="alert alert-info"><strong>{context["unread_messages"]} unread messages</strong> <a href="/admin/contactmessage/" class="btn btn-sm btn-info">View Messages</a></div>' if context["unread_messages"] > 0 else ''}
-
-                        <!-- Core Metrics Row -->
-                        <div class="row">
-                            <div class="col-md-3">
-                               <div class="panel panel-info clickable-panel" style="height: 140px;" onclick="window.location.href='/admin/user/'">
-                                    <div class="panel-body text-center">
-                                        <h2 class="text-primary">{context['total_users']}</h2>
-                                        <p><strong>👥 Total Users</strong></p>
-                                        {'<span class="label label-success">+' + str(context['new_users_today']) + ' today</span>' if context['new_users_today'] > 0 else '<span class="label label-default">No new users today</span>'}
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-3">
-                                <div class="panel panel-info clickable-panel" style="height: 140px;" onclick="window.location.href='/admin/organization/'">
-                                    <div class="panel-body text-center">
-                                        <h2 class="text-info">{context['total_orgs']}</h2>
-                                        <p><strong>🏢 Organizations</strong></p>
-                                        <span class="label label-{'warning' if context['pending_orgs'] > 0 else 'success'}">{context['pending_orgs']} pending</span>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-3">
-                                <div class="panel panel-info clickable-panel" style="height: 140px;" onclick="window.location.href='/admin/searchhistory/'">
-                                    <div class="panel-body text-center">
-                                        <h2 class="text-success">{total_pageviews:,}</h2>
-                                        <p><strong>👁️ Total Views</strong></p>
-                                        <span class="label label-info">Platform engagement</span>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-3">
-                               <div class="panel panel-info clickable-panel" style="height: 140px;" onclick="window.location.href='/admin/organization/?flt1_0=approved'">
-                                    <div class="panel-body text-center">
-                                        <h2 class="text-warning">{approval_rate:.1f}%</h2>
-                                        <p><strong>✅ Approval Rate</strong></p>
-                                        <span class="label label-{'success' if approval_rate >= 80 else 'warning' if approval_rate >= 60 else 'danger'}">Quality metric</span>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-
-                        <!-- Smart Navigation Row -->
-                        <div class="row">
-                            <div class="col-md-4">
-                                <div class="panel panel-success">
-                                    <div class="panel-heading"><strong>� Quick Navigation</strong></div>
-                                    <div class="panel-body">
-                                        <p><a href="/admin/organization/?flt1_0=pending" class="btn btn-warning btn-xs">⏳ Pending Orgs ({context['pending_orgs']})</a></p>
-                                        <p><a href="/admin/user/?flt1_1=visitor" class="btn btn-info btn-xs">👤 Visitors ({context['visitor_count']})</a></p>
-                                        <p><a href="/admin/contactmessage/" class="btn btn-primary btn-xs">📧 Messages ({context['unread_messages']})</a></p>
-                                        <p><a href="/admin/auditlog/" class="btn btn-default btn-xs">📋 Recent Logs ({context['recent_logs']})</a></p>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-4">
-                                <div class="panel panel-info">
-                                    <div class="panel-heading"><strong>🎯 Content Management</strong></div>
-                                    <div class="panel-body">
-                                        <p><a href="/admin/category/" class="btn btn-success btn-xs">🏷️ Categories ({context['total_categories']})</a></p>
-                                        <p><a href="/admin/location/" class="btn btn-info btn-xs">📍 Locations ({context['total_locations']})</a></p>
-                                        <p><a href="/admin/organizationphoto/" class="btn btn-primary btn-xs">📸 Photos</a></p>
-                                        <p><a href="/admin/organizationsociallink/" class="btn btn-warning btn-xs">🔗 Social Links</a></p>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-4">
-                                <div class="panel panel-warning">
-                                    <div class="panel-heading"><strong>💰 Business Intelligence</strong></div>
-                                    <div class="panel-body">
-                                        <p><a href="/admin/advertisement/" class="btn btn-success btn-xs">📺 Ads ({context['active_ads']} active)</a></p>
-                                        <p><a href="/api/docs" target="_blank" class="btn btn-info btn-xs">📖 API Documentation</a></p>
-                                        <p><a href="/sitemap" target="_blank" class="btn btn-default btn-xs">🗺️ System Sitemap</a></p>
-                                        <p><a href="/" target="_blank" class="btn btn-primary btn-xs">🌐 View Frontend</a></p>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        """
-
-        # Use the custom template instead of embedded HTML
+        })
+
         return self.render('admin/custom_index.html', **context)
 
 def setup_admin(app):
@@ -404,12 +257,6 @@ def setup_admin(app):
         if not current_user.is_authenticated or not current_user.is_admin():
             return {'count': 0}
 
-        pending_orgs = Organization.query.filter_by(status='pending').count()
-        unread_messages = ContactMessage.query.filter_by(is_read=False).count()
-        today = datetime.utcnow().date()
-        new_users = User.query.filter(User.created_at >= today).count()
-
-        total_notifications = pending_orgs + unread_messages + new_users
-        return {'count': total_notifications}
+        return {'count': get_admin_notification_count()}
 
     return admin
\ No newline at end of file
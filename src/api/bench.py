@@ -0,0 +1,500 @@
+"""
+Synthetic large-directory data and an endpoint benchmark harness.
+
+`flask bench-seed` bulk-inserts organizations, photos, users, bookmarks,
+notifications and search history in chunks (one shared password hash, no
+per-row commits), so tens of thousands of rows take seconds. Generated rows are
+recognisable by the BENCH_PREFIX in names and emails.
+
+`flask bench` drives the main read endpoints through the Flask test client,
+records latency and SQL statements per request, prints p50/p95/p99 and stores
+the run as JSON in BENCH_RESULTS_DIR so it can be compared with earlier commits.
+
+`flask bench-relevance` scores search ranking against the graded judgments in
+relevance_judgments.json (NDCG@k, MRR, precision@5), next to the popularity
+order the search endpoints used before.
+
+`flask bench-serialization` measures the CPU time to encode a page of
+organizations with per-row dicts and the standard json module against the
+pre-encoded fragments of the organization entity cache, and the time and peak
+memory to load the page as ORM objects versus list-view rows.
+"""
+import json
+import math
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from .models import (
+    db, User, Organization, OrganizationPhoto, Category, Location, UserBookmark,
+    Notification, SearchHistory
+)
+from .bulk_import import insert_in_chunks
+from .sql_profiler import profile_sql
+
+BENCH_PREFIX = 'bench'
+CHUNK_SIZE = 1000
+
+DEFAULT_ENDPOINTS = [
+    '/api/organizations/',
+    '/api/organizations/?page=5',
+    '/api/organizations/{org_id}',
+    '/api/organizations/{org_id}/summary',
+    '/api/organizations/{org_id}/photos',
+    '/api/search/organizations?q=food',
+    '/api/search/organizations?q=community&page=2',
+    '/api/categories/',
+    '/api/locations/',
+    '/sitemap.xml',
+    '/prerender/organizations/{org_id}',
+]
+
+_WORDS = (
+    'community', 'food', 'shelter', 'health', 'youth', 'education', 'animal', 'rescue', 'housing', 'arts',
+    'family', 'veterans', 'water', 'relief', 'literacy', 'senior', 'care', 'garden', 'music', 'legal',
+    'climate', 'refugee', 'clinic', 'mentoring', 'sports', 'library', 'pantry', 'support', 'network', 'alliance',
+)
+
+
+def _bulk_insert(model, rows):
+    insert_in_chunks(model, rows, CHUNK_SIZE)
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _ensure_taxonomy():
+    """Bench data hangs off existing categories/locations; create a few if the DB is empty."""
+    category_ids = [row.id for row in db.session.query(Category.id)]
+    if not category_ids:
+        _bulk_insert(Category, [{'name': f'{BENCH_PREFIX} category {n}', 'is_active': True, 'sort_order': n}
+                                for n in range(10)])
+        category_ids = [row.id for row in db.session.query(Category.id)]
+    location_ids = [row.id for row in db.session.query(Location.id)]
+    if not location_ids:
+        _bulk_insert(Location, [{'country': 'US', 'state_province': f'State {n % 10}', 'city': f'City {n}',
+                                 'is_active': True} for n in range(50)])
+        location_ids = [row.id for row in db.session.query(Location.id)]
+    return category_ids, location_ids
+
+
+def bench_seed(orgs=1000, photos_per_org=2, users=500, bookmarks_per_user=5,
+               notifications_per_user=3, searches_per_user=3, seed=42, log=print):
+    """Bulk-generate a synthetic directory; returns the number of rows inserted per table."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    counts = {}
+    category_ids, location_ids = _ensure_taxonomy()
+
+    # Continue numbering after any earlier bench run so repeated seeding only adds rows
+    run = db.session.query(func.count(User.id)).filter(User.email.like(f'{BENCH_PREFIX}%@example.com')).scalar()
+    org_run = db.session.query(func.count(Organization.id)).filter(Organization.name.like(f'{BENCH_PREFIX.title()} %')).scalar()
+
+    password_hash = generate_password_hash('bench-password')
+    user_rows = [{
+        'name': f'{BENCH_PREFIX.title()} User {run + n}',
+        'email': f'{BENCH_PREFIX}{run + n}@example.com',
+        'password_hash': password_hash,
+        'role': 'visitor',
+        'is_verified': True,
+        'created_at': now - timedelta(days=rng.randint(0, 730)),
+    } for n in range(users)]
+    _bulk_insert(User, user_rows)
+    counts['users'] = len(user_rows)
+    log(f"Inserted {len(user_rows)} users")
+
+    org_rows = []
+    for n in range(orgs):
+        created = now - timedelta(days=rng.randint(0, 1500))
+        org_rows.append({
+            'name': f'{BENCH_PREFIX.title()} {_sentence(rng, 2)[:-1]} {org_run + n}',
+            'mission': _sentence(rng, 8),
+            'description': ' '.join(_sentence(rng, 12) for _ in range(3)),
+            'email': f'org{org_run + n}@{BENCH_PREFIX}.example.com',
+            'website': f'https://{BENCH_PREFIX}{org_run + n}.example.org',
+            'phone': f'555-{rng.randint(1000000, 9999999)}',
+            'status': rng.choices(('approved', 'pending', 'rejected'), weights=(85, 10, 5))[0],
+            'verification_level': rng.choice(('basic', 'verified', 'premium')),
+            'is_verified': rng.random() < 0.4,
+            'view_count': rng.randint(0, 5000),
+            'bookmark_count': 0,
+            'category_id': rng.choice(category_ids),
+            'location_id': rng.choice(location_ids),
+            'established_year': rng.randint(1950, 2024),
+            'created_at': created,
+            'updated_at': min(created + timedelta(days=rng.randint(0, 30)), now),
+        })
+    _bulk_insert(Organization, org_rows)
+    counts['organizations'] = len(org_rows)
+    log(f"Inserted {len(org_rows)} organizations")
+
+    org_ids = [row.id for row in db.session.query(Organization.id)
+               .filter(Organization.email.like(f'%@{BENCH_PREFIX}.example.com')).order_by(Organization.id.desc()).limit(orgs)]
+    user_ids = [row.id for row in db.session.query(User.id)
+                .filter(User.email.like(f'{BENCH_PREFIX}%@example.com')).order_by(User.id.desc()).limit(users)]
+
+    photo_rows = []
+    for org_id in org_ids:
+        for position in range(photos_per_org):
+            name = f'{BENCH_PREFIX}-{org_id}-{position}.jpg'
+            photo_rows.append({
+                'organization_id': org_id, 'file_name': name, 'file_path': name,
+                'alt_text': f'Photo {position + 1}', 'is_primary': position == 0, 'sort_order': position,
+                'file_size': rng.randint(50_000, 2_000_000), 'uploaded_at': now,
+            })
+    _bulk_insert(OrganizationPhoto, photo_rows)
+    counts['photos'] = len(photo_rows)
+    # Bulk inserts skip the session events that maintain the primary photo columns
+    from .primary_photo import refresh_primary_photos
+    refresh_primary_photos(db.session, org_ids)
+    db.session.commit()
+
+    bookmark_rows = []
+    for user_id in user_ids:
+        for org_id in rng.sample(org_ids, min(bookmarks_per_user, len(org_ids))):
+            bookmark_rows.append({'user_id': user_id, 'organization_id': org_id, 'created_at': now})
+    _bulk_insert(UserBookmark, bookmark_rows)
+    # Bulk inserts skip the session events that maintain bookmark_count
+    from .bookmarks import reconcile_bookmark_counts
+    reconcile_bookmark_counts()
+    counts['bookmarks'] = len(bookmark_rows)
+
+    notification_rows = [{
+        'user_id': user_id, 'title': _sentence(rng, 3), 'message': _sentence(rng, 12),
+        'notification_type': rng.choice(('general', 'reminder', 'system_announcement')),
+        'priority': 'normal', 'is_read': rng.random() < 0.5, 'email_sent': rng.random() < 0.8,
+        'created_at': now - timedelta(hours=rng.randint(0, 24 * 90)),
+    } for user_id in user_ids for _ in range(notifications_per_user)]
+    _bulk_insert(Notification, notification_rows)
+    counts['notifications'] = len(notification_rows)
+
+    search_rows = [{
+        'user_id': user_id, 'search_query': ' '.join(rng.sample(_WORDS, rng.randint(1, 2))),
+        'filters_applied': None, 'results_count': rng.randint(0, 200),
+        'searched_at': now - timedelta(hours=rng.randint(0, 24 * 90)),
+    } for user_id in user_ids for _ in range(searches_per_user)]
+    _bulk_insert(SearchHistory, search_rows)
+    counts['search_history'] = len(search_rows)
+
+    log(f"Inserted {counts['photos']} photos, {counts['bookmarks']} bookmarks, "
+        f"{counts['notifications']} notifications, {counts['search_history']} searches")
+
+    # Backdated bulk rows never reach the search index through session events
+    from .search_index import refresh_search_index
+    if refresh_search_index(rebuild=True) is not None:
+        log("Rebuilt the search index snapshot")
+    return counts
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _sample_org_id():
+    row = db.session.query(Organization.id).filter(Organization.status == 'approved') \
+        .order_by(Organization.id.desc()).first()
+    return row.id if row else 1
+
+
+def run_benchmark(app, endpoints=None, iterations=30, warmup=3, use_cache=True):
+    """Request each endpoint `iterations` times and summarize latency and query counts."""
+    endpoints = endpoints or DEFAULT_ENDPOINTS
+    with app.app_context():
+        org_id = _sample_org_id()
+        org_count = db.session.query(func.count(Organization.id)).scalar()
+
+    saved_cache = app.extensions.get('response_cache')
+    if not use_cache:
+        app.extensions['response_cache'] = None
+    client = app.test_client()
+    results = []
+    try:
+        for template in endpoints:
+            url = template.format(org_id=org_id)
+            for _ in range(warmup):
+                client.get(url)
+            timings, queries, statuses = [], [], set()
+            for _ in range(iterations):
+                with profile_sql() as profile:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    response.get_data()  # drain streamed bodies inside the timing
+                    elapsed = time.perf_counter() - start
+                timings.append(elapsed * 1000)
+                queries.append(profile.query_count)
+                statuses.add(response.status_code)
+            timings.sort()
+            results.append({
+                'endpoint': template,
+                'url': url,
+                'status': sorted(statuses),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'mean_ms': round(sum(timings) / len(timings), 3),
+                'queries_per_request': round(sum(queries) / len(queries), 2),
+            })
+    finally:
+        app.extensions['response_cache'] = saved_cache
+
+    return {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': _git_revision(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'organizations': org_count,
+        'iterations': iterations,
+        'response_cache': use_cache and saved_cache is not None,
+        'results': results,
+    }
+
+
+def save_results(run, results_dir):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = run['created_at'].replace(':', '').replace('-', '').split('.')[0]
+    path = os.path.join(results_dir, f"{stamp}-{run['git_revision'] or 'nogit'}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def latest_results(results_dir, exclude=None):
+    """Path of the most recent stored run other than `exclude`, or None."""
+    if not os.path.isdir(results_dir):
+        return None
+    files = sorted(f for f in os.listdir(results_dir) if f.endswith('.json'))
+    files = [os.path.join(results_dir, f) for f in files if os.path.join(results_dir, f) != exclude]
+    return files[-1] if files else None
+
+
+def format_results(run, baseline=None):
+    """Render a run as a text table, with p95 / query deltas against a baseline run."""
+    previous = {r['endpoint']: r for r in (baseline or {}).get('results', [])}
+    header = f"{'endpoint':45} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}"
+    if previous:
+        header += f" {'Δp95':>9} {'Δqueries':>9}"
+    lines = [header, '-' * len(header)]
+    for r in run['results']:
+        line = f"{r['endpoint'][:45]:45} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['queries_per_request']:8.1f}"
+        old = previous.get(r['endpoint'])
+        if old:
+            line += f" {r['p95_ms'] - old['p95_ms']:+9.2f} {r['queries_per_request'] - old['queries_per_request']:+9.1f}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+RELEVANCE_JUDGMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relevance_judgments.json')
+
+
+def _dcg(grades):
+    return sum((2 ** grade - 1) / math.log2(rank + 2) for rank, grade in enumerate(grades))
+
+
+def relevance_metrics(ranked_ids, judgments, k=10):
+    """NDCG@k, reciprocal rank of the first relevant result and precision@5 for one ranking."""
+    grades = [judgments.get(org_id, 0) for org_id in ranked_ids[:k]]
+    ideal = _dcg(sorted(judgments.values(), reverse=True)[:k])
+    first = next((rank for rank, org_id in enumerate(ranked_ids, 1) if judgments.get(org_id, 0) > 0), None)
+    return {
+        'ndcg': round(_dcg(grades) / ideal, 4) if ideal else 0.0,
+        'mrr': round(1 / first, 4) if first else 0.0,
+        'p5': round(sum(1 for grade in grades[:5] if grade > 0) / 5, 4),
+    }
+
+
+def run_relevance_benchmark(judgments_path=None, k=10):
+    """Compare relevance ranking with the popularity order on a labeled query set.
+
+    Both orderings rank the same candidates: every approved organization that
+    contains a query term, plus the judged ones.
+    """
+    from .ranking import build_index
+
+    with open(judgments_path or RELEVANCE_JUDGMENTS, encoding='utf-8') as f:
+        labeled = json.load(f)['queries']
+    names = {name for entry in labeled for name in entry['judgments']}
+    ids_by_name = dict(db.session.query(Organization.name, Organization.id).filter(
+        Organization.status == 'approved', Organization.name.in_(names)))
+    popularity = {
+        org_id: (-(bookmarks or 0), -(views or 0), -(created.timestamp() if created else 0))
+        for org_id, bookmarks, views, created in db.session.query(
+            Organization.id, Organization.bookmark_count, Organization.view_count, Organization.created_at
+        ).filter(Organization.status == 'approved')
+    }
+
+    started = time.perf_counter()
+    index = build_index()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    queries, rank_times = [], []
+    for entry in labeled:
+        judgments = {ids_by_name[name]: grade for name, grade in entry['judgments'].items() if name in ids_by_name}
+        missing = sorted(name for name in entry['judgments'] if name not in ids_by_name)
+        candidates = sorted(set(index.matching(entry['query'])) | set(judgments))
+        started = time.perf_counter()
+        ranked = index.rank(entry['query'], candidates)
+        rank_times.append((time.perf_counter() - started) * 1000)
+        baseline = sorted(candidates, key=lambda org_id: popularity.get(org_id, (0, 0, 0)))
+        queries.append({
+            'query': entry['query'],
+            'judged': len(judgments),
+            'candidates': len(candidates),
+            'missing': missing,
+            'relevance': relevance_metrics(ranked, judgments, k),
+            'popularity': relevance_metrics(baseline, judgments, k),
+        })
+
+    judged = [q for q in queries if q['judged']]
+    summary = {
+        ordering: {metric: round(sum(q[ordering][metric] for q in judged) / len(judged), 4) if judged else 0.0
+                   for metric in ('ndcg', 'mrr', 'p5')}
+        for ordering in ('relevance', 'popularity')
+    }
+    rank_times.sort()
+    return {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': _git_revision(),
+        'documents': index.size,
+        'terms': len(index.postings),
+        'index_build_ms': round(build_ms, 1),
+        'rank_p50_ms': round(percentile(rank_times, 50), 3),
+        'rank_p95_ms': round(percentile(rank_times, 95), 3),
+        'k': k,
+        'summary': summary,
+        'queries': queries,
+    }
+
+
+def format_relevance(run):
+    k = run['k']
+    header = f"{'query':36} {'cands':>6} {'ndcg@' + str(k):>9} {'(pop)':>7} {'mrr':>7} {'(pop)':>7}"
+    lines = [header, '-' * len(header)]
+    for q in run['queries']:
+        line = (f"{q['query'][:36]:36} {q['candidates']:6d} {q['relevance']['ndcg']:9.3f} {q['popularity']['ndcg']:7.3f}"
+                f" {q['relevance']['mrr']:7.3f} {q['popularity']['mrr']:7.3f}")
+        if q['missing']:
+            line += f"  (not found: {', '.join(q['missing'])})"
+        lines.append(line)
+    rel, pop = run['summary']['relevance'], run['summary']['popularity']
+    lines.append('-' * len(header))
+    lines.append(f"{'mean':36} {'':6} {rel['ndcg']:9.3f} {pop['ndcg']:7.3f} {rel['mrr']:7.3f} {pop['mrr']:7.3f}")
+    return '\n'.join(lines)
+
+
+def _cpu_ms_per_page(render, rounds):
+    started = time.process_time()
+    for _ in range(rounds):
+        render()
+    return (time.process_time() - started) * 1000 / rounds
+
+
+def run_serialization_benchmark(rows=50, rounds=200):
+    """CPU time to encode one page of `rows` organizations, per serialization path.
+
+    - dicts+stdlib: serialize_organization per row and the standard json module
+      (what list endpoints did before).
+    - dicts+orjson: the same dicts through orjson.
+    - records (cold): building OrganizationRecords and their fragments, i.e. an
+      entity cache miss.
+    - fragments (warm): splicing cached fragments, i.e. an entity cache hit.
+
+    Must run inside a request context (url_for builds photo URLs). Loading the
+    rows from the database is not included.
+    """
+    from .org_cache import LOAD_OPTIONS, OrganizationRecord, bookmark_fields
+    from .serialization import ENCODERS, splice_list
+    from .utils import serialize_organization
+
+    orgs = Organization.query.options(*LOAD_OPTIONS).filter(Organization.status == 'approved') \
+        .order_by(Organization.id).limit(rows).all()
+    pag = {'total': len(orgs), 'pages': 1, 'current_page': 1, 'next_page': None, 'prev_page': None}
+    records = [OrganizationRecord(org) for org in orgs]
+
+    def dicts():
+        return {'organizations': [serialize_organization(o) for o in orgs], 'pagination': pag}
+
+    paths = {'dicts+stdlib': lambda: json.dumps(dicts())}
+    if 'orjson' in ENCODERS:
+        paths['dicts+orjson'] = lambda: ENCODERS['orjson'](dicts())
+    paths['records (cold)'] = lambda: splice_list(
+        'organizations', [OrganizationRecord(o).encoded(bookmark_fields(o.id, {})) for o in orgs], {'pagination': pag})
+    paths['fragments (warm)'] = lambda: splice_list(
+        'organizations', [r.encoded(bookmark_fields(r.id, {})) for r in records], {'pagination': pag})
+
+    results = []
+    for name, render in paths.items():
+        render()  # warm up
+        results.append({'path': name, 'cpu_ms_per_page': round(_cpu_ms_per_page(render, rounds), 3),
+                        'bytes': len(render())})
+    baseline = results[0]['cpu_ms_per_page']
+    for result in results:
+        result['speedup'] = round(baseline / result['cpu_ms_per_page'], 1) if result['cpu_ms_per_page'] else None
+    return {
+        'created_at': datetime.utcnow().isoformat(),
+        'git_revision': _git_revision(),
+        'rows': len(orgs),
+        'rounds': rounds,
+        'results': results,
+        'loads': run_list_load_benchmark([o.id for o in orgs], rounds=max(rounds // 10, 1)),
+    }
+
+
+def run_list_load_benchmark(org_ids, rounds=20):
+    """Wall time and peak traced memory to load a page of organizations, ORM vs list-view rows."""
+    from .list_view import list_rows_by_id
+    from .org_cache import LOAD_OPTIONS
+
+    loaders = {
+        'orm+joinedload': lambda: Organization.query.options(*LOAD_OPTIONS).filter(Organization.id.in_(org_ids)).all(),
+        'list view rows': lambda: list_rows_by_id(org_ids),
+    }
+    results = []
+    for name, load in loaders.items():
+        timings = []
+        for _ in range(rounds):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            load()
+            timings.append((time.perf_counter() - started) * 1000)
+        db.session.expunge_all()
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timings.sort()
+        results.append({'path': name, 'p50_ms': round(percentile(timings, 50), 3), 'peak_kb': round(peak / 1024, 1)})
+    db.session.expunge_all()
+    return results
+
+
+def format_serialization(run):
+    header = f"{'path':20} {'cpu ms/page':>12} {'bytes':>9} {'speedup':>8}"
+    lines = [header, '-' * len(header)]
+    for r in run['results']:
+        lines.append(f"{r['path']:20} {r['cpu_ms_per_page']:12.3f} {r['bytes']:9d} {r['speedup'] or 0:7.1f}x")
+    if run.get('loads'):
+        header = f"{'load':20} {'p50 ms':>12} {'peak KB':>9}"
+        lines += ['', header, '-' * len(header)]
+        for r in run['loads']:
+            lines.append(f"{r['path']:20} {r['p50_ms']:12.3f} {r['peak_kb']:9.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,163 @@
+"""
+Bookmarks and organizations' bookmark_count.
+
+user_bookmarks is the single bookmark table: /users/bookmarks, the
+is_bookmarked / bookmark_id card fields and bookmark_count all read it. Its
+unique (user_id, organization_id) constraint makes a bookmark idempotent, even
+when two requests race.
+
+bookmark_count is never computed in Python. Session events collect the
+UserBookmark rows a flush inserts or deletes (including cascades from deleted
+users or organizations and admin edits) and apply the net change per
+organization as one `bookmark_count = bookmark_count + n` UPDATE in the same
+transaction. Concurrent bookmarks on a popular organization therefore never
+lose an increment, and a rolled back bookmark never leaves its increment
+behind. The UPDATE keeps updated_at untouched.
+
+Writes that bypass the ORM (bench-seed, SQL imports) are corrected by
+`flask reconcile-bookmark-counts`, which recomputes the counters from the
+indexed user_bookmarks.organization_id aggregate.
+"""
+from sqlalchemy import case, event, func, inspect as sa_inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from .models import db, Organization, UserBookmark
+
+CHUNK_SIZE = 1000
+
+_PENDING_KEY = 'bookmark_count_pending'
+
+
+def add_bookmark(user_id, org_id):
+    """(bookmark, created) for the user's bookmark of org_id, creating it if needed.
+
+    Commits the session when a bookmark is created.
+    """
+    existing = UserBookmark.query.filter_by(user_id=user_id, organization_id=org_id).first()
+    if existing is not None:
+        return existing, False
+    bookmark = UserBookmark(user_id=user_id, organization_id=org_id)
+    db.session.add(bookmark)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request created the same bookmark first
+        db.session.rollback()
+        existing = UserBookmark.query.filter_by(user_id=user_id, organization_id=org_id).first()
+        if existing is None:
+            raise
+        return existing, False
+    return bookmark, True
+
+
+def remove_bookmark(bookmark):
+    """Delete a bookmark and commit; bookmark_count follows through the session events."""
+    db.session.delete(bookmark)
+    db.session.commit()
+
+
+def apply_bookmark_deltas(session, deltas):
+    """Add {organization_id: n} to bookmark_count with one atomic UPDATE per organization.
+
+    Counts never go below zero. Loaded Organization instances have
+    bookmark_count expired, so they read the new value on next access.
+    """
+    for org_id, delta in deltas.items():
+        if not delta:
+            continue
+        current = func.coalesce(Organization.bookmark_count, 0)
+        count = current + delta if delta > 0 else case((current + delta > 0, current + delta), else_=0)
+        session.execute(update(Organization).where(Organization.id == org_id)
+                        .values(bookmark_count=count, updated_at=Organization.updated_at))
+        org = session.identity_map.get(identity_key(Organization, org_id))
+        if org is not None:
+            session.expire(org, ['bookmark_count'])
+
+
+def bookmark_counts(session, org_ids):
+    """{organization_id: bookmarks in user_bookmarks} for org_ids (organizations without bookmarks omitted)."""
+    return dict(session.query(UserBookmark.organization_id, func.count(UserBookmark.id))
+                .filter(UserBookmark.organization_id.in_(list(org_ids)))
+                .group_by(UserBookmark.organization_id))
+
+
+def reconcile_bookmark_counts(batch_size=CHUNK_SIZE, dry_run=False):
+    """Recompute bookmark_count from user_bookmarks, committing per batch of organizations.
+
+    Returns {organization_id: (stored, actual)} for every organization that
+    had drifted; with dry_run nothing is written.
+    """
+    drift, last_id = {}, 0
+    while True:
+        rows = db.session.execute(
+            select(Organization.id, Organization.bookmark_count).where(Organization.id > last_id)
+            .order_by(Organization.id).limit(batch_size)).all()
+        if not rows:
+            return drift
+        actual = bookmark_counts(db.session, [row.id for row in rows])
+        batch = {row.id: (row.bookmark_count, actual.get(row.id, 0))
+                 for row in rows if row.bookmark_count != actual.get(row.id, 0)}
+        if batch and not dry_run:
+            # Recount inside the UPDATE so bookmarks made since the read above are included
+            for org_id in batch:
+                db.session.execute(update(Organization).where(Organization.id == org_id).values(
+                    bookmark_count=select(func.count(UserBookmark.id))
+                    .where(UserBookmark.organization_id == org_id).scalar_subquery(),
+                    updated_at=Organization.updated_at))
+            db.session.commit()
+        drift.update(batch)
+        last_id = rows[-1].id
+
+
+def _stored_organization_id(session, bookmark):
+    history = sa_inspect(bookmark).attrs.organization_id.history
+    if history.deleted or history.unchanged:
+        return (history.deleted or history.unchanged)[0]
+    # The attribute was expired before being reassigned, so read the stored row
+    with session.no_autoflush:
+        return session.query(UserBookmark.organization_id).filter(UserBookmark.id == bookmark.id).scalar()
+
+
+def _collect_bookmark_changes(session, flush_context, instances):
+    # New bookmarks may only know their organization_id after the flush, so keep the objects
+    pending = session.info.setdefault(_PENDING_KEY, {'added': [], 'deltas': {}})
+    deltas = pending['deltas']
+    for obj in session.new:
+        if isinstance(obj, UserBookmark):
+            pending['added'].append(obj)
+    for obj in session.deleted | session.dirty:
+        if not isinstance(obj, UserBookmark) or obj.id is None:
+            continue
+        state = sa_inspect(obj)
+        if obj in session.dirty and not (state.attrs.organization_id.history.has_changes()
+                                         or state.attrs.organization.history.has_changes()):
+            continue
+        org_id = _stored_organization_id(session, obj)
+        if org_id is not None:
+            deltas[org_id] = deltas.get(org_id, 0) - 1
+        if obj in session.dirty:
+            pending['added'].append(obj)
+
+
+def _apply_after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        deltas = pending['deltas']
+        for obj in pending['added']:
+            if obj.organization_id is not None:
+                deltas[obj.organization_id] = deltas.get(obj.organization_id, 0) + 1
+        with session.no_autoflush:
+            apply_bookmark_deltas(session, deltas)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_bookmarks(app):
+    """Keep organizations' bookmark_count in step with user_bookmarks."""
+    event.listen(Session, 'before_flush', _collect_bookmark_changes)
+    event.listen(Session, 'after_flush_postexec', _apply_after_flush)
+    event.listen(Session, 'after_soft_rollback', _discard_pending)
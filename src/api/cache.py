@@ -0,0 +1,329 @@
+"""
+Response caching for public read endpoints.
+
+Anonymous visitors hitting listings, categories, locations, search and ads all
+receive the same payload, so the serialized body is cached per normalized
+request (path + sorted query args) together with a strong ETag. Endpoints whose
+body carries per-visitor fields (bookmark status) are marked personalized and
+bypass the cache for signed-in callers, so those fields are never shared.
+Clients sending a matching If-None-Match get a 304 without the handler running.
+
+Invalidation is tag based: every cached entry records the version of the tags it
+depends on ('organizations', 'categories', ...). When a commit touches one of the
+tracked models, the tag version is bumped and all dependent entries become
+unreachable; nothing has to be scanned or deleted.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from .metrics import observe_cache_lookup
+
+
+class LRUCacheBackend:
+    """Thread-safe in-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        # Counters (tag versions) live outside the LRU so eviction never resets them
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_many(self, keys):
+        """{key: value} for the keys present and not expired."""
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                if entry[0] and entry[0] < now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def set_many(self, mapping, timeout=None):
+        for key, value in mapping.items():
+            self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """Shared store so every gunicorn worker sees the same entries and invalidations."""
+
+    def __init__(self, url, prefix='charity-cache:'):
+        import redis  # optional dependency, only needed for the shared backend
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, timeout=None):
+        self._client.set(self.prefix + key, pickle.dumps(value), ex=timeout or None)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self._client.mget([self.prefix + key for key in keys])
+        return {key: pickle.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+    def set_many(self, mapping, timeout=None):
+        pipe = self._client.pipeline()
+        for key, value in mapping.items():
+            pipe.set(self.prefix + key, pickle.dumps(value), ex=timeout or None)
+        pipe.execute()
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self._client.incr(self.prefix + 'counter:' + key)
+
+    def get_counter(self, key):
+        raw = self._client.get(self.prefix + 'counter:' + key)
+        return int(raw) if raw is not None else 0
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(self.prefix + '*'))
+
+
+def create_cache_backend(app, prefix='charity-cache:'):
+    """Build the backend selected by RESPONSE_CACHE_BACKEND ('memory' or 'redis')."""
+    backend = (app.config.get('RESPONSE_CACHE_BACKEND') or 'memory').lower()
+    if backend == 'redis' and app.config.get('RESPONSE_CACHE_URL'):
+        try:
+            return RedisCacheBackend(app.config['RESPONSE_CACHE_URL'], prefix=prefix)
+        except ImportError:
+            print("Warning: redis not installed. Falling back to in-process response cache.")
+    return LRUCacheBackend(max_entries=app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+
+
+# Models whose changes invalidate cached responses, mapped to the tag they bump
+_MODEL_TAGS = {
+    'organizations': 'organizations',
+    'organization_photos': 'organizations',
+    'organization_social_links': 'organizations',
+    'categories': 'categories',
+    'locations': 'locations',
+    'advertisements': 'advertisements',
+}
+
+# Counter bumps (views, bookmarks, ad clicks) are allowed to be stale for one TTL;
+# invalidating on them would flush the cache on every detail page view.
+_COUNTER_COLUMNS = {'view_count', 'bookmark_count', 'clicks_count', 'impressions_count', 'updated_at'}
+
+
+class ResponseCache:
+    """Caches serialized GET responses and tracks hit-rate statistics."""
+
+    def __init__(self, backend, default_timeout=60):
+        self.backend = backend
+        self.default_timeout = default_timeout
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'stores': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['entries'] = len(self.backend)
+        return stats
+
+    def tag_versions(self, tags):
+        return tuple(self.backend.get_counter('tag:' + t) for t in tags)
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.incr('tag:' + tag)
+            self._count('invalidations')
+
+    def make_key(self, tags):
+        """Key on path, normalized query args and current tag versions."""
+        args = sorted(
+            (k, v.strip()) for k, values in request.args.lists() for v in values if v.strip() != ''
+        )
+        raw = repr((request.path, args, self.tag_versions(tags)))
+        return 'resp:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        self._count('hits' if entry is not None else 'misses')
+        observe_cache_lookup('response', entry is not None)
+        return entry
+
+    def set(self, key, entry, timeout=None):
+        self.backend.set(key, entry, timeout or self.default_timeout)
+        self._count('stores')
+
+    def build_response(self, entry, max_age):
+        response = current_app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        if request.headers.get('Authorization'):
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.vary.add('Authorization')
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self._count('not_modified')
+        return response
+
+
+def get_response_cache():
+    return current_app.extensions.get('response_cache')
+
+
+def cached_response(tags=(), timeout=None, max_age=60, personalized=False):
+    """Cache a GET handler's JSON response and answer If-None-Match with 304.
+
+    Only 200 responses are stored. With personalized, requests carrying a valid
+    JWT run the handler directly, since their body depends on the caller. Handlers may return a dict, a (data, code)
+    tuple or a ready Response; everything goes through api.make_response so the
+    cached body is identical to what Flask-RESTX would have produced.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None or request.method != 'GET':
+                return f(*args, **kwargs)
+            if personalized:
+                from .decorators import optional_jwt_identity
+                if optional_jwt_identity() is not None:
+                    return f(*args, **kwargs)
+
+            key = cache.make_key(tags)
+            entry = cache.get(key)
+            if entry is None:
+                from .core import api
+                rv = f(*args, **kwargs)
+                response = rv if isinstance(rv, current_app.response_class) else api.make_response(*_unpack(rv))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'status': response.status_code,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.sha1(body).hexdigest(),
+                }
+                cache.set(key, entry, timeout)
+            return cache.build_response(entry, max_age)
+        return decorated_function
+    return decorator
+
+
+def _unpack(rv):
+    if isinstance(rv, tuple):
+        data = rv[0]
+        code = rv[1] if len(rv) > 1 else 200
+        headers = rv[2] if len(rv) > 2 else {}
+        return data, code, headers
+    return rv, 200, {}
+
+
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault('response_cache_tags', set())
+    for obj in session.new | session.deleted:
+        tag = _MODEL_TAGS.get(getattr(obj, '__tablename__', None))
+        if tag:
+            tags.add(tag)
+    for obj in session.dirty:
+        tag = _MODEL_TAGS.get(getattr(obj, '__tablename__', None))
+        if not tag:
+            continue
+        state = sa_inspect(obj)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        if changed - _COUNTER_COLUMNS:
+            tags.add(tag)
+
+
+def _make_commit_handler(app):
+    def _invalidate_after_commit(session):
+        tags = session.info.pop('response_cache_tags', None)
+        cache = app.extensions.get('response_cache')
+        if tags and cache is not None:
+            cache.invalidate(*tags)
+    return _invalidate_after_commit
+
+
+def _discard_tags(session):
+    session.info.pop('response_cache_tags', None)
+
+
+def setup_response_cache(app):
+    """Attach the response cache to the app and hook tag invalidation into commits."""
+    if (app.config.get('RESPONSE_CACHE_BACKEND') or '').lower() == 'none':
+        return None
+    backend = create_cache_backend(app)
+    app.extensions['response_cache'] = ResponseCache(
+        backend, default_timeout=app.config.get('RESPONSE_CACHE_DEFAULT_TIMEOUT', 60)
+    )
+    event.listen(Session, 'after_flush', _collect_tags)
+    event.listen(Session, 'after_commit', _make_commit_handler(app))
+    event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: _discard_tags(session))
+    return app.extensions['response_cache']
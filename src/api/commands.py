@@ -1,6 +1,9 @@
 
 from api.models import db, User
 import click
+import json
+import os
+import time
 from .seed import seed_all
 
 """
@@ -16,10 +19,202 @@ def setup_commands(app):
         seed_all()
         print("Database seeded.")
 
+    @app.cli.command("prerender")
+    @click.option("--base-url", default=None, help="Public API base URL used for image links (defaults to PRERENDER_BASE_URL).")
+    @click.option("--workers", default=4, show_default=True, help="Number of render threads.")
+    @click.option("--cache-dir", default=None, help="Output directory (defaults to PRERENDER_CACHE_DIR).")
+    def prerender_command(base_url, workers, cache_dir):
+        """Pre-renders crawler pages for all approved organizations."""
+        from .prerender import prerender_all
+        base_url = (base_url or app.config.get('PRERENDER_BASE_URL') or '').rstrip('/')
+        if not base_url:
+            raise click.UsageError("Provide --base-url or set PRERENDER_BASE_URL.")
+        cache_dir = cache_dir or app.config['PRERENDER_CACHE_DIR']
+        rendered, skipped = prerender_all(base_url, cache_dir, workers=workers)
+        print(f"Prerendered {rendered} organizations ({skipped} already up to date) into {cache_dir}.")
+
+    @app.cli.command("process-images")
+    @click.option("--all", "reprocess_all", is_flag=True, help="Regenerate variants even for already processed photos.")
+    def process_images_command(reprocess_all):
+        """Generates thumbnail/WebP variants and size metadata for organization photos."""
+        from .models import OrganizationPhoto
+        from .image_pipeline import process_photo, pipeline_available
+        if not pipeline_available():
+            print("Warning: Pillow not installed. Only file sizes will be recorded.")
+        query = db.session.query(OrganizationPhoto.id)
+        if not reprocess_all:
+            query = query.filter(OrganizationPhoto.variants.is_(None))
+        photo_ids = [row.id for row in query.order_by(OrganizationPhoto.id)]
+        processed = sum(1 for photo_id in photo_ids if process_photo(photo_id))
+        print(f"Processed {processed} of {len(photo_ids)} photos.")
+
+    @app.cli.command("insert-test-users")
+    @click.argument("count", type=int)
+    def insert_test_users_command(count):
+        """Creates COUNT fixture users (test_user<n>@test.com / 123456)."""
+        run_insert_test_users(count)
+
+    @app.cli.command("import-organizations")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None, help="Defaults to the file extension.")
+    @click.option("--key", default="name", type=click.Choice(["name", "email"]), show_default=True,
+                  help="Natural key used to update existing organizations.")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Rows per batch transaction.")
+    @click.option("--dry-run", is_flag=True, help="Validate only; nothing is written.")
+    @click.option("--errors-file", default=None, help="Write every rejected row as JSON Lines to this file.")
+    def import_organizations_command(path, fmt, key, chunk_size, dry_run, errors_file):
+        """Validates and upserts organizations from a CSV or JSON Lines file."""
+        from .bulk_import import read_records, detect_format, import_organizations
+        fmt = fmt or detect_format(path)
+        started = time.perf_counter()
+        errors_out = open(errors_file, 'w', encoding='utf-8') if errors_file else None
+        try:
+            on_error = (lambda entry: errors_out.write(json.dumps(entry) + '\n')) if errors_out else None
+            with open(path, 'rb') as f:
+                report = import_organizations(read_records(f, fmt), key=key, chunk_size=chunk_size,
+                                              dry_run=dry_run, on_error=on_error)
+        finally:
+            if errors_out:
+                errors_out.close()
+        for entry in report.errors[:20]:
+            print(f" row {entry['row']}: {'; '.join(entry['errors'])}")
+        if report.failed > 20:
+            print(f" ... {report.failed - 20} more rejected rows" + (f" (see {errors_file})" if errors_file else ""))
+        prefix = "Validated" if dry_run else "Imported"
+        print(f"{prefix} {report.total} rows in {time.perf_counter() - started:.1f}s: "
+              f"{report.created} created, {report.updated} updated, {report.failed} rejected.")
+
+    @app.cli.command("bench-seed")
+    @click.option("--orgs", default=1000, show_default=True, help="Organizations to generate.")
+    @click.option("--photos-per-org", default=2, show_default=True)
+    @click.option("--users", default=500, show_default=True, help="Users to generate.")
+    @click.option("--bookmarks-per-user", default=5, show_default=True)
+    @click.option("--notifications-per-user", default=3, show_default=True)
+    @click.option("--searches-per-user", default=3, show_default=True)
+    @click.option("--seed", default=42, show_default=True, help="Random seed for reproducible data.")
+    def bench_seed_command(orgs, photos_per_org, users, bookmarks_per_user, notifications_per_user, searches_per_user, seed):
+        """Bulk-generates a synthetic large directory for benchmarking."""
+        from .bench import bench_seed
+        started = time.perf_counter()
+        counts = bench_seed(orgs=orgs, photos_per_org=photos_per_org, users=users,
+                            bookmarks_per_user=bookmarks_per_user, notifications_per_user=notifications_per_user,
+                            searches_per_user=searches_per_user, seed=seed)
+        print(f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s.")
+
+    @app.cli.command("bench")
+    @click.option("--iterations", default=30, show_default=True, help="Timed requests per endpoint.")
+    @click.option("--warmup", default=3, show_default=True, help="Untimed requests per endpoint.")
+    @click.option("--endpoint", "endpoints", multiple=True, help="Endpoint to benchmark ({org_id} is filled in); repeatable.")
+    @click.option("--no-cache", is_flag=True, help="Bypass the response cache.")
+    @click.option("--results-dir", default=None, help="Where runs are stored (defaults to BENCH_RESULTS_DIR).")
+    @click.option("--compare", "compare_to", default=None, help="Stored run to compare with (defaults to the previous run).")
+    def bench_command(iterations, warmup, endpoints, no_cache, results_dir, compare_to):
+        """Benchmarks the main endpoints: p50/p95/p99 latency and queries per request."""
+        from .bench import run_benchmark, save_results, latest_results, format_results
+        results_dir = results_dir or app.config['BENCH_RESULTS_DIR']
+        run = run_benchmark(app, endpoints=list(endpoints) or None, iterations=iterations,
+                            warmup=warmup, use_cache=not no_cache)
+        path = save_results(run, results_dir)
+        baseline_path = compare_to or latest_results(results_dir, exclude=path)
+        baseline = None
+        if baseline_path:
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline = json.load(f)
+        print(f"{run['organizations']} organizations, {iterations} iterations, revision {run['git_revision']}")
+        print(format_results(run, baseline))
+        if baseline_path:
+            print(f"Compared with {baseline_path}")
+        print(f"Saved {path}")
+
+    @app.cli.command("backfill-primary-photos")
+    @click.option("--batch-size", default=500, show_default=True, help="Organizations per transaction.")
+    def backfill_primary_photos_command(batch_size):
+        """Recomputes every organization's stored primary photo and thumbnail."""
+        from .primary_photo import backfill_primary_photos
+        started = time.perf_counter()
+        changed = backfill_primary_photos(batch_size=batch_size)
+        print(f"Updated the primary photo of {changed} organizations in {time.perf_counter() - started:.1f}s.")
+
+    @app.cli.command("reconcile-bookmark-counts")
+    @click.option("--batch-size", default=1000, show_default=True, help="Organizations per transaction.")
+    @click.option("--dry-run", is_flag=True, help="Only report organizations whose count has drifted.")
+    def reconcile_bookmark_counts_command(batch_size, dry_run):
+        """Recomputes every organization's bookmark_count from user_bookmarks."""
+        from .bookmarks import reconcile_bookmark_counts
+        started = time.perf_counter()
+        drift = reconcile_bookmark_counts(batch_size=batch_size, dry_run=dry_run)
+        for org_id, (stored, actual) in sorted(drift.items())[:20]:
+            print(f"  organization {org_id}: stored {stored}, actual {actual}")
+        if len(drift) > 20:
+            print(f"  ... and {len(drift) - 20} more")
+        action = "Found" if dry_run else "Corrected"
+        print(f"{action} {len(drift)} drifted bookmark counts in {time.perf_counter() - started:.1f}s.")
+
+    @app.cli.group("search-index")
+    def search_index_group():
+        """Manage the in-process organization search index."""
+
+    @search_index_group.command("build")
+    def search_index_build_command():
+        """Rebuilds the search index snapshot from the database."""
+        from .search_index import load_or_build
+        started = time.perf_counter()
+        index = load_or_build(app, rebuild=True)
+        stats = index.stats()
+        print(f"Indexed {stats['documents']} organizations ({stats['terms']} terms, {stats['postings']} postings) "
+              f"in {time.perf_counter() - started:.1f}s -> {app.config['SEARCH_INDEX_PATH']}")
+
+    @search_index_group.command("stats")
+    def search_index_stats_command():
+        """Shows the loaded snapshot and pending delta sizes."""
+        from .search_index import get_search_index
+        index = get_search_index()
+        if index is None:
+            print("Search index is disabled (SEARCH_INDEX=off, PostgreSQL in auto mode, or numpy missing).")
+            return
+        for key, value in index.stats().items():
+            print(f"{key}: {value}")
+
+    @app.cli.command("bench-relevance")
+    @click.option("--judgments", default=None, help="Labeled query set (defaults to api/relevance_judgments.json).")
+    @click.option("--k", default=10, show_default=True, help="Cut-off for NDCG.")
+    @click.option("--results-dir", default=None, help="Where runs are stored (defaults to BENCH_RESULTS_DIR).")
+    def bench_relevance_command(judgments, k, results_dir):
+        """Measures search ranking quality (NDCG, MRR) against labeled queries."""
+        from .bench import run_relevance_benchmark, format_relevance
+        run = run_relevance_benchmark(judgments, k=k)
+        results_dir = os.path.join(results_dir or app.config['BENCH_RESULTS_DIR'], 'relevance')
+        os.makedirs(results_dir, exist_ok=True)
+        stamp = run['created_at'].replace(':', '').replace('-', '').split('.')[0]
+        path = os.path.join(results_dir, f"{stamp}-{run['git_revision'] or 'nogit'}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"{run['documents']} documents, {run['terms']} terms, index built in {run['index_build_ms']:.0f} ms, "
+              f"ranking p50 {run['rank_p50_ms']:.2f} ms / p95 {run['rank_p95_ms']:.2f} ms")
+        print(format_relevance(run))
+        print(f"Saved {path}")
+
+    @app.cli.command("bench-serialization")
+    @click.option("--rows", default=50, show_default=True, help="Organizations per page.")
+    @click.option("--rounds", default=200, show_default=True, help="Timed encodings per path.")
+    @click.option("--results-dir", default=None, help="Where runs are stored (defaults to BENCH_RESULTS_DIR).")
+    def bench_serialization_command(rows, rounds, results_dir):
+        """Measures CPU time to encode a page of organizations (dicts + json vs cached fragments)."""
+        from .bench import run_serialization_benchmark, format_serialization, save_results
+        with app.test_request_context():
+            run = run_serialization_benchmark(rows=rows, rounds=rounds)
+        path = save_results(run, os.path.join(results_dir or app.config['BENCH_RESULTS_DIR'], 'serialization'))
+        print(f"{run['rows']} rows per page, {run['rounds']} rounds")
+        print(format_serialization(run))
+        print(f"Saved {path}")
+
 def run_insert_test_users(count):
     """
     Create test users in the database.
 
+    Existing emails are skipped with a single query and all users share one
+    password hash ("123456"), so thousands of users are created in seconds.
+
     Args:
         count (int): Number of test users to create
 
@@ -30,26 +225,11 @@ def run_insert_test_users(count):
         with app.app_context():
             run_insert_test_users(5)
     """
+    from .bulk_import import bulk_insert_users
     print(f"Creating {count} test users...")
-    created_count = 0
-
-    for x in range(1, int(count) + 1):
-        email = f"test_user{x}@test.com"
-
-        # Check if user already exists
-        if User.query.filter_by(email=email).first():
-            print(f"User {email} already exists, skipping...")
-            continue
-
-        user = User()
-        user.name = f"Test User {x}"
-        user.email = email
-        user.set_password("123456")
-        user.role = 'visitor'
-        user.is_verified = True
-        db.session.add(user)
-        db.session.commit()
-        print(f" User: {user.email} created.")
-        created_count += 1
-
-    print(f" Created {created_count} new test users (out of {count} requested).")
\ No newline at end of file
+    users = [{'name': f"Test User {x}", 'email': f"test_user{x}@test.com", 'role': 'visitor', 'is_verified': True}
+             for x in range(1, int(count) + 1)]
+    created_count, skipped = bulk_insert_users(users, password="123456")
+    if skipped:
+        print(f" {skipped} users already existed, skipped.")
+    print(f" Created {created_count} new test users (out of {count} requested).")
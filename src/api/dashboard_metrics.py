@@ -0,0 +1,110 @@
+"""
+Admin dashboard counters computed with a handful of conditional-aggregate queries.
+
+The dashboard and the navbar notification badge both read the same snapshot,
+which is cached for a few seconds so rapid admin page loads (and the badge
+polling endpoint) don't re-run the aggregates on every request.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select
+
+from .cache import LRUCacheBackend
+from .models import (db, User, Organization, Category, Location, Notification, AuditLog,
+                     Advertisement, ContactMessage)
+
+DASHBOARD_SNAPSHOT_TTL = 5  # seconds
+
+_snapshot_cache = LRUCacheBackend(max_entries=1)
+
+
+def _count_if(condition):
+    """COUNT of rows matching condition; portable across Postgres and SQLite."""
+    return func.count(case((condition, 1)))
+
+
+def compute_dashboard_metrics():
+    """Run the aggregate queries and return a flat dict of dashboard counters."""
+    now = datetime.utcnow()
+    today = datetime.combine(now.date(), datetime.min.time())
+    week_ago = now - timedelta(days=7)
+
+    users = db.session.execute(
+        select(
+            func.count(User.id),
+            _count_if(User.role == 'visitor'),
+            _count_if(User.role == 'org_admin'),
+            _count_if(User.created_at >= today),
+        )
+    ).one()
+
+    orgs = db.session.execute(
+        select(
+            func.count(Organization.id),
+            _count_if(Organization.status == 'pending'),
+            _count_if(Organization.status == 'approved'),
+            _count_if(Organization.status == 'rejected'),
+            func.coalesce(func.sum(Organization.view_count), 0),
+        )
+    ).one()
+
+    # Small tables: one round trip using scalar subqueries
+    content = db.session.execute(
+        select(
+            select(func.count(Category.id)).scalar_subquery(),
+            select(func.count(Location.id)).scalar_subquery(),
+            select(func.count(Notification.id)).scalar_subquery(),
+            select(func.count(AuditLog.id)).where(AuditLog.timestamp >= week_ago).scalar_subquery(),
+            select(func.count(ContactMessage.id)).where(ContactMessage.is_read == False).scalar_subquery(),
+        )
+    ).one()
+
+    ads = db.session.execute(
+        select(func.count(Advertisement.id), _count_if(Advertisement.is_active == True))
+    ).one()
+
+    total_orgs = orgs[0]
+    approved_orgs = orgs[2]
+    approval_rate = (approved_orgs / total_orgs * 100) if total_orgs > 0 else 0
+
+    return {
+        # User statistics
+        'total_users': users[0],
+        'visitor_count': users[1],
+        'org_admin_count': users[2],
+        'new_users_today': users[3],
+
+        # Organization statistics
+        'total_orgs': total_orgs,
+        'pending_orgs': orgs[1],
+        'approved_orgs': approved_orgs,
+        'rejected_orgs': orgs[3],
+        'total_pageviews': int(orgs[4] or 0),
+        'approval_rate': round(approval_rate, 1),
+
+        # Content statistics
+        'total_categories': content[0],
+        'total_locations': content[1],
+        'total_notifications': content[2],
+
+        # System statistics
+        'recent_logs': content[3],
+        'unread_messages': content[4],
+        'total_ads': ads[0],
+        'active_ads': ads[1],
+    }
+
+
+def get_dashboard_metrics(max_age=DASHBOARD_SNAPSHOT_TTL):
+    """Return the cached snapshot, recomputing it when older than max_age seconds."""
+    snapshot = _snapshot_cache.get('dashboard')
+    if snapshot is None:
+        snapshot = compute_dashboard_metrics()
+        _snapshot_cache.set('dashboard', snapshot, timeout=max_age)
+    return snapshot
+
+
+def get_admin_notification_count():
+    """Pending orgs + unread messages + new users today, from the shared snapshot."""
+    metrics = get_dashboard_metrics()
+    return metrics['pending_orgs'] + metrics['unread_messages'] + metrics['new_users_today']
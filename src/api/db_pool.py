@@ -0,0 +1,129 @@
+"""
+Database engine / connection pool configuration and pool statistics.
+
+Pool sizing is per worker process: with gunicorn, the database sees up to
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. `TimedQueuePool` is a
+QueuePool that also records how long checkouts wait for a free connection, so
+saturation shows up in `/db/pool/stats` and `/health` before requests start
+timing out.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that tracks checkout wait time and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time_total += waited
+                if waited > self.wait_time_max:
+                    self.wait_time_max = waited
+
+
+def _is_memory_sqlite(db_url):
+    return db_url.startswith('sqlite') and (':memory:' in db_url or db_url.rstrip('/') == 'sqlite:')
+
+
+def build_engine_options(db_url):
+    """SQLALCHEMY_ENGINE_OPTIONS from DB_* environment variables."""
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    # In-memory SQLite uses a single static connection; pool sizing doesn't apply
+    if not _is_memory_sqlite(db_url):
+        options.update({
+            'poolclass': TimedQueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        })
+
+    timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if timeout_ms > 0:
+        if db_url.startswith('postgres'):
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+        elif db_url.startswith('mysql'):
+            options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout_ms}'}
+    return options
+
+
+def pool_stats(engine):
+    """Snapshot of pool usage for one engine."""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        return stats
+
+    size = pool.size()
+    capacity = size + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    stats.update({
+        'size': size,
+        'max_overflow': pool._max_overflow,
+        'checked_in': pool.checkedin(),
+        'checked_out': checked_out,
+        'overflow': pool.overflow(),
+        'capacity': capacity,
+        'saturation': round(checked_out / capacity, 3) if capacity else 0.0,
+    })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update({
+                'checkouts': checkouts,
+                'timeouts': pool.timeouts,
+                'wait_time_total_ms': round(pool.wait_time_total * 1000, 3),
+                'wait_time_avg_ms': round(pool.wait_time_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_time_max_ms': round(pool.wait_time_max * 1000, 3),
+            })
+    connections = getattr(engine, '_pool_connection_events', None)
+    if connections is not None:
+        stats.update(connections)
+    return stats
+
+
+def setup_pool_metrics(app, db):
+    """Count connects and pre-ping invalidations on every engine the app uses."""
+    with app.app_context():
+        engines = set(db.engines.values())
+    for engine in engines:
+        counters = engine._pool_connection_events = {'connects': 0, 'invalidations': 0}
+
+        @event.listens_for(engine, 'connect')
+        def _on_connect(dbapi_connection, connection_record, counters=counters):
+            counters['connects'] += 1
+
+        @event.listens_for(engine, 'invalidate')
+        def _on_invalidate(dbapi_connection, connection_record, exception, counters=counters):
+            counters['invalidations'] += 1
@@ -0,0 +1,108 @@
+"""
+Read-replica routing for read-only request handlers.
+
+When DATABASE_REPLICA_URL is set it is registered as the 'replica' bind. Handlers
+decorated with `@read_replica` run their SELECTs against it; everything else,
+and any flush or DML statement even inside a routed handler, goes to the primary.
+
+Replicas lag, so a client that just wrote must read its own writes: a successful
+write request marks the client sticky to the primary for DB_REPLICA_STICKY_SECONDS,
+via a cookie and, for JWT clients, a marker keyed by user identity in the shared
+cache backend so every worker sees it.
+"""
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+_SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads to the replica when the request allows it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) and _replica_requested():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_requested():
+    return has_request_context() and g.get('db_route') == REPLICA_BIND
+
+
+def replica_bind_options(app, build_engine_options):
+    """SQLALCHEMY_BINDS entry for the replica, or an empty dict when not configured."""
+    url = app.config.get('DATABASE_REPLICA_URL')
+    if not url:
+        return {}
+    return {REPLICA_BIND: dict(build_engine_options(url), url=url)}
+
+
+def _identity_from_request():
+    """JWT identity of the caller if a valid Bearer token was sent, else None.
+
+    The token is decoded directly rather than verified into the request's JWT
+    context, so routing never makes get_jwt_identity() return the caller inside
+    a handler that would otherwise treat the request as anonymous.
+    """
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer '):
+        return None
+    try:
+        from flask_jwt_extended import decode_token
+        token = decode_token(auth[len('Bearer '):].strip())
+        return token.get(current_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+    except Exception:
+        return None
+
+
+def _sticky_backend():
+    cache = current_app.extensions.get('response_cache')
+    return cache.backend if cache is not None else None
+
+
+def is_sticky_to_primary():
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    backend = _sticky_backend()
+    identity = _identity_from_request()
+    return bool(backend is not None and identity is not None and backend.get(f'db-sticky:{identity}'))
+
+
+def read_replica(f):
+    """Route a read-only handler's queries to the replica unless the client must read its own writes."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}) and not is_sticky_to_primary():
+            g.db_route = REPLICA_BIND
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _mark_sticky(response):
+    if request.method in _SAFE_METHODS or response.status_code >= 400:
+        return response
+    window = current_app.config.get('DB_REPLICA_STICKY_SECONDS', 10)
+    response.set_cookie(STICKY_COOKIE, str(int(time.time() + window)), max_age=window,
+                        httponly=True, samesite='Lax')
+    identity = _identity_from_request()
+    backend = _sticky_backend()
+    if backend is not None and identity is not None:
+        backend.set(f'db-sticky:{identity}', 1, window)
+    return response
+
+
+def setup_db_routing(app):
+    """Enable sticky-primary tracking when a replica bind is configured."""
+    if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    app.after_request(_mark_sticky)
@@ -36,7 +36,7 @@ def admin_required(f):
         else:
             # Session-based authentication for web requests
             if not current_user.is_authenticated:
-                return redirect(url_for('login'))
+                return redirect(url_for('backend_login'))
             if not current_user.is_admin():
                 return jsonify({'message': 'Admin access required'}), 403
         return f(*args, **kwargs)
@@ -58,7 +58,7 @@ def login_required_hybrid(f):
         else:
             # Session-based authentication for web requests
             if not current_user.is_authenticated:
-                return redirect(url_for('login'))
+                return redirect(url_for('backend_login'))
             return f(*args, **kwargs)
     return decorated_function
 
@@ -67,7 +67,7 @@ def web_login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated:
-            return redirect(url_for('login'))
+            return redirect(url_for('backend_login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -81,3 +81,14 @@ def api_login_required(f):
         except Exception:
             return jsonify({'message': 'Authorization token required'}), 401
     return decorated_function
+
+def optional_jwt_identity():
+    """JWT identity of the caller when a valid Bearer token was sent, else None; never raises."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
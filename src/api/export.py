@@ -0,0 +1,175 @@
+"""
+Streaming export of approved organizations as CSV or NDJSON.
+
+Rows are a flat column projection (category and location joined in) read
+through a server-side cursor in EXPORT_BATCH_SIZE batches, serialized per batch
+and optionally gzip-compressed on the fly, so memory stays flat however large
+the directory is. Validators come from MAX(updated_at) and the row count, which
+lets partners revalidate with If-None-Match / If-Modified-Since, and
+`updated_since` limits the export to rows changed after a timestamp for
+incremental sync.
+"""
+import csv
+import hashlib
+import io
+import json
+import zlib
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask import current_app, request, stream_with_context
+from sqlalchemy import func
+
+from .models import db, Organization, Category, Location
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'jsonl': 'application/x-ndjson'}
+
+EXPORT_COLUMNS = (
+    ('id', Organization.id),
+    ('name', Organization.name),
+    ('mission', Organization.mission),
+    ('description', Organization.description),
+    ('address', Organization.address),
+    ('phone', Organization.phone),
+    ('email', Organization.email),
+    ('website', Organization.website),
+    ('donation_link', Organization.donation_link),
+    ('logo_url', Organization.logo_url),
+    ('operating_hours', Organization.operating_hours),
+    ('established_year', Organization.established_year),
+    ('verification_level', Organization.verification_level),
+    ('is_verified', Organization.is_verified),
+    ('view_count', Organization.view_count),
+    ('bookmark_count', Organization.bookmark_count),
+    ('category_id', Organization.category_id),
+    ('category', Category.name),
+    ('location_id', Organization.location_id),
+    ('city', Location.city),
+    ('state_province', Location.state_province),
+    ('country', Location.country),
+    ('postal_code', Location.postal_code),
+    ('latitude', Location.latitude),
+    ('longitude', Location.longitude),
+    ('created_at', Organization.created_at),
+    ('updated_at', Organization.updated_at),
+)
+FIELD_NAMES = [name for name, _ in EXPORT_COLUMNS]
+
+
+def parse_updated_since(value):
+    """Parse an ISO 8601 date or datetime; raises ValueError for anything else."""
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1]
+    parsed = datetime.fromisoformat(value)
+    # Stored timestamps are naive UTC
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def _changed_at():
+    return func.coalesce(Organization.updated_at, Organization.created_at)
+
+
+def _filtered(query, updated_since):
+    query = query.filter(Organization.status == 'approved')
+    if updated_since is not None:
+        query = query.filter(_changed_at() > updated_since)
+    return query
+
+
+def export_state(updated_since=None):
+    """Return (row_count, last_modified) for the export in one query."""
+    return _filtered(db.session.query(func.count(Organization.id), func.max(_changed_at())), updated_since).one()
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_rows(updated_since=None):
+    """Yield export rows as tuples, streamed from a server-side cursor."""
+    query = db.session.query(*[column for _, column in EXPORT_COLUMNS]) \
+        .outerjoin(Category, Organization.category_id == Category.id) \
+        .outerjoin(Location, Organization.location_id == Location.id)
+    query = _filtered(query, updated_since).order_by(Organization.id) \
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    for row in query:
+        yield tuple(_plain(value) for value in row)
+
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELD_NAMES)
+    yield buffer.getvalue()
+    for batch in _batched(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    for batch in _batched(rows):
+        yield ''.join(json.dumps(dict(zip(FIELD_NAMES, row)), separators=(',', ':')) + '\n' for row in batch)
+
+
+def gzip_stream(chunks, level=6):
+    """Compress text chunks into a single gzip member as they are produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _encode(chunks):
+    for chunk in chunks:
+        yield chunk.encode('utf-8')
+
+
+def export_response(fmt='csv', updated_since=None, compress=None):
+    """Build the streamed export response (304 when the client's copy is current)."""
+    count, last_modified = export_state(updated_since)
+    if compress is None:
+        compress = 'gzip' in request.accept_encodings
+    stamp = last_modified.isoformat() if last_modified else ''
+    since = updated_since.isoformat() if updated_since else ''
+    etag = hashlib.sha1(f'{fmt}|{since}|{count}|{stamp}|{int(compress)}'.encode('utf-8')).hexdigest()
+
+    chunks = iter_csv(iter_rows(updated_since)) if fmt == 'csv' else iter_ndjson(iter_rows(updated_since))
+    body = gzip_stream(chunks) if compress else _encode(chunks)
+    response = current_app.response_class(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt])
+
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename=organizations-{datetime.utcnow():%Y%m%d}.{extension}'
+    response.headers['X-Total-Count'] = str(count)
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
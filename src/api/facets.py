@@ -0,0 +1,75 @@
+"""
+Facet counts for organization search results.
+
+All four facets (category, state_province, verification_level, is_verified)
+come from a single GROUP BY over the filtered result set: one row per distinct
+combination, summed per facet in Python. The number of combinations is bounded
+by the taxonomy, not the number of organizations.
+
+Counts are cached in the response cache backend under the normalized query and
+filters (see ranking.normalize_query) plus the organizations / categories /
+locations tag versions. Every page, sort order and spelling variant of a query
+therefore shares one entry, and any committed change invalidates it.
+"""
+import hashlib
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from .models import Organization, Category, Location
+from .metrics import observe_cache_lookup
+from .ranking import normalize_query
+
+FACET_TAGS = ('organizations', 'categories', 'locations')
+FACET_NAMES = ('category', 'state_province', 'verification_level', 'is_verified')
+
+
+def compute_facets(query):
+    """Per-facet counts for the rows of an Organization query, in one grouped query."""
+    category, location = aliased(Category), aliased(Location)
+    columns = (Organization.category_id, category.name, location.state_province,
+               Organization.verification_level, Organization.is_verified)
+    rows = query.outerjoin(category, Organization.category_id == category.id) \
+        .outerjoin(location, Organization.location_id == location.id) \
+        .with_entities(*columns, func.count(Organization.id)) \
+        .group_by(*columns).order_by(None)
+
+    categories, states, levels, verified = {}, {}, {}, {}
+    for category_id, category_name, state, level, is_verified, count in rows:
+        key = (category_id, category_name)
+        categories[key] = categories.get(key, 0) + count
+        states[state] = states.get(state, 0) + count
+        levels[level] = levels.get(level, 0) + count
+        verified[bool(is_verified)] = verified.get(bool(is_verified), 0) + count
+
+    def ordered(counts):
+        return sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+
+    return {
+        'category': [{'id': cid, 'name': name, 'count': count}
+                     for (cid, name), count in ordered(categories) if cid is not None],
+        'state_province': [{'value': value, 'count': count} for value, count in ordered(states) if value],
+        'verification_level': [{'value': value, 'count': count} for value, count in ordered(levels) if value],
+        'is_verified': [{'value': value, 'count': count} for value, count in ordered(verified)],
+    }
+
+
+def facets_cache_key(cache, text, filters):
+    raw = repr((normalize_query(text), sorted((k, v) for k, v in filters.items() if v is not None),
+                cache.tag_versions(FACET_TAGS)))
+    return 'facets:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def search_facets(query, text=None, filters=None):
+    """Facet counts for a search, read through the response cache backend when there is one."""
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return compute_facets(query)
+    key = facets_cache_key(cache, text, filters or {})
+    facets = cache.backend.get(key)
+    observe_cache_lookup('facets', facets is not None)
+    if facets is None:
+        facets = compute_facets(query)
+        cache.backend.set(key, facets, current_app.config.get('SEARCH_FACETS_TIMEOUT', 300))
+    return facets
@@ -0,0 +1,96 @@
+"""
+Serving of user uploads with long-lived caching, content ETags and range support.
+
+Uploaded files are written once under a content-addressed "<sha256>.<ext>" key
+(or the older "<uuid>_<name>" filename) and never modified, so they are served
+as `immutable` for a year. The ETag is the file's SHA-256: taken from the key
+when content-addressed, otherwise computed once per (path, size, mtime) and
+memoized, so a revalidation costs a stat() and a dict lookup. When UPLOAD_OFFLOAD is configured the body is
+handed to the front proxy (X-Sendfile for Apache/lighttpd, X-Accel-Redirect for
+nginx) and Python never reads the file.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import current_app, request, send_file, abort
+from werkzeug.security import safe_join
+
+from .cache import LRUCacheBackend
+from .storage import get_storage
+
+IMMUTABLE_MAX_AGE = 31536000  # one year
+DEFAULT_MAX_AGE = 3600
+
+_UUID_NAME = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_', re.IGNORECASE)
+_CONTENT_ADDRESSED = re.compile(r'^([0-9a-f]{64})(?:_[a-z]+)?(?:\.[A-Za-z0-9]+)?$')
+
+_hash_cache = LRUCacheBackend(max_entries=10000)
+
+
+def is_immutable_upload(filename):
+    name = os.path.basename(filename)
+    return bool(_UUID_NAME.match(name) or _CONTENT_ADDRESSED.match(name))
+
+
+def resolve_upload_path(filename):
+    """Path for a blob key in the configured storage, falling back to legacy files in UPLOAD_FOLDER."""
+    path = get_storage().local_path(filename)
+    if path is None or not os.path.isfile(path):
+        path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    return path
+
+
+def file_content_hash(path, stat=None):
+    """SHA-256 of the file, memoized on (path, size, mtime)."""
+    stat = stat or os.stat(path)
+    key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = _hash_cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _hash_cache.set(key, digest)
+    return digest
+
+
+def serve_upload(filename):
+    """Send an uploaded file with caching headers, or delegate it to the front proxy."""
+    path = resolve_upload_path(filename)
+    if path is None:
+        abort(404)
+
+    stat = os.stat(path)
+    content_addressed = _CONTENT_ADDRESSED.match(os.path.basename(filename))
+    # Variants (<sha>_thumb.webp) share the original's hash, so only bare keys can reuse it
+    if content_addressed and '_' not in os.path.basename(filename):
+        etag = content_addressed.group(1)
+    else:
+        etag = file_content_hash(path, stat)
+    max_age = IMMUTABLE_MAX_AGE if is_immutable_upload(filename) else DEFAULT_MAX_AGE
+
+    offload = (current_app.config.get('UPLOAD_OFFLOAD') or '').lower()
+    if offload == 'x-accel':
+        # nginx serves the body (ranges included) from an internal location
+        response = current_app.response_class(status=200)
+        prefix = current_app.config.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/').rstrip('/')
+        response.headers['X-Accel-Redirect'] = f"{prefix}/{filename}"
+        response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+    else:
+        # send_file honours USE_X_SENDFILE and handles Range / If-None-Match itself
+        response = send_file(path, etag=etag, conditional=True, max_age=max_age)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if max_age == IMMUTABLE_MAX_AGE:
+        response.cache_control.immutable = True
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,187 @@
+"""
+"Near me" search over location coordinates.
+
+Candidates are first narrowed to a latitude/longitude bounding box around the
+point, then refined with the haversine distance, so the exact (trigonometric)
+check only runs on the handful of rows inside the box. Two interchangeable
+backends answer the bounding-box step:
+
+- 'database': a range query on the (latitude, longitude) index of `locations`.
+- 'memory' (default): a per-worker grid of GEO_GRID_CELL_DEGREES cells built from
+  the active locations, so a lookup touches only the cells overlapping the box
+  and costs no SQL at all. The grid is rebuilt when the 'locations' response
+  cache tag changes (any committed Location write bumps it) or after
+  GEO_INDEX_TTL seconds.
+
+Both return {location_id: distance_km}; organizations are then matched on
+location_id and ordered nearest first.
+"""
+import math
+import threading
+import time
+
+from flask import current_app
+
+from .models import db, Location, Organization
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 25.0
+MAX_RADIUS_KM = 500.0
+DEFAULT_CELL_DEGREES = 0.5
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, lng_ranges) enclosing the circle around (lat, lng).
+
+    lng_ranges is a list of (min_lng, max_lng) pairs: two when the box crosses the
+    antimeridian, one covering every longitude when it reaches a pole.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    d_lng = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+    if min_lng < -180:
+        return min_lat, max_lat, [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+
+def validate_point(lat, lng, radius_km):
+    """Raise ValueError for coordinates or a radius the search cannot use."""
+    if not -90 <= lat <= 90:
+        raise ValueError('lat must be between -90 and 90')
+    if not -180 <= lng <= 180:
+        raise ValueError('lng must be between -180 and 180')
+    max_radius = current_app.config.get('GEO_MAX_RADIUS_KM', MAX_RADIUS_KM)
+    if not 0 < radius_km <= max_radius:
+        raise ValueError(f'radius_km must be greater than 0 and at most {max_radius:g}')
+
+
+class GridIndex:
+    """Location points bucketed into fixed-size latitude/longitude cells."""
+
+    def __init__(self, points, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees))
+        self.cells = {}
+        self.size = 0
+        for location_id, lat, lng in points:
+            self.cells.setdefault(self._key(lat, lng), []).append((location_id, lat, lng))
+            self.size += 1
+
+    def _row(self, lat):
+        return int(math.floor(lat / self.cell))
+
+    def _column(self, lng):
+        return int(math.floor((lng + 180) / self.cell)) % self.columns
+
+    def _key(self, lat, lng):
+        return self._row(lat), self._column(lng)
+
+    def within(self, lat, lng, radius_km):
+        min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+        found = {}
+        for row in range(self._row(min_lat), self._row(max_lat) + 1):
+            for min_lng, max_lng in lng_ranges:
+                first, last = self._column(min_lng), self._column(min(max_lng, 180 - 1e-9))
+                for column in range(first, last + 1):
+                    for location_id, p_lat, p_lng in self.cells.get((row, column), ()):
+                        distance = haversine_km(lat, lng, p_lat, p_lng)
+                        if distance <= radius_km:
+                            found[location_id] = distance
+        return found
+
+
+_grid = None
+_grid_state = None
+_grid_lock = threading.Lock()
+
+
+def _location_points(query):
+    return [(location_id, float(lat), float(lng)) for location_id, lat, lng in query]
+
+
+def _active_locations():
+    return db.session.query(Location.id, Location.latitude, Location.longitude).filter(
+        Location.is_active.isnot(False), Location.latitude.isnot(None), Location.longitude.isnot(None))
+
+
+def _tag_version():
+    cache = current_app.extensions.get('response_cache')
+    return cache.tag_versions(('locations',)) if cache is not None else None
+
+
+def get_grid():
+    """Return the worker's grid index, rebuilding it when locations changed or it expired."""
+    global _grid, _grid_state
+    version = _tag_version()
+    ttl = current_app.config.get('GEO_INDEX_TTL', 300)
+    state = _grid_state
+    if _grid is not None and state[0] == version and time.monotonic() - state[1] < ttl:
+        return _grid
+    with _grid_lock:
+        if _grid is None or _grid_state is state:
+            cell = current_app.config.get('GEO_GRID_CELL_DEGREES', DEFAULT_CELL_DEGREES)
+            _grid = GridIndex(_location_points(_active_locations()), cell)
+            _grid_state = (version, time.monotonic())
+        return _grid
+
+
+def reset_grid():
+    global _grid, _grid_state
+    with _grid_lock:
+        _grid = _grid_state = None
+
+
+def locations_within_db(lat, lng, radius_km):
+    """Bounding-box range query on the coordinate index, refined with haversine."""
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+    found = {}
+    for min_lng, max_lng in lng_ranges:
+        query = _active_locations().filter(
+            Location.latitude.between(min_lat, max_lat), Location.longitude.between(min_lng, max_lng))
+        for location_id, p_lat, p_lng in _location_points(query):
+            distance = haversine_km(lat, lng, p_lat, p_lng)
+            if distance <= radius_km:
+                found[location_id] = distance
+    return found
+
+
+def locations_within(lat, lng, radius_km):
+    """{location_id: distance_km} for active locations within radius_km of the point."""
+    if (current_app.config.get('GEO_SEARCH_BACKEND') or 'memory').lower() == 'database':
+        return locations_within_db(lat, lng, radius_km)
+    return get_grid().within(lat, lng, radius_km)
+
+
+def nearest_organizations(query, lat, lng, radius_km):
+    """Rank the organizations of an Organization query by distance from the point.
+
+    `query` carries any other filters; only (id, location_id, bookmark_count) are
+    selected. Returns [(organization_id, distance_km)] nearest first, ties broken
+    by popularity.
+    """
+    distances = locations_within(lat, lng, radius_km)
+    if not distances:
+        return []
+    ranked = []
+    location_ids = list(distances)
+    for start in range(0, len(location_ids), 1000):
+        rows = query.with_entities(Organization.id, Organization.location_id, Organization.bookmark_count) \
+            .filter(Organization.location_id.in_(location_ids[start:start + 1000]))
+        ranked.extend((distances[location_id], -(bookmarks or 0), org_id) for org_id, location_id, bookmarks in rows)
+    ranked.sort()
+    return [(org_id, round(distance, 3)) for distance, _, org_id in ranked]
@@ -0,0 +1,158 @@
+"""
+Resized WebP/AVIF variants for uploaded organization photos.
+
+Uploads are saved verbatim by the request; generating variants happens on a small
+background thread pool so signup latency doesn't depend on image size. Each
+OrganizationPhoto gets its original dimensions, file size and a `variants` map:
+
+    {'thumb': {'width': 160, 'height': 120, 'formats': {'webp': {'file': ..., 'size': ...}}}, ...}
+
+Pillow is listed in requirements.txt. The import stays guarded: without it
+photos are left untouched and list responses fall back to the original file.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from .models import db, OrganizationPhoto
+from .file_serving import resolve_upload_path
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+# Longest edge in pixels; images are never upscaled
+VARIANT_SIZES = {'thumb': 160, 'card': 480, 'full': 1280}
+VARIANT_QUALITY = {'webp': 80, 'avif': 55}
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('IMAGE_PIPELINE_WORKERS', 2)), thread_name_prefix='image-pipeline')
+
+
+def pipeline_available():
+    return Image is not None
+
+
+def _output_formats():
+    formats = []
+    if features.check('webp'):
+        formats.append('webp')
+    if features.check('avif'):
+        formats.append('avif')
+    return formats
+
+
+def _is_local_file(name):
+    return bool(name) and not name.startswith(('http://', 'https://'))
+
+
+def generate_variants(src, file_name):
+    """Write resized variants next to src; returns (width, height, variants).
+
+    Variant keys keep file_name's prefix, so blob keys like blobs/ab/<sha>.png get
+    blobs/ab/<sha>_thumb.webp and are served from the same storage location.
+    """
+    out_dir = os.path.dirname(src)
+    stem = os.path.splitext(file_name)[0]
+    formats = _output_formats()
+    variants = {}
+
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        width, height = im.size
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if 'transparency' in im.info else 'RGB')
+
+        for name, max_px in VARIANT_SIZES.items():
+            resized = im.copy()
+            resized.thumbnail((max_px, max_px), Image.LANCZOS)
+            entry = {'width': resized.width, 'height': resized.height, 'formats': {}}
+            for fmt in formats:
+                out_name = f"{stem}_{name}.{fmt}"
+                out_path = os.path.join(out_dir, os.path.basename(out_name))
+                resized.save(out_path, fmt.upper(), quality=VARIANT_QUALITY[fmt])
+                entry['formats'][fmt] = {'file': out_name, 'size': os.path.getsize(out_path)}
+            variants[name] = entry
+
+    return width, height, variants
+
+
+def process_photo(photo_id):
+    """Fill dimensions, size and variants for one OrganizationPhoto (needs an app context)."""
+    photo = OrganizationPhoto.query.get(photo_id)
+    if not photo or not _is_local_file(photo.file_name):
+        return False
+
+    src = resolve_upload_path(photo.file_name)
+    if src is None:
+        return False
+
+    photo.file_size = os.path.getsize(src)
+
+    # Deduplicated uploads share a blob, so reuse variants another photo already produced
+    if photo.blob_id and photo.variants is None:
+        sibling = OrganizationPhoto.query.filter(
+            OrganizationPhoto.blob_id == photo.blob_id,
+            OrganizationPhoto.id != photo.id,
+            OrganizationPhoto.variants.isnot(None)
+        ).first()
+        if sibling is not None:
+            photo.width, photo.height, photo.variants = sibling.width, sibling.height, sibling.variants
+            db.session.commit()
+            return True
+
+    if pipeline_available():
+        try:
+            photo.width, photo.height, photo.variants = generate_variants(src, photo.file_name)
+        except Exception as e:
+            current_app.logger.warning(f"Image variants failed for photo {photo_id}: {e}")
+    db.session.commit()
+    return True
+
+
+def _process_in_background(app, photo_ids):
+    with app.app_context():
+        for photo_id in photo_ids:
+            try:
+                process_photo(photo_id)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception(f"Image pipeline failed for photo {photo_id}")
+
+
+def queue_depth():
+    """Number of scheduled batches not yet picked up by a worker thread."""
+    return _executor._work_queue.qsize()
+
+
+def schedule_photo_processing(photo_ids):
+    """Queue photos for variant generation off the request thread."""
+    if not photo_ids:
+        return None
+    app = current_app._get_current_object()
+    return _executor.submit(_process_in_background, app, list(photo_ids))
+
+
+def variant_urls(photo, fmt='webp'):
+    """Return ({variant: url}, srcset) for a processed photo, or ({}, None)."""
+    return variant_urls_from(getattr(photo, 'variants', None), fmt)
+
+
+def variant_urls_from(variants, fmt='webp'):
+    """variant_urls for a photo's stored `variants` value (e.g. from a column projection)."""
+    variants = variants or {}
+    urls = {}
+    srcset = []
+    widths = set()
+    for name in VARIANT_SIZES:
+        entry = variants.get(name)
+        if not entry or fmt not in entry.get('formats', {}):
+            continue
+        url = f"/api/uploads/{entry['formats'][fmt]['file']}"
+        urls[name] = url
+        # Small originals produce identical card/full sizes; list each width once
+        if entry['width'] not in widths:
+            widths.add(entry['width'])
+            srcset.append(f"{url} {entry['width']}w")
+    return urls, (', '.join(srcset) or None)
@@ -0,0 +1,156 @@
+"""
+Column-projected "list view" of organizations.
+
+Directory listings only render the organization card. Instead of hydrating
+Organization objects with their photos and social links collections, a list
+query selects a fixed set of scalar columns, joined to the category and the
+location. The primary photo is read from the columns primary_photo.py keeps on
+the organization, so photos are not touched at all. Rows come back as plain
+OrganizationListRow tuples, with no identity map or relationship bookkeeping
+and no operating_hours blob.
+
+serialize_list_row produces exactly the payload serialize_organization does
+(without the per-visitor bookmark fields), and organization_fragments serves
+listings from encoded cards cached in the organization entity cache, loading
+misses with one projected query.
+"""
+from typing import NamedTuple, Any, Optional
+from datetime import datetime
+
+from .image_pipeline import variant_urls_from
+from .models import db, Organization, Category, Location
+from .org_cache import bookmark_fields, bookmark_status, cached_entries
+from .serialization import encode_fragment, extend_fragment
+
+CHUNK_SIZE = 1000
+
+
+class OrganizationListRow(NamedTuple):
+    id: int
+    name: str
+    mission: Optional[str]
+    description: Optional[str]
+    category_id: Optional[int]
+    category_name: Optional[str]
+    location_id: Optional[int]
+    city: Optional[str]
+    state_province: Optional[str]
+    country: Optional[str]
+    postal_code: Optional[str]
+    logo_url: Optional[str]
+    primary_photo_url: Optional[str]
+    primary_photo_thumb_url: Optional[str]
+    primary_photo_variants: Any
+    email: Optional[str]
+    phone: Optional[str]
+    address: Optional[str]
+    website: Optional[str]
+    donation_link: Optional[str]
+    status: Optional[str]
+    is_verified: Optional[bool]
+    verification_level: Optional[str]
+    established_year: Optional[int]
+    view_count: Optional[int]
+    bookmark_count: Optional[int]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    admin_user_id: Optional[int]
+
+
+LIST_COLUMNS = (
+    Organization.id, Organization.name, Organization.mission, Organization.description,
+    Category.id, Category.name,
+    Location.id, Location.city, Location.state_province, Location.country, Location.postal_code,
+    Organization.logo_url,
+    Organization.primary_photo_url, Organization.primary_photo_thumb_url, Organization.primary_photo_variants,
+    Organization.email, Organization.phone, Organization.address, Organization.website, Organization.donation_link,
+    Organization.status, Organization.is_verified, Organization.verification_level, Organization.established_year,
+    Organization.view_count, Organization.bookmark_count, Organization.created_at, Organization.updated_at,
+    Organization.admin_user_id,
+)
+
+
+def list_view_query():
+    """Query of LIST_COLUMNS over organizations; add filters and ordering on Organization columns."""
+    return db.session.query(*LIST_COLUMNS).select_from(Organization) \
+        .outerjoin(Category, Category.id == Organization.category_id) \
+        .outerjoin(Location, Location.id == Organization.location_id)
+
+
+def list_rows(query):
+    """Execute a list_view_query into OrganizationListRow tuples."""
+    return [OrganizationListRow._make(row) for row in query]
+
+
+def list_rows_by_id(org_ids):
+    """{id: OrganizationListRow} for the ids that exist."""
+    rows = {}
+    org_ids = list(org_ids)
+    for start in range(0, len(org_ids), CHUNK_SIZE):
+        for row in list_rows(list_view_query().filter(Organization.id.in_(org_ids[start:start + CHUNK_SIZE]))):
+            rows[row.id] = row
+    return rows
+
+
+def serialize_list_row(row):
+    """serialize_organization's payload for a list row, without is_bookmarked / bookmark_id."""
+    variants, srcset = variant_urls_from(row.primary_photo_variants)
+    location = None
+    if row.location_id is not None:
+        location = {'id': row.location_id, 'city': row.city, 'state_province': row.state_province,
+                    'country': row.country, 'postal_code': row.postal_code}
+    return {
+        'id': row.id,
+        'name': row.name,
+        'mission': row.mission,
+        'description': row.description,
+        'category_name': row.category_name,
+        'category_id': row.category_id,
+        'location': location,
+        'logo_url': row.logo_url or None,
+        'primary_photo_url': row.primary_photo_url,
+        'primary_photo_thumb_url': row.primary_photo_thumb_url,
+        'primary_photo_variants': variants,
+        'primary_photo_srcset': srcset,
+        'email': row.email,
+        'phone': row.phone,
+        'address': row.address,
+        'website': row.website,
+        'donation_link': row.donation_link,
+        'status': row.status,
+        'is_verified': row.is_verified,
+        'verification_level': row.verification_level,
+        'established_year': row.established_year,
+        'view_count': row.view_count,
+        'bookmark_count': row.bookmark_count,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'admin_user_id': row.admin_user_id,
+    }
+
+
+def _load_cards(org_ids):
+    cards = {}
+    for org_id, row in list_rows_by_id(org_ids).items():
+        fragment = encode_fragment(serialize_list_row(row))
+        cards[org_id] = (fragment, len(fragment) + 128)
+    return cards
+
+
+def organization_fragment_map(ids, extra=None):
+    """{id: encoded card} with bookmark status and any extra[id] fields appended; unknown ids are absent."""
+    cards = cached_entries('card', ids, _load_cards, metric='organization_card')
+    bookmarks = bookmark_status(cards)
+    fragments = {}
+    for org_id, card in cards.items():
+        fields = bookmark_fields(org_id, bookmarks)
+        if extra and org_id in extra:
+            fields.update(extra[org_id])
+        fragments[org_id] = extend_fragment(card, fields)
+    return fragments
+
+
+def organization_fragments(ids, extra=None):
+    """Encoded cards for ids, in order; missing or deleted ids are skipped."""
+    fragments = organization_fragment_map(ids, extra)
+    return [fragments[org_id] for org_id in ids if org_id in fragments]
@@ -0,0 +1,157 @@
+"""
+Prometheus metrics exposed on /metrics.
+
+Recorded per request: latency by restx namespace and route template, plus the
+number of SQL statements and total DB time (via engine cursor events). Response
+cache lookups and email sends are counted where they happen; queue depths and
+pool usage are sampled when /metrics is scraped.
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory:
+every worker then writes its samples there and /metrics aggregates all of them,
+whichever worker answers the scrape. gunicorn.conf.py cleans up after workers
+that exit.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    Counter = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+_metrics = {}
+
+
+def metrics_available():
+    return Counter is not None
+
+
+def _create_metrics():
+    labels = ('namespace', 'route', 'method')
+    return {
+        'request_latency': Histogram(
+            'http_request_duration_seconds', 'Request latency', labels + ('status',), buckets=LATENCY_BUCKETS),
+        'db_queries': Histogram(
+            'http_request_db_queries', 'SQL statements executed per request', labels, buckets=QUERY_COUNT_BUCKETS),
+        'db_time': Histogram(
+            'http_request_db_seconds', 'Time spent in SQL per request', labels, buckets=LATENCY_BUCKETS),
+        'cache_lookups': Counter(
+            'cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result')),
+        'email_latency': Histogram(
+            'email_send_duration_seconds', 'Email send latency', ('kind', 'status'), buckets=LATENCY_BUCKETS),
+        'notification_queue': Gauge(
+            'notification_email_queue_depth', 'Notifications whose email has not been sent yet',
+            multiprocess_mode='mostrecent'),
+        'image_queue': Gauge(
+            'image_pipeline_queue_depth', 'Photos waiting for variant generation in this worker',
+            multiprocess_mode='livesum'),
+        'pool_checked_out': Gauge(
+            'db_pool_checked_out', 'Connections checked out of the pool', ('engine',), multiprocess_mode='livesum'),
+        'pool_overflow': Gauge(
+            'db_pool_overflow', 'Overflow connections in use', ('engine',), multiprocess_mode='livesum'),
+    }
+
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    parts = rule.strip('/').split('/')
+    # /api/<namespace>/... belongs to a restx namespace; everything else is the app itself
+    namespace = parts[1] if len(parts) > 1 and parts[0] == 'api' and not parts[1].startswith('<') else 'app'
+    return namespace, rule, request.method
+
+
+def observe_cache_lookup(cache_name, hit):
+    if _metrics:
+        _metrics['cache_lookups'].labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def track_email_send(kind):
+    """Time an email send; the status label records whether it raised."""
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        yield
+        status = 'sent'
+    finally:
+        if _metrics:
+            _metrics['email_latency'].labels(kind, status).observe(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        start = getattr(context, '_metrics_start', None)
+        if start is not None:
+            g.metrics_db_time = g.get('metrics_db_time', 0.0) + time.perf_counter() - start
+        g.metrics_db_queries = g.get('metrics_db_queries', 0) + 1
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = g.get('metrics_start')
+    if start is None or request.path == '/metrics':
+        return response
+    labels = _route_labels()
+    _metrics['request_latency'].labels(*labels, str(response.status_code)).observe(time.perf_counter() - start)
+    _metrics['db_queries'].labels(*labels).observe(g.get('metrics_db_queries', 0))
+    _metrics['db_time'].labels(*labels).observe(g.get('metrics_db_time', 0.0))
+    return response
+
+
+def _sample_gauges(app):
+    from .db_pool import pool_stats
+    from .image_pipeline import queue_depth
+    from .models import db, Notification
+
+    _metrics['notification_queue'].set(
+        db.session.query(Notification.id).filter(Notification.email_sent.is_(False)).count())
+    _metrics['image_queue'].set(queue_depth())
+    for key, engine in db.engines.items():
+        stats = pool_stats(engine)
+        _metrics['pool_checked_out'].labels(key or 'default').set(stats.get('checked_out', 0))
+        _metrics['pool_overflow'].labels(key or 'default').set(max(stats.get('overflow', 0), 0))
+
+
+def metrics_response(app):
+    """Render the exposition text, aggregating all workers in multiprocess mode."""
+    _sample_gauges(app)
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    return app.response_class(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app):
+    """Register request timing and SQL counting hooks; returns False without prometheus_client."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return False
+    if not metrics_available():
+        print("Warning: prometheus_client not installed. /metrics will be disabled.")
+        return False
+    if not _metrics:
+        _metrics.update(_create_metrics())
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    return True
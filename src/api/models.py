@@ -4,8 +4,9 @@ from sqlalchemy import String, Boolean
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column
 from werkzeug.security import generate_password_hash, check_password_hash
+from .db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -77,6 +78,7 @@ class Organization(db.Model):
     website = db.Column(db.String(255), nullable=True)
     donation_link = db.Column(db.String(255), nullable=True)
     logo_url = db.Column(db.String(255), nullable=True)
+    logo_blob_id = db.Column(db.Integer, db.ForeignKey('blobs.id'), nullable=True)
     operating_hours = db.Column(db.Text, nullable=True)
     established_year = db.Column(db.Integer, nullable=True)
     status = db.Column(db.String(20), default='pending')  # pending / approved / rejected / flagged
@@ -88,18 +90,23 @@ class Organization(db.Model):
 
     # Foreign Keys
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
-    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=True, index=True)
     admin_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     approved_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     approval_date = db.Column(db.DateTime, nullable=True)
     rejection_reason = db.Column(db.Text, nullable=True)
     is_verified = db.Column(db.Boolean, default=False)
+    # Resolved primary photo (is_primary, else first by sort_order), maintained by primary_photo.py
+    primary_photo_url = db.Column(db.String(500), nullable=True)
+    primary_photo_thumb_url = db.Column(db.String(500), nullable=True)
+    primary_photo_variants = db.Column(db.JSON(none_as_null=True), nullable=True)
 
     # Relationships
     bookmarks = db.relationship('UserBookmark', back_populates='organization', cascade='all, delete-orphan')
     photos = db.relationship('OrganizationPhoto', back_populates='organization', cascade='all, delete-orphan')
     social_links = db.relationship('OrganizationSocialLink', back_populates='organization', cascade='all, delete-orphan')
     contact_messages = db.relationship('ContactMessage', back_populates='organization', cascade='all, delete-orphan')
+    logo_blob = db.relationship('Blob', foreign_keys=[logo_blob_id])
     admin_user = db.relationship('User', foreign_keys=[admin_user_id], back_populates='administered_orgs')
     approver = db.relationship('User', foreign_keys=[approved_by], back_populates='approved_orgs')
 
@@ -134,6 +141,8 @@ class Location(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_locations_latitude_longitude', 'latitude', 'longitude'),)
+
     # Relationships
     organizations = db.relationship('Organization', backref='location', lazy=True)
 
@@ -151,8 +160,11 @@ class UserBookmark(db.Model):
     user = db.relationship('User', back_populates='bookmarks')
     organization = db.relationship('Organization', back_populates='bookmarks')
 
-    # Unique constraint to prevent duplicate bookmarks
-    __table_args__ = (db.UniqueConstraint('user_id', 'organization_id', name='unique_user_organization_bookmark'),)
+    # Unique constraint to prevent duplicate bookmarks; the index serves per-organization counts
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'organization_id', name='unique_user_organization_bookmark'),
+        db.Index('ix_user_bookmarks_organization_id', 'organization_id'),
+    )
 
 
 class SearchHistory(db.Model):
@@ -174,16 +186,35 @@ class OrganizationPhoto(db.Model):
     __tablename__ = 'organization_photos'
     id = db.Column(db.Integer, primary_key=True)
     organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
+    blob_id = db.Column(db.Integer, db.ForeignKey('blobs.id'), nullable=True)
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     alt_text = db.Column(db.String(255), nullable=True)
     is_primary = db.Column(db.Boolean, default=False)
     sort_order = db.Column(db.Integer, default=0)
     file_size = db.Column(db.Integer, nullable=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    variants = db.Column(db.JSON, nullable=True)  # {'thumb'|'card'|'full': {width, height, formats: {webp|avif: {file, size}}}}
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index('ix_organization_photos_organization_id_is_primary', 'organization_id', 'is_primary'),)
+
     # Relationships
     organization = db.relationship('Organization', back_populates='photos')
+    blob = db.relationship('Blob')
+
+
+class Blob(db.Model):
+    """Content-addressed uploaded file; identical uploads share one row and one stored object."""
+    __tablename__ = 'blobs'
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)
+    storage_backend = db.Column(db.String(20), nullable=False, default='local')  # local / object-local
+    storage_key = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class OrganizationSocialLink(db.Model):
@@ -296,16 +327,6 @@ class ActivityLog(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref=db.backref('activity_logs', cascade='all, delete-orphan'))
 
-class Bookmark(db.Model):
-    __tablename__ = 'bookmarks'
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('user_bookmarks', cascade='all, delete-orphan'))
-    organization = db.relationship('Organization', backref=db.backref('organization_bookmarks', cascade='all, delete-orphan'))
-
-
 class Advertisement(db.Model):
     __tablename__ = 'advertisements'
     id = db.Column(db.Integer, primary_key=True)
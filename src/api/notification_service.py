@@ -8,6 +8,7 @@ import os
 from typing import List, Dict, Optional, Union
 
 from .models import db, User, Notification, Organization, NotificationPreference
+from .metrics import track_email_send
 
 
 class NotificationType(Enum):
@@ -258,7 +259,8 @@ class NotificationService:
                 html=html_content
             )
 
-            mail.send(msg)
+            with track_email_send(notification_type.value):
+                mail.send(msg)
             return True
 
         except Exception as e:
@@ -532,7 +534,8 @@ class NotificationService:
             )
 
             # Send email
-            mail.send(msg)
+            with track_email_send('advertising_inquiry'):
+                mail.send(msg)
             current_app.logger.info(f"Advertising inquiry notification sent to {partnerships_email}")
             return True
 
@@ -610,7 +613,8 @@ class NotificationService:
             )
 
             # Send email
-            mail.send(msg)
+            with track_email_send('advertising_inquiry_confirmation'):
+                mail.send(msg)
             current_app.logger.info(f"Advertising inquiry confirmation sent to {email}")
             return True
 
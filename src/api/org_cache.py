@@ -0,0 +1,325 @@
+"""
+Read-through organization entity cache.
+
+Detail, summary, contact, photos, prerender, AI search and search-result
+hydration all need the same organization plus its category, location, photos
+and social links. Each organization is loaded once (one query with joined
+relationships, or one IN query for a batch) into an OrganizationRecord. The
+record is a compact, read-only `__slots__` object holding the serialized card,
+the same card pre-encoded as a JSON fragment (see serialization.py) and the few
+extra fields those endpoints render.
+
+Records live in a per-worker LRU bounded by ORG_CACHE_MAX_BYTES (estimated
+from their serialized size) and expire after ORG_CACHE_TTL seconds. The same
+LRU holds the encoded list cards built by list_view.py. Entries are keyed by
+(kind, id) and carry a version:
+
+- the version combines a per-organization counter with the categories /
+  locations tag versions;
+- the counter is bumped after any commit that changes the organization (other
+  than view/bookmark counters), its photos or its social links, and explicitly
+  by patch, approve and reject through invalidate_organization();
+- counters live in the response cache backend, so with Redis an edit in one
+  worker invalidates every worker's copy.
+
+View and bookmark counts in a record may lag by up to the TTL.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, url_for
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, joinedload
+
+from .models import Organization, OrganizationPhoto, OrganizationSocialLink, UserBookmark
+from .metrics import observe_cache_lookup
+from .serialization import encode_fragment, extend_fragment
+from .utils import serialize_organization
+
+VERSION_TAGS = ('categories', 'locations')
+# Columns that change constantly and are allowed to lag in cached records
+COUNTER_COLUMNS = {'view_count', 'bookmark_count', 'updated_at'}
+
+LOAD_OPTIONS = (
+    joinedload(Organization.photos),
+    joinedload(Organization.social_links),
+    joinedload(Organization.category),
+    joinedload(Organization.location)
+)
+
+_PENDING_KEY = 'org_cache_pending'
+
+
+def _photo_url(photo):
+    if photo.file_path:
+        return photo.file_path
+    try:
+        return url_for('uploaded_file', filename=photo.file_name, _external=False)
+    except Exception:
+        return f"/uploads/{photo.file_name}"
+
+
+class OrganizationRecord:
+    """Immutable snapshot of one organization as the read endpoints render it."""
+
+    __slots__ = ('id', 'status', 'admin_user_id', 'name', 'mission', 'description', 'email', 'phone',
+                 'address', 'website', 'category_name', 'city', 'state_province', 'country', 'logo_url',
+                 'primary_photo_url', 'updated_at', 'card', 'fragment', 'photos', 'size')
+
+    def __init__(self, org):
+        location = org.location
+        photos = sorted(org.photos, key=lambda p: p.id)
+        card = serialize_organization(org, include_bookmark=False)
+        values = {
+            'id': org.id, 'status': org.status, 'admin_user_id': org.admin_user_id,
+            'name': org.name, 'mission': org.mission, 'description': org.description, 'email': org.email,
+            'phone': org.phone, 'address': org.address, 'website': org.website,
+            'category_name': org.category.name if org.category else None,
+            'city': location.city if location else None,
+            'state_province': location.state_province if location else None,
+            'country': location.country if location else None,
+            'logo_url': org.logo_url,
+            'primary_photo_url': org.primary_photo_url or '',
+            'updated_at': org.updated_at,
+            'card': card,
+            'fragment': encode_fragment(card),
+            'photos': tuple({'id': p.id, 'url': _photo_url(p), 'alt_text': p.alt_text} for p in photos),
+        }
+        values['size'] = 2 * len(values['fragment']) + len(json.dumps(values['photos'])) + 512
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('OrganizationRecord is read-only')
+
+    @property
+    def is_public(self):
+        return self.status == 'approved'
+
+    def card_data(self):
+        """A fresh copy of the list/detail payload (without per-user fields)."""
+        return dict(self.card)
+
+    def encoded(self, fields=None):
+        """The card as JSON bytes, with per-visitor fields appended."""
+        return extend_fragment(self.fragment, fields)
+
+    def photo_list(self):
+        return [dict(photo) for photo in self.photos]
+
+    def contact(self):
+        return {'name': self.name, 'email': self.email, 'phone': self.phone, 'address': self.address,
+                'website': self.website}
+
+    def location_text(self):
+        parts = [part for part in (self.city, self.state_province, self.country) if part]
+        return ', '.join(parts) if parts else None
+
+    def prerender_fields(self):
+        """Same shape as prerender.org_fields."""
+        return {
+            'id': self.id,
+            'name': self.name or '',
+            'description': (self.description or self.mission or '').strip()[:300],
+            'website': self.website or '',
+            'image': self.logo_url or self.primary_photo_url,
+            'updated_at': self.updated_at,
+        }
+
+
+KINDS = ('record', 'card')
+
+
+class OrganizationCache:
+    """Thread-safe LRU of per-organization entries keyed by (kind, id), bounded by total estimated bytes.
+
+    An entry is only returned for the version it was stored with.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                self._data.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[3]
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key, version, value, size):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (version, time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._data) > 1:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._stats['evictions'] += 1
+
+    def discard(self, org_id):
+        with self._lock:
+            for kind in KINDS:
+                entry = self._data.pop((kind, org_id), None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._data), bytes=self._bytes, max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_local_counters = {}
+_local_lock = threading.Lock()
+
+
+def get_org_cache(app=None):
+    app = app or current_app
+    cache = app.extensions.get('org_cache')
+    if cache is None:
+        cache = app.extensions['org_cache'] = OrganizationCache(
+            max_bytes=app.config.get('ORG_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+            ttl=app.config.get('ORG_CACHE_TTL', 300))
+    return cache
+
+
+def _versions(org_ids):
+    response_cache = current_app.extensions.get('response_cache')
+    if response_cache is None:
+        with _local_lock:
+            return {org_id: (_local_counters.get(org_id, 0),) for org_id in org_ids}
+    tags = response_cache.tag_versions(VERSION_TAGS)
+    backend = response_cache.backend
+    return {org_id: (backend.get_counter(f'org:{org_id}'),) + tags for org_id in org_ids}
+
+
+def invalidate_organization(*org_ids, app=None):
+    """Drop cached records for these organizations in every worker."""
+    app = app or current_app
+    response_cache = app.extensions.get('response_cache')
+    cache = get_org_cache(app)
+    for org_id in org_ids:
+        if response_cache is not None:
+            response_cache.backend.incr(f'org:{org_id}')
+        else:
+            with _local_lock:
+                _local_counters[org_id] = _local_counters.get(org_id, 0) + 1
+        cache.discard(org_id)
+
+
+def cached_entries(kind, org_ids, load, metric='organization'):
+    """{id: value} for one kind of per-organization entry; `load(missing_ids)` returns
+    {id: (value, size)} for the ids it finds and is called at most once."""
+    cache = get_org_cache()
+    versions = _versions(org_ids)
+    found = {}
+    for org_id in org_ids:
+        value = cache.get((kind, org_id), versions[org_id])
+        observe_cache_lookup(metric, value is not None)
+        if value is not None:
+            found[org_id] = value
+    missing = [org_id for org_id in org_ids if org_id not in found]
+    if missing:
+        for org_id, (value, size) in load(missing).items():
+            cache.put((kind, org_id), versions[org_id], value, size)
+            found[org_id] = value
+    return found
+
+
+def _load_records(org_ids):
+    records = {}
+    for org in Organization.query.options(*LOAD_OPTIONS).filter(Organization.id.in_(org_ids)):
+        record = OrganizationRecord(org)
+        records[org.id] = (record, record.size)
+    return records
+
+
+def get_organization_records(org_ids):
+    """{id: OrganizationRecord} for the ids that exist; misses are loaded with one query."""
+    return cached_entries('record', org_ids, _load_records)
+
+
+def get_organization_record(org_id):
+    """The record for one organization, or None if it does not exist."""
+    return get_organization_records([org_id]).get(org_id)
+
+
+def bookmark_status(org_ids):
+    """{organization_id: bookmark_id} for the current user's bookmarks among org_ids (one query)."""
+    from .decorators import optional_jwt_identity
+    user_id = optional_jwt_identity()
+    if not user_id or not org_ids:
+        return {}
+    return dict(UserBookmark.query.with_entities(UserBookmark.organization_id, UserBookmark.id).filter(
+        UserBookmark.user_id == user_id, UserBookmark.organization_id.in_(list(org_ids))))
+
+
+def bookmark_fields(org_id, bookmarks):
+    return {'is_bookmarked': org_id in bookmarks, 'bookmark_id': bookmarks.get(org_id)}
+
+
+def add_bookmark_status(results):
+    """Fill is_bookmarked / bookmark_id for the current user with one query."""
+    bookmarks = bookmark_status([r['id'] for r in results])
+    for result in results:
+        result['is_bookmarked'] = result['id'] in bookmarks
+        result['bookmark_id'] = bookmarks.get(result['id'])
+    return results
+
+
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Organization):
+            if obj in session.dirty:
+                state = sa_inspect(obj)
+                changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+                if not changed - COUNTER_COLUMNS:
+                    continue
+            if obj.id is not None:
+                pending.add(obj.id)
+        elif isinstance(obj, (OrganizationPhoto, OrganizationSocialLink)):
+            if obj.organization_id is not None:
+                pending.add(obj.organization_id)
+            history = sa_inspect(obj).attrs.organization_id.history
+            pending.update(org_id for org_id in history.deleted if org_id is not None)
+
+
+def _make_commit_handler(app):
+    def _invalidate_after_commit(session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            invalidate_organization(*pending, app=app)
+    return _invalidate_after_commit
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_org_cache(app):
+    """Create the worker's cache and invalidate records when organizations are committed."""
+    cache = get_org_cache(app)
+    event.listen(Session, 'after_flush', _collect_changes)
+    event.listen(Session, 'after_commit', _make_commit_handler(app))
+    event.listen(Session, 'after_soft_rollback', _discard_pending)
+    return cache
@@ -0,0 +1,202 @@
+"""
+Crawler prerender pages for organizations, cached by (org id, updated_at, image).
+
+Rendered HTML is kept in a small in-process LRU and written to PRERENDER_CACHE_DIR
+so every worker (and a restarted one) can serve it straight from disk. A page is
+only regenerated when the organization's updated_at or its page image changes;
+the image is the logo, else the primary photo, which photo edits update without
+touching updated_at. `flask prerender` warms the directory for all approved
+organizations ahead of crawler bursts.
+"""
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
+
+from flask import current_app, request
+from markupsafe import escape
+from .cache import LRUCacheBackend
+from .metrics import observe_cache_lookup
+from .models import db, Organization
+from .org_cache import get_organization_record
+
+_memory_cache = LRUCacheBackend(max_entries=int(os.getenv('PRERENDER_MEMORY_ENTRIES', 1000)))
+
+
+def get_cache_dir(app=None):
+    app = app or current_app
+    cache_dir = app.config['PRERENDER_CACHE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_base_url():
+    return (current_app.config.get('PRERENDER_BASE_URL') or request.url_root).rstrip('/')
+
+
+def cache_key(org_id, updated_at, base_url, image=''):
+    stamp = updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at else '0'
+    picture = hashlib.sha1((image or '').encode('utf-8')).hexdigest()[:8]
+    host = hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:8]
+    return f"{org_id}-{stamp}-{picture}-{host}"
+
+
+def org_fields(org):
+    """Plain snapshot of the fields the page needs, safe to render off the request thread."""
+    return {
+        'id': org.id,
+        'name': org.name or '',
+        'description': (org.description or org.mission or '').strip()[:300],  # keep it short
+        'website': org.website or '',
+        'image': org.logo_url or org.primary_photo_url or '',
+        'updated_at': org.updated_at,
+    }
+
+
+def normalize_image_url(img, base_url):
+    """Map stored "/ads/..." or "uploads/..." paths to /api/uploads/<filename>; keep absolute URLs."""
+    if not img:
+        return ''
+    if img.startswith('http://') or img.startswith('https://'):
+        return img
+    candidate = img.lstrip('/')
+    if candidate.startswith('http://') or candidate.startswith('https://'):
+        return img
+    for prefix in ('api/uploads/', 'uploads/'):
+        if candidate.startswith(prefix):
+            candidate = unquote(candidate[len(prefix):])
+            break
+    # Sharded blob keys (blobs/ab/<sha>.png) are served by their full key
+    filename = candidate if candidate.startswith('blobs/') else candidate.split('/')[-1]
+    if not filename:
+        return ''
+    return f"{base_url}/api/uploads/{quote(filename, safe='/')}"
+
+
+def render_organization_html(fields, base_url):
+    """Return a small HTML page with meta tags and JSON-LD for crawlers and LLM scrapers."""
+    name = fields['name']
+    description = fields['description']
+    website = fields['website']
+    image_url = normalize_image_url(fields['image'], base_url)
+
+    jsonld = {
+        "@context": "https://schema.org",
+        "@type": "Organization",
+        "name": name,
+        "description": description,
+    }
+    if website:
+        jsonld["url"] = website
+    if image_url:
+        jsonld["logo"] = image_url
+
+    html_parts = [
+        '<!doctype html>',
+        '<html lang="en">',
+        '<head>',
+        '  <meta charset="utf-8">',
+        f'  <title>{escape(name) if name else "Organization"}</title>',
+        f'  <meta name="description" content="{escape(description)}">',
+    ]
+    if image_url:
+        html_parts.append(f'  <meta property="og:image" content="{escape(image_url)}">')
+        html_parts.append(f'  <meta name="twitter:image" content="{escape(image_url)}">')
+    if website:
+        html_parts.append(f'  <link rel="canonical" href="{escape(website)}">')
+
+    html_parts.append('  <script type="application/ld+json">')
+    html_parts.append(json.dumps(jsonld).replace('</', '<\\/'))
+    html_parts.append('  </script>')
+    html_parts.append('</head>')
+    html_parts.append('<body>')
+    html_parts.append(f'<h1>{escape(name)}</h1>')
+    if description:
+        html_parts.append(f'<p>{escape(description)}</p>')
+    html_parts.append('</body>')
+    html_parts.append('</html>')
+    return '\n'.join(html_parts)
+
+
+def write_cached_page(cache_dir, key, html):
+    """Atomically write a page and drop older renders of the same organization."""
+    org_id = key.split('-', 1)[0]
+    path = os.path.join(cache_dir, f"{key}.html")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    host = key.rsplit('-', 1)[-1]
+    for stale in glob.glob(os.path.join(cache_dir, f"{org_id}-*-{host}.html")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def read_cached_page(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, f"{key}.html"), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def get_prerendered_page(org_id):
+    """Return (html, updated_at, key) for an approved organization, or None if not public."""
+    org = get_organization_record(org_id)
+    if not org or not org.is_public:
+        return None
+
+    base_url = get_base_url()
+    fields = org.prerender_fields()
+    key = cache_key(org_id, org.updated_at, base_url, fields['image'])
+
+    html = _memory_cache.get(key)
+    observe_cache_lookup('prerender', html is not None)
+    if html is None:
+        cache_dir = get_cache_dir()
+        html = read_cached_page(cache_dir, key)
+        if html is None:
+            html = render_organization_html(fields, base_url)
+            write_cached_page(cache_dir, key, html)
+        _memory_cache.set(key, html)
+    return html, org.updated_at, key
+
+
+def prerender_all(base_url, cache_dir, workers=4, batch_size=500):
+    """Render every approved organization into cache_dir; returns (rendered, skipped).
+
+    Rows are read in batches on the calling thread (the DB session is not shared);
+    rendering and file writes for a batch run on a thread pool.
+    """
+    rendered = skipped = 0
+    os.makedirs(cache_dir, exist_ok=True)
+    query = Organization.query.filter(Organization.status == 'approved').order_by(Organization.id)
+
+    def _render(fields):
+        key = cache_key(fields['id'], fields['updated_at'], base_url, fields['image'])
+        if os.path.exists(os.path.join(cache_dir, f"{key}.html")):
+            return False
+        write_cached_page(cache_dir, key, render_organization_html(fields, base_url))
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        last_id = 0
+        while True:
+            batch = query.filter(Organization.id > last_id).limit(batch_size).all()
+            if not batch:
+                break
+            snapshots = [org_fields(o) for o in batch]
+            last_id = batch[-1].id
+            db.session.expunge_all()
+            for created in executor.map(_render, snapshots):
+                if created:
+                    rendered += 1
+                else:
+                    skipped += 1
+    return rendered, skipped
@@ -0,0 +1,148 @@
+"""
+Primary photo denormalized onto organizations.
+
+Cards show one image per organization: the photo flagged is_primary, otherwise
+the first by sort_order, then id. Resolving it used to require loading every
+photo of every listed organization. Instead the resolved image is stored on
+the organization itself:
+
+- primary_photo_url: the photo URL (external file_path or /uploads/<file_name>);
+- primary_photo_thumb_url: its 'thumb' WebP variant, once the image pipeline
+  has processed it;
+- primary_photo_variants: the photo's variants, from which the card's
+  variant URLs and srcset are built.
+
+The columns are kept current by session events. Any flush that adds, deletes
+or edits an OrganizationPhoto (including reordering it or getting its variants
+from the image pipeline) recomputes the affected organizations in the same
+transaction. The UPDATE keeps updated_at untouched. Bulk inserts that bypass
+the ORM (bench-seed, SQL imports) are covered by `flask backfill-primary-photos`.
+"""
+from flask import url_for
+from sqlalchemy import case, event, func, inspect as sa_inspect, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .image_pipeline import variant_urls_from
+from .models import db, Organization, OrganizationPhoto
+
+COLUMNS = ('primary_photo_url', 'primary_photo_thumb_url', 'primary_photo_variants')
+PRIMARY_PHOTO_ORDER = (case((OrganizationPhoto.is_primary.is_(True), 0), else_=1),
+                       func.coalesce(OrganizationPhoto.sort_order, 0), OrganizationPhoto.id)
+CHUNK_SIZE = 500
+
+_PENDING_KEY = 'primary_photo_pending'
+
+
+def photo_url(file_path, file_name):
+    """Prefer an external file_path, falling back to the local upload URL."""
+    if file_path:
+        return file_path
+    try:
+        return url_for('uploaded_file', filename=file_name, _external=False)
+    except Exception:
+        return f"/uploads/{file_name}"
+
+
+def primary_photo_values(photo):
+    """Column values for an organization whose primary photo is `photo` (None for no photo)."""
+    if photo is None:
+        return dict.fromkeys(COLUMNS)
+    urls, _ = variant_urls_from(photo.variants)
+    return {
+        'primary_photo_url': photo_url(photo.file_path, photo.file_name),
+        'primary_photo_thumb_url': urls.get('thumb'),
+        'primary_photo_variants': photo.variants or None,
+    }
+
+
+def resolve_primary_photos(session, org_ids):
+    """{organization_id: column values} for org_ids, with one query per chunk."""
+    resolved = {}
+    org_ids = list(org_ids)
+    for start in range(0, len(org_ids), CHUNK_SIZE):
+        chunk = org_ids[start:start + CHUNK_SIZE]
+        resolved.update((org_id, primary_photo_values(None)) for org_id in chunk)
+        photos = session.query(
+            OrganizationPhoto.organization_id, OrganizationPhoto.file_path, OrganizationPhoto.file_name,
+            OrganizationPhoto.variants
+        ).filter(OrganizationPhoto.organization_id.in_(chunk)) \
+            .order_by(OrganizationPhoto.organization_id, *PRIMARY_PHOTO_ORDER)
+        seen = set()
+        for photo in photos:
+            if photo.organization_id not in seen:
+                seen.add(photo.organization_id)
+                resolved[photo.organization_id] = primary_photo_values(photo)
+    return resolved
+
+
+def refresh_primary_photos(session, org_ids):
+    """Recompute and store the primary photo columns; returns how many organizations changed."""
+    resolved = resolve_primary_photos(session, org_ids)
+    current = {}
+    for start in range(0, len(resolved), CHUNK_SIZE):
+        chunk = list(resolved)[start:start + CHUNK_SIZE]
+        current.update((row[0], dict(zip(COLUMNS, row[1:]))) for row in session.query(
+            Organization.id, *(getattr(Organization, column) for column in COLUMNS)
+        ).filter(Organization.id.in_(chunk)))
+
+    changed = 0
+    for org_id, values in resolved.items():
+        if org_id not in current or current[org_id] == values:
+            continue
+        session.execute(update(Organization).where(Organization.id == org_id)
+                        .values(updated_at=Organization.updated_at, **values))
+        changed += 1
+        # Keep already loaded instances in step without marking them dirty
+        org = session.identity_map.get(identity_key(Organization, org_id))
+        if org is not None:
+            for column, value in values.items():
+                set_committed_value(org, column, value)
+    return changed
+
+
+def backfill_primary_photos(batch_size=CHUNK_SIZE):
+    """Recompute the columns for every organization, committing per batch; returns the number changed."""
+    changed, last_id = 0, 0
+    while True:
+        ids = [row.id for row in db.session.query(Organization.id).filter(Organization.id > last_id)
+               .order_by(Organization.id).limit(batch_size)]
+        if not ids:
+            return changed
+        changed += refresh_primary_photos(db.session, ids)
+        db.session.commit()
+        last_id = ids[-1]
+
+
+def _collect_photo_changes(session, flush_context, instances):
+    # New photos may not know their organization_id until the flush, so keep the objects
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.new | session.dirty | session.deleted:
+        if not isinstance(obj, OrganizationPhoto):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        pending.add(obj)
+        history = sa_inspect(obj).attrs.organization_id.history
+        pending.update(org_id for org_id in history.deleted if org_id is not None)
+
+
+def _refresh_after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        org_ids = {item.organization_id if isinstance(item, OrganizationPhoto) else item for item in pending}
+        org_ids.discard(None)
+        with session.no_autoflush:
+            refresh_primary_photos(session, org_ids)
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_primary_photos(app):
+    """Keep organizations' primary photo columns in step with their photos."""
+    event.listen(Session, 'before_flush', _collect_photo_changes)
+    event.listen(Session, 'after_flush_postexec', _refresh_after_flush)
+    event.listen(Session, 'after_soft_rollback', _discard_pending)
@@ -0,0 +1,286 @@
+"""
+Relevance ranking for organization search.
+
+A per-worker term-statistics index over approved organizations holds, for every
+term, the positions of the documents containing it and its frequency in each
+field (name, mission, description) as NumPy arrays, plus per-field document
+lengths and the popularity / verification / recency signals. Ranking a result
+set is then a handful of vectorized operations per query term:
+
+    text  = sum over fields and terms of  w_field * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+    boost = w_popularity * popularity + w_verification * verification + w_recency * recency
+    score = text * (1 + boost)
+
+popularity is log1p(3 * bookmarks + views) scaled to [0, 1], verification maps
+basic/verified/premium (plus is_verified) to [0, 1] and recency halves every
+SEARCH_RECENCY_HALF_LIFE_DAYS. Ties, including candidates that matched on
+category or city only, are ordered by the boost alone.
+
+The index is rebuilt from one query when the 'organizations' response cache tag
+changes or after SEARCH_RANKING_TTL seconds. Only the very first build runs in
+the request; afterwards a background thread rebuilds while searches keep using
+the previous snapshot (organizations it does not know yet are ranked after the
+known ones). Rebuilds start at most every SEARCH_RANKING_REBUILD_INTERVAL
+seconds, so a burst of writes costs one rebuild. Weights come from
+SEARCH_RANK_WEIGHTS ("name=3,mission=1.5,...").
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+
+from .models import db, Organization
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+    print("Warning: numpy not installed. Search results will be ordered by popularity only.")
+
+FIELDS = ('name', 'mission', 'description')
+DEFAULT_WEIGHTS = {
+    'name': 3.0, 'mission': 1.5, 'description': 1.0,
+    'popularity': 0.5, 'verification': 0.3, 'recency': 0.2,
+}
+VERIFICATION_SCORES = {'basic': 0.0, 'verified': 0.6, 'premium': 1.0}
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or',
+    'that', 'the', 'their', 'to', 'with',
+))
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase, accent-folded alphanumeric terms without stopwords."""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return [term for term in _TOKEN.findall(folded) if term not in STOPWORDS]
+
+
+def normalize_query(text):
+    """Case-, accent- and whitespace-insensitive form of a search string, for cache keys."""
+    if not text:
+        return ''
+    folded = unicodedata.normalize('NFKD', text)
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    return ' '.join(folded.casefold().split())
+
+
+def parse_weights(value):
+    """DEFAULT_WEIGHTS overridden by a "key=value,key=value" string; unknown keys are rejected."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in (value or '').split(','):
+        if not part.strip():
+            continue
+        key, _, number = part.partition('=')
+        key = key.strip()
+        if key not in weights:
+            raise ValueError(f"Unknown ranking weight {key!r}; expected one of {', '.join(weights)}")
+        weights[key] = float(number)
+    return weights
+
+
+def numpy_available():
+    return np is not None
+
+
+class RankingIndex:
+    """Term statistics and ranking signals for a snapshot of approved organizations."""
+
+    def __init__(self, rows, weights=None, k1=1.2, b=0.75, recency_half_life_days=365, now=None):
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.k1, self.b = k1, b
+        now = now or datetime.utcnow()
+
+        ids, lengths, signals = [], [[] for _ in FIELDS], [[], [], []]
+        postings = {}
+        for position, row in enumerate(rows):
+            ids.append(row.id)
+            for f, field in enumerate(FIELDS):
+                counts = Counter(tokenize(getattr(row, field)))
+                lengths[f].append(sum(counts.values()))
+                for term, tf in counts.items():
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = {}
+                    entry.setdefault(position, [0] * len(FIELDS))[f] = tf
+            signals[0].append(3 * (row.bookmark_count or 0) + (row.view_count or 0))
+            signals[1].append(min(1.0, VERIFICATION_SCORES.get(row.verification_level, 0.0) + (0.4 if row.is_verified else 0.0)))
+            age_days = max((now - row.created_at).total_seconds() / 86400, 0.0) if row.created_at else None
+            signals[2].append(0.5 ** (age_days / recency_half_life_days) if age_days is not None else 0.0)
+
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind='stable')
+        rank_of = np.empty(len(ids), dtype=np.int32)
+        rank_of[order] = np.arange(len(ids), dtype=np.int32)
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.size = len(ids)
+        self.lengths = np.asarray(lengths, dtype=np.float32).reshape(len(FIELDS), -1)[:, order]
+        self.avg_lengths = np.maximum(self.lengths.mean(axis=1), 1.0) if self.size else np.ones(len(FIELDS), dtype=np.float32)
+
+        popularity = np.log1p(np.asarray(signals[0], dtype=np.float32))[order]
+        top = popularity.max() if self.size else 0.0
+        self.popularity = popularity / top if top > 0 else popularity
+        self.verification = np.asarray(signals[1], dtype=np.float32)[order]
+        self.recency = np.asarray(signals[2], dtype=np.float32)[order]
+
+        self.postings = {}
+        for term, entry in postings.items():
+            docs = rank_of[np.fromiter(entry.keys(), dtype=np.int32, count=len(entry))]
+            tfs = np.asarray(list(entry.values()), dtype=np.float32).T
+            sort = np.argsort(docs)
+            self.postings[term] = (docs[sort], tfs[:, sort])
+
+    def idf(self, term):
+        df = len(self.postings[term][0])
+        return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    def text_scores(self, terms):
+        """BM25 summed over the weighted fields, for every document."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        field_weights = np.asarray([self.weights[field] for field in FIELDS], dtype=np.float32)[:, None]
+        for term in set(terms):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[:, docs] / self.avg_lengths[:, None])
+            contribution = (field_weights * tfs * (self.k1 + 1) / (tfs + norm)).sum(axis=0)
+            scores[docs] += self.idf(term) * contribution
+        return scores
+
+    def boosts(self):
+        w = self.weights
+        return w['popularity'] * self.popularity + w['verification'] * self.verification + w['recency'] * self.recency
+
+    def rank(self, query, candidate_ids=None):
+        """Order candidate ids (all indexed ids when None) best first.
+
+        Candidates the snapshot does not know yet keep their given order after
+        the ranked ones.
+        """
+        if candidate_ids is None:
+            positions = np.arange(self.size)
+            unknown = []
+        else:
+            candidates = np.asarray(candidate_ids, dtype=np.int64)
+            positions = np.searchsorted(self.ids, candidates)
+            known = positions < self.size
+            known[known] = self.ids[positions[known]] == candidates[known]
+            positions = positions[known]
+            unknown = candidates[~known].tolist()
+        if not len(positions):
+            return unknown
+
+        boosts = self.boosts()[positions]
+        scores = self.text_scores(tokenize(query))[positions] * (1 + boosts)
+        order = np.lexsort((-boosts, -scores))
+        return self.ids[positions[order]].tolist() + unknown
+
+    def matching(self, query):
+        """Ids of indexed documents containing at least one query term."""
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms:
+            return []
+        return self.ids[np.unique(np.concatenate([self.postings[term][0] for term in terms]))].tolist()
+
+    def scores(self, query, ids):
+        """{id: score} for indexed ids, for explaining or benchmarking a ranking."""
+        candidates = np.asarray(ids, dtype=np.int64)
+        positions = np.clip(np.searchsorted(self.ids, candidates), 0, max(self.size - 1, 0))
+        text = self.text_scores(tokenize(query))
+        boosts = self.boosts()
+        return {int(i): float(text[p] * (1 + boosts[p])) for i, p in zip(candidates, positions)
+                if self.size and self.ids[p] == i}
+
+
+_index = None
+_index_state = None
+_rebuilding = False
+_index_lock = threading.Lock()
+
+
+def _index_rows():
+    return db.session.query(
+        Organization.id, Organization.name, Organization.mission, Organization.description,
+        Organization.bookmark_count, Organization.view_count, Organization.verification_level,
+        Organization.is_verified, Organization.created_at,
+    ).filter(Organization.status == 'approved').execution_options(yield_per=2000)
+
+
+def build_index(config=None):
+    config = config or current_app.config
+    return RankingIndex(
+        _index_rows(),
+        weights=parse_weights(config.get('SEARCH_RANK_WEIGHTS')),
+        k1=config.get('SEARCH_BM25_K1', 1.2),
+        b=config.get('SEARCH_BM25_B', 0.75),
+        recency_half_life_days=config.get('SEARCH_RECENCY_HALF_LIFE_DAYS', 365),
+    )
+
+
+def _tag_version():
+    cache = current_app.extensions.get('response_cache')
+    return cache.tag_versions(('organizations',)) if cache is not None else None
+
+
+def _rebuild(app, version):
+    global _index, _index_state, _rebuilding
+    try:
+        with app.app_context():
+            index = build_index(app.config)
+        with _index_lock:
+            _index, _index_state = index, (version, time.monotonic())
+    except Exception:
+        app.logger.exception('Rebuilding the search ranking index failed; keeping the previous one')
+    finally:
+        _rebuilding = False
+
+
+def get_ranking_index():
+    """The worker's index, refreshed in the background when organizations changed or it expired;
+    None without numpy."""
+    global _index, _index_state, _rebuilding
+    if np is None:
+        return None
+    config = current_app.config
+    version = _tag_version()
+    state = _index_state
+    if _index is not None:
+        age = time.monotonic() - state[1]
+        stale = age >= config.get('SEARCH_RANKING_TTL', 300) or (
+            state[0] != version and age >= config.get('SEARCH_RANKING_REBUILD_INTERVAL', 30))
+        if not stale or _rebuilding:
+            return _index
+    with _index_lock:
+        if _index is None:
+            _index = build_index()
+            _index_state = (version, time.monotonic())
+        elif not _rebuilding and _index_state is state:
+            _rebuilding = True
+            threading.Thread(target=_rebuild, args=(current_app._get_current_object(), version),
+                             name='ranking-index-rebuild', daemon=True).start()
+        return _index
+
+
+def reset_ranking_index():
+    global _index, _index_state
+    with _index_lock:
+        _index = _index_state = None
+
+
+def relevance_enabled(sort=None):
+    mode = sort or current_app.config.get('SEARCH_RANKING') or 'relevance'
+    return mode == 'relevance' and np is not None
+
+
+def rank_organizations(query, text):
+    """Ids of an Organization query's rows ordered by relevance to `text`."""
+    candidate_ids = [row[0] for row in query.with_entities(Organization.id)]
+    index = get_ranking_index()
+    return index.rank(text, candidate_ids) if index is not None else candidate_ids
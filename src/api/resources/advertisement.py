@@ -4,12 +4,14 @@ from flask_jwt_extended import jwt_required
 from ..core import api
 from ..models import db, Advertisement
 from ..utils import serialize_advertisement
+from ..cache import cached_response
 
 ad_ns = api.namespace('advertisements', description='Advertisement operations')
 
 
 @ad_ns.route('')
 class AdvertisementList(Resource):
+    @cached_response(tags=('advertisements',))
     def get(self):
         """List advertisements, optionally filtered by placement and only active ones by default."""
         placement = request.args.get('placement')
@@ -72,6 +74,7 @@ class AdvertisementList(Resource):
         200: 'Active advertisements retrieved successfully',
         500: 'Failed to retrieve advertisements'
     })
+    @cached_response(tags=('advertisements', 'organizations'))
     def get(self):
         try:
             args = ad_parser.parse_args()
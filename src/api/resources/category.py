@@ -3,7 +3,11 @@ from flask import current_app
 from ..models import db, Category, Organization
 from ..core import api
 from ..schemas import pagination_parser
-from ..utils import paginate, serialize_organization
+from ..utils import paginate
+from ..cache import cached_response
+from ..db_routing import read_replica
+from ..list_view import organization_fragment_map, organization_fragments
+from ..serialization import encode_fragment, extend_fragment, join_array, json_response, splice_into
 from sqlalchemy import desc, func, or_
 
 category_ns = api.namespace('categories', description='Category operations')
@@ -18,6 +22,8 @@ category_list_parser.add_argument('per_page', type=int, default=3, help='Number
 class CategoryList(Resource):
     @category_ns.expect(category_list_parser)
     @category_ns.doc(responses={200: 'List of categories retrieved successfully'})
+    @cached_response(tags=('categories', 'organizations'), max_age=300)
+    @read_replica
     def get(self):
         """
         Get a list of all categories.
@@ -28,36 +34,43 @@ class CategoryList(Resource):
             include_orgs = args['include_organizations']
             per_page = args['per_page']
 
-            query = Category.query.order_by(Category.sort_order, Category.name)
+            categories = Category.query.order_by(Category.sort_order, Category.name).all()
+            approved = Organization.status == 'approved'
+            counts = dict(db.session.query(Organization.category_id, func.count(Organization.id))
+                          .filter(approved).group_by(Organization.category_id))
 
+            previews = {}
             if include_orgs:
-                # Using joinedload to efficiently fetch organizations
-                from sqlalchemy.orm import joinedload
-                query = query.options(joinedload(Category.organizations))
-
-            categories = query.all()
+                # Latest approved organizations per category, ranked in SQL
+                ranked = db.session.query(
+                    Organization.id, Organization.category_id,
+                    func.row_number().over(partition_by=Organization.category_id,
+                                           order_by=desc(Organization.created_at)).label('position')
+                ).filter(approved).subquery()
+                rows = db.session.query(ranked.c.id, ranked.c.category_id) \
+                    .filter(ranked.c.position <= per_page).order_by(ranked.c.category_id, ranked.c.position).all()
+                fragments = organization_fragment_map([row.id for row in rows])
+                for row in rows:
+                    if row.id in fragments:
+                        previews.setdefault(row.category_id, []).append(fragments[row.id])
 
             result = []
             for c in categories:
-                category_data = {
+                category_data = encode_fragment({
                     'id': c.id,
                     'name': c.name,
                     'description': c.description,
                     'icon_url': c.icon_url,
                     'color_code': c.color_code,
-                    'organization_count': len([o for o in c.organizations if o.status == 'approved'])
-                }
+                    'organization_count': counts.get(c.id, 0)
+                })
 
                 if include_orgs:
-                    # Filter for approved organizations and limit the number
-                    approved_orgs = [o for o in c.organizations if o.status == 'approved']
-                    # Sort by creation date to get the latest ones
-                    sorted_orgs = sorted(approved_orgs, key=lambda o: o.created_at, reverse=True)
-                    category_data['organizations'] = [serialize_organization(o) for o in sorted_orgs[:per_page]]
+                    category_data = splice_into(category_data, 'organizations', previews.get(c.id, []))
 
                 result.append(category_data)
 
-            return result
+            return json_response(join_array(result))
         except Exception as e:
             # Log full traceback to server logs for triage (Render captures stdout/stderr)
             current_app.logger.exception('Failed to retrieve categories')
@@ -70,18 +83,15 @@ class CategoryOrganizations(Resource):
         200: 'Organizations in category retrieved successfully',
         404: 'Category not found'
     })
+    @read_replica
     def get(self, category_id):
-        from sqlalchemy.orm import joinedload
         cat = Category.query.get(category_id) or category_ns.abort(404, 'Category not found')
         args = pagination_parser.parse_args()
-        query = Organization.query.options(
-            joinedload(Organization.photos),
-            joinedload(Organization.social_links),
-            joinedload(Organization.category),
-            joinedload(Organization.location)
-        ).filter_by(category_id=category_id, status='approved')
-        items, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
-        return {'category': {'id': cat.id, 'name': cat.name, 'description': cat.description}, 'organizations': [serialize_organization(o) for o in items], 'pagination': pag}
+        query = Organization.query.with_entities(Organization.id).filter_by(category_id=category_id, status='approved')
+        rows, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
+        body = encode_fragment({'category': {'id': cat.id, 'name': cat.name, 'description': cat.description}})
+        body = splice_into(body, 'organizations', organization_fragments([row.id for row in rows]))
+        return json_response(extend_fragment(body, {'pagination': pag}))
 
 @category_ns.route('/slug/<string:slug>')
 class CategoryBySlug(Resource):
@@ -90,6 +100,7 @@ class CategoryBySlug(Resource):
         200: 'Category and organizations retrieved successfully',
         404: 'Category not found'
     })
+    @read_replica
     def get(self, slug):
         """
         Get a single category and its organizations by slug.
@@ -111,17 +122,11 @@ class CategoryBySlug(Resource):
 
         args = pagination_parser.parse_args()
 
-        from sqlalchemy.orm import joinedload
-        query = Organization.query.options(
-            joinedload(Organization.photos),
-            joinedload(Organization.social_links),
-            joinedload(Organization.category),
-            joinedload(Organization.location)
-        ).filter_by(category_id=cat.id, status='approved')
+        query = Organization.query.with_entities(Organization.id).filter_by(category_id=cat.id, status='approved')
 
-        items, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
+        rows, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
 
-        return {
+        body = encode_fragment({
             'category': {
                 'id': cat.id,
                 'name': cat.name,
@@ -129,6 +134,6 @@ class CategoryBySlug(Resource):
                 'icon_url': cat.icon_url,
                 'color_code': cat.color_code,
             },
-            'organizations': [serialize_organization(o) for o in items],
-            'pagination': pag
-        }
+        })
+        body = splice_into(body, 'organizations', organization_fragments([row.id for row in rows]))
+        return json_response(extend_fragment(body, {'pagination': pag}))
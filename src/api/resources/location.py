@@ -2,21 +2,26 @@ from flask_restx import Resource
 from ..core import api
 from ..schemas import location_search_parser, location_model
 from ..models import db, Location, Organization
-from sqlalchemy import or_
+from sqlalchemy import func, or_
+from ..cache import cached_response
+from ..db_routing import read_replica
 
 location_ns = api.namespace('locations', description='Location operations')
 
 @location_ns.route('')
 class LocationList(Resource):
     @location_ns.doc(responses={200: 'List of locations retrieved successfully'})
+    @cached_response(tags=('locations', 'organizations'), max_age=300)
+    @read_replica
     def get(self):
         locations = Location.query.filter_by(is_active=True).all()
+        # One grouped count instead of a COUNT query per location
+        counts = dict(db.session.query(Organization.location_id, func.count(Organization.id)).filter(
+            Organization.status == 'approved', Organization.location_id.isnot(None)
+        ).group_by(Organization.location_id))
         result = []
         for loc in locations:
-            org_count = Organization.query.filter_by(
-                location_id=loc.id,
-                status='approved'
-            ).count()
+            org_count = counts.get(loc.id, 0)
             result.append({
                 'id': loc.id,
                 'country': loc.country,
@@ -35,6 +40,7 @@ class LocationSearch(Resource):
         200: 'Location search results',
         400: 'Query too short'
     })
+    @read_replica
     def get(self):
         args = location_search_parser.parse_args()
         q = args.q.strip()
@@ -1,18 +1,25 @@
 from flask import request, current_app
 from flask_restx import Resource, marshal
 from flask_jwt_extended import create_access_token, create_refresh_token
-from werkzeug.utils import secure_filename
-import os
-import uuid
 from ..models import db, User, Category, Organization, OrganizationPhoto
 from ..core import api
 from ..schemas import org_signup_parser, user_model, organization_model
 from ..auth_utils import validate_email_format, validate_password
 from ..utils import log_action
+from ..image_pipeline import schedule_photo_processing
+from ..storage import store_upload, UploadTooLargeError
 
 # Create a new namespace for this specific endpoint to keep it organized
 org_signup_ns = api.namespace('org-signup', description='Operations for organization signup')
 
+
+def _store_or_abort(file_storage):
+    """Store an upload as a Blob, turning an oversized file into a 413."""
+    try:
+        return store_upload(file_storage)
+    except UploadTooLargeError as e:
+        org_signup_ns.abort(413, str(e))
+
 @org_signup_ns.route('/categories')
 class SimpleCategoryList(Resource):
     @org_signup_ns.doc(responses={200: 'Simple list of categories retrieved successfully'})
@@ -70,13 +77,12 @@ class OrganizationSignup(Resource):
             db.session.add(user)
             db.session.flush()
 
-            # Handle file uploads
-            logo_filename = None
+            # Handle file uploads: streamed to content-addressed storage, deduplicated by hash
+            logo_blob = None
             if 'logo' in request.files:
                 logo_file = request.files['logo']
                 if logo_file:
-                    logo_filename = secure_filename(f"{uuid.uuid4()}_{logo_file.filename}")
-                    logo_file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], logo_filename))
+                    logo_blob = _store_or_abort(logo_file)
 
             org = Organization(
                 name=args.organization_name.strip(),
@@ -92,27 +98,34 @@ class OrganizationSignup(Resource):
                 operating_hours=args.get('operating_hours', '').strip(),
                 admin_user_id=user.id,
                 status='pending',
-                logo_url=logo_filename
+                logo_url=logo_blob.storage_key if logo_blob else None,
+                logo_blob_id=logo_blob.id if logo_blob else None
             )
             db.session.add(org)
             db.session.flush() # Flush to get org.id for photos
 
+            gallery_photos = []
             if 'gallery' in request.files:
                 gallery_files = request.files.getlist('gallery')
                 for gallery_file in gallery_files:
                     if gallery_file:
-                        gallery_filename = secure_filename(f"{uuid.uuid4()}_{gallery_file.filename}")
-                        gallery_file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], gallery_filename))
+                        blob = _store_or_abort(gallery_file)
                         photo = OrganizationPhoto(
                             organization_id=org.id,
-                            file_name=gallery_filename,
-                            file_path=gallery_filename,
+                            blob_id=blob.id,
+                            file_name=blob.storage_key,
+                            file_path=blob.storage_key,
+                            file_size=blob.size,
                             alt_text=f"Gallery image for {org.name}"
                         )
                         db.session.add(photo)
+                        gallery_photos.append(photo)
 
             db.session.commit()
 
+            # Thumbnails and WebP/AVIF variants are generated off the request thread
+            schedule_photo_processing([p.id for p in gallery_photos])
+
             access_token = create_access_token(
                 identity=str(user.id),
                 additional_claims={
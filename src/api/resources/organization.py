@@ -2,12 +2,21 @@ from flask import request
 from flask_restx import Resource, marshal, Namespace
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..core import api
-from ..schemas import org_parser, org_create_parser, organization_model
+from ..schemas import org_parser, org_create_parser, org_import_parser, org_export_parser, organization_model
 from ..models import db, Organization, Category, User, Location
 from sqlalchemy import or_, desc
 from sqlalchemy.orm import joinedload
-from ..utils import paginate, serialize_organization, log_action
+from ..utils import paginate, serialize_organization, log_action, check_admin_role
+from ..bulk_import import read_records, detect_format, import_organizations
+from ..export import export_response, parse_updated_since
+from ..cache import cached_response
+from ..db_routing import read_replica
+from ..org_cache import bookmark_fields, bookmark_status, get_organization_record, get_organization_records, invalidate_organization
+from ..list_view import organization_fragments
+from ..serialization import json_response, splice_list
+from werkzeug.exceptions import HTTPException
 from flask import jsonify, url_for
+import csv
 import re
 import time
 import os
@@ -37,15 +46,12 @@ class OrganizationList(Resource):
         200: 'List of organizations retrieved successfully',
         500: 'Failed to fetch organizations'
     })
+    @cached_response(tags=('organizations', 'categories', 'locations'), personalized=True)
+    @read_replica
     def get(self):
         try:
             args = org_parser.parse_args()
-            query = Organization.query.options(
-                joinedload(Organization.photos),
-                joinedload(Organization.social_links),
-                joinedload(Organization.category),
-                joinedload(Organization.location)
-            )
+            query = Organization.query.with_entities(Organization.id)
             if args.status: query = query.filter(Organization.status == args.status)
             else: query = query.filter(Organization.status == 'approved')
             if args.category_id: query = query.filter(Organization.category_id == args.category_id)
@@ -57,8 +63,9 @@ class OrganizationList(Resource):
                 s = f"%{args.search}%"
                 query = query.filter(or_(Organization.name.ilike(s), Organization.description.ilike(s), Organization.mission.ilike(s)))
 
-            items, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
-            return {'organizations': [serialize_organization(o) for o in items], 'pagination': pag}
+            rows, pag = paginate(query.order_by(desc(Organization.created_at)), args.page, args.per_page)
+            fragments = organization_fragments([row.id for row in rows])
+            return json_response(splice_list('organizations', fragments, {'pagination': pag}))
         except Exception: org_ns.abort(500, 'Failed to fetch organizations')
 
     @jwt_required()
@@ -102,12 +109,7 @@ class OrganizationDetail(Resource):
     def get(self, org_id):
         """Get organization details."""
         try:
-            org = Organization.query.options(
-                joinedload(Organization.photos),
-                joinedload(Organization.social_links),
-                joinedload(Organization.category),
-                joinedload(Organization.location)
-            ).get(org_id) or org_ns.abort(404, 'Organization not found')
+            org = get_organization_record(org_id) or org_ns.abort(404, 'Organization not found')
 
             is_admin = False
             current_user_id = None
@@ -129,12 +131,16 @@ class OrganizationDetail(Resource):
             if org.status != 'approved' and not is_admin:
                 org_ns.abort(404, 'Organization not found')
 
-            # Increment view count for public views
+            # Increment view count for public views (atomic, without touching updated_at)
             if not is_admin:
-                org.view_count = (org.view_count or 0) + 1
+                Organization.query.filter_by(id=org_id).update(
+                    {Organization.view_count: db.func.coalesce(Organization.view_count, 0) + 1,
+                     Organization.updated_at: Organization.updated_at},
+                    synchronize_session=False)
                 db.session.commit()
 
-            return serialize_organization(org)
+            return json_response(org.encoded(bookmark_fields(org.id, bookmark_status([org.id]))))
+        except HTTPException: raise
         except Exception as e:
             print(f"Error in organization detail: {e}")
             org_ns.abort(500, f'Failed to fetch organization: {str(e)}')
@@ -181,6 +187,7 @@ class OrganizationDetail(Resource):
 
             if changes:
                 db.session.commit()
+                invalidate_organization(org.id)
                 log_action(user.id, 'update', 'organization', org.id, None, changes)
             else:
                 # Nothing changed
@@ -194,8 +201,9 @@ class OrganizationDetail(Resource):
 @org_ns.route('/<int:org_id>/contact')
 class OrganizationContact(Resource):
     def get(self, org_id):
-        org = Organization.query.filter_by(id=org_id, status='approved').first() or org_ns.abort(404, 'Organization not found')
-        return {'contact': {'name': org.name, 'email': org.email, 'phone': org.phone, 'address': org.address, 'website': org.website}}
+        org = get_organization_record(org_id)
+        if not org or not org.is_public: org_ns.abort(404, 'Organization not found')
+        return {'contact': org.contact()}
 
 from flask import url_for
 from flask_restx import Resource, marshal
@@ -209,32 +217,74 @@ class OrganizationPhotos(Resource):
     })
     def get(self, org_id):
         try:
-            org = Organization.query.get(org_id) or org_ns.abort(404, 'Organization not found')
-
-            serialized_photos = []
-            for p in org.photos:
-                # Prioritize external file_path, fall back to local file_name
-                if p.file_path:
-                    photo_url = p.file_path
-                else:
-                    try:
-                        photo_url = url_for('uploaded_file', filename=p.file_name, _external=False)
-                    except:
-                        photo_url = f"/uploads/{p.file_name}"
-
-                serialized_photos.append({
-                    'id': p.id,
-                    'url': photo_url,
-                    'alt_text': p.alt_text
-                })
-            return serialized_photos
+            org = get_organization_record(org_id) or org_ns.abort(404, 'Organization not found')
+            # Prioritizes external file_path, falling back to the local file_name
+            return org.photo_list()
+        except HTTPException: raise
         except Exception:
             org_ns.abort(500, 'Failed to fetch photos')
 
 
+@org_ns.route('/export')
+class OrganizationExport(Resource):
+    @org_ns.expect(org_export_parser)
+    @org_ns.doc(responses={
+        200: 'Streamed CSV or NDJSON of approved organizations',
+        304: 'Not modified since the client copy',
+        400: 'Invalid updated_since'
+    })
+    @read_replica
+    def get(self):
+        """Export all approved organizations with category and location flattened."""
+        args = org_export_parser.parse_args()
+        updated_since = None
+        if args['updated_since']:
+            try:
+                updated_since = parse_updated_since(args['updated_since'])
+            except ValueError:
+                org_ns.abort(400, 'updated_since must be an ISO 8601 date or datetime')
+        return export_response(args['format'], updated_since, compress=args['gzip'])
+
+
+@org_ns.route('/import')
+class OrganizationImport(Resource):
+    @jwt_required()
+    @org_ns.expect(org_import_parser)
+    @org_ns.doc(responses={
+        200: 'Import report with per-row errors',
+        400: 'Unreadable file or unknown format',
+        403: 'Admin access required'
+    })
+    def post(self):
+        """Bulk-import (upsert) organizations from a CSV or JSON Lines upload. Platform admins only."""
+        uid = get_jwt_identity()
+        check_admin_role(uid)
+        args = org_import_parser.parse_args()
+        upload = args['file']
+        try:
+            fmt = args['format'] or detect_format(upload.filename)
+        except ValueError as e:
+            org_ns.abort(400, str(e))
+
+        started = time.perf_counter()
+        try:
+            report = import_organizations(read_records(upload.stream, fmt), key=args['key'], dry_run=args['dry_run'])
+        except (UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            org_ns.abort(400, f'Could not read the file: {e}')
+
+        result = dict(report.as_dict(), dry_run=args['dry_run'],
+                      elapsed_seconds=round(time.perf_counter() - started, 3))
+        if not args['dry_run']:
+            log_action(uid, 'import', 'organization', None, None,
+                       {'file': upload.filename, 'created': report.created, 'updated': report.updated, 'failed': report.failed})
+        return result, 200
+
+
 @org_ns.route('/ai-search')
 class OrganizationAiSearch(Resource):
     @org_ns.doc(params={'q': 'Search query', 'limit': 'Maximum results'}, responses={200: 'OK'})
+    @read_replica
     def get(self):
         """Return concise, LLM-optimized summaries for organizations matching query."""
         try:
@@ -255,12 +305,14 @@ class OrganizationAiSearch(Resource):
                 return {'results': []}
 
             s = f"%{q}%"
-            query = Organization.query.filter(Organization.status == 'approved').filter(
+            query = db.session.query(Organization.id).filter(Organization.status == 'approved').filter(
                 or_(Organization.name.ilike(s), Organization.mission.ilike(s), Organization.description.ilike(s))
             ).order_by(desc(Organization.view_count))
+            ids = [row.id for row in query.limit(limit)]
+            records = get_organization_records(ids)
 
             results = []
-            for org in query.limit(limit).all():
+            for org in (records[org_id] for org_id in ids if org_id in records):
                 # concise summary suitable for LLMs: one sentence, factual
                 short = org.mission or org.description or ''
                 short = (short[:240] + '...') if len(short) > 240 else short
@@ -276,8 +328,8 @@ class OrganizationAiSearch(Resource):
                     'id': org.id,
                     'name': org.name,
                     'summary': short,
-                    'categories': [org.category.name] if org.category else [],
-                    'location': org.location.city if org.location and getattr(org.location, 'city', None) else None,
+                    'categories': [org.category_name] if org.category_name else [],
+                    'location': org.city or None,
                     'website': org.website,
                     'url': path
                 })
@@ -291,11 +343,13 @@ class OrganizationAiSearch(Resource):
 @org_ns.route('/<int:org_id>/summary')
 @org_ns.param('org_id', 'The organization identifier')
 class OrganizationSummary(Resource):
+    @cached_response(tags=('organizations', 'categories', 'locations'), max_age=300)
+    @read_replica
     def get(self, org_id):
         """Return AI-optimized plain text summary and structured JSON for a single organization."""
         try:
-            org = Organization.query.options(joinedload(Organization.category), joinedload(Organization.location)).get(org_id) or org_ns.abort(404, 'Organization not found')
-            if org.status != 'approved': org_ns.abort(404, 'Organization not found')
+            org = get_organization_record(org_id)
+            if not org or not org.is_public: org_ns.abort(404, 'Organization not found')
 
             # Plain text summary - concise, factual, 2-3 sentences
             sentences = []
@@ -305,13 +359,7 @@ class OrganizationSummary(Resource):
                 d = org.description.strip()
                 sentences.append(d if len(d) < 240 else d[:237] + '...')
 
-            location = None
-            if org.location:
-                parts = []
-                if getattr(org.location, 'city', None): parts.append(org.location.city)
-                if getattr(org.location, 'state_province', None): parts.append(org.location.state_province)
-                if getattr(org.location, 'country', None): parts.append(org.location.country)
-                location = ', '.join(parts) if parts else None
+            location = org.location_text()
 
             plain = ' '.join(sentences) or f"{org.name} is a charitable organization."
 
@@ -320,7 +368,7 @@ class OrganizationSummary(Resource):
                 'name': org.name,
                 'mission': org.mission,
                 'description': org.description,
-                'category': org.category.name if org.category else None,
+                'category': org.category_name,
                 'location': location,
                 'website': org.website,
                 'email': org.email,
@@ -328,6 +376,7 @@ class OrganizationSummary(Resource):
             }
 
             return {'plain_text_summary': plain, 'structured': structured}
+        except HTTPException: raise
         except Exception as e:
             print(f"Organization summary error: {e}")
             org_ns.abort(500, 'Failed to generate organization summary')
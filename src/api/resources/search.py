@@ -5,25 +5,52 @@ from ..core import api
 from ..schemas import search_parser, advanced_search_parser, search_suggestions_parser
 from ..models import db, Organization, Category, Location, SearchHistory
 from sqlalchemy import or_, desc, func
-from sqlalchemy.orm import joinedload
-from ..utils import paginate, serialize_organization
+from ..utils import paginate
+from ..cache import cached_response
+from ..db_routing import read_replica
+from ..geo import nearest_organizations, validate_point
+from ..ranking import normalize_query, rank_organizations, relevance_enabled
+from ..search_index import text_search_ids
+from ..facets import search_facets
+from ..search_cache import cached_result_ids, hydrate_page, max_cached_ids
+from ..list_view import organization_fragments
+from ..serialization import json_response, splice_list
+from werkzeug.exceptions import HTTPException
 import json
 
 search_ns = api.namespace('search', description='Search operations')
 
+POPULARITY_ORDER = (desc(Organization.bookmark_count), desc(Organization.view_count), desc(Organization.created_at))
+
+
+def popular_ids(query, order=POPULARITY_ORDER):
+    """Ids of a query in popularity order, or None when there are too many to cache."""
+    limit = max_cached_ids()
+    ids = [row[0] for row in query.with_entities(Organization.id).order_by(*order).limit(limit + 1)]
+    return ids if len(ids) <= limit else None
+
+
 @search_ns.route('/organizations')
 class OrganizationSearch(Resource):
     @search_ns.expect(search_parser)
+    @cached_response(tags=('organizations', 'categories', 'locations'), personalized=True)
+    @read_replica
     def get(self):
         try:
             args = search_parser.parse_args()
-            query = Organization.query.options(
-                joinedload(Organization.photos),
-                joinedload(Organization.social_links),
-                joinedload(Organization.category),
-                joinedload(Organization.location)
-            ).filter(Organization.status == 'approved')
-            if args.q:
+            near = args.lat is not None or args.lng is not None
+            if near:
+                if args.lat is None or args.lng is None:
+                    search_ns.abort(400, 'lat and lng must be given together')
+                try:
+                    validate_point(args.lat, args.lng, args.radius_km)
+                except ValueError as e:
+                    search_ns.abort(400, str(e))
+            query = Organization.query.filter(Organization.status == 'approved')
+            matched_ids = text_search_ids(args.q) if args.q else None
+            if matched_ids is not None:
+                query = query.filter(Organization.id.in_(matched_ids))
+            elif args.q:
                 search_term = f"%{args.q}%"
                 query = query.join(Organization.category).join(Organization.location).filter(
                     or_(
@@ -39,7 +66,25 @@ class OrganizationSearch(Resource):
             if args.location_id: query = query.filter(Organization.location_id == args.location_id)
             if args.verification_level: query = query.filter(Organization.verification_level == args.verification_level)
 
-            items, pag = paginate(query.order_by(desc(Organization.bookmark_count), desc(Organization.view_count), desc(Organization.created_at)), args.page, args.per_page)
+            filters = {'category_id': args.category_id, 'location_id': args.location_id, 'verification_level': args.verification_level}
+            distances = {}
+            if near:
+                filters['near'] = (args.lat, args.lng, args.radius_km)
+                ranked = cached_result_ids('near', args.q, filters, lambda: nearest_organizations(query, args.lat, args.lng, args.radius_km))
+                distances = dict(ranked)
+                results, pag = hydrate_page([org_id for org_id, _ in ranked], args.page, args.per_page,
+                                            {org_id: {'distance_km': distance} for org_id, distance in ranked})
+                # Facets count the rows inside the radius, not the whole filtered set
+                query = query.filter(Organization.id.in_(list(distances)))
+            elif args.q and relevance_enabled(args.sort):
+                results, pag = hydrate_page(cached_result_ids('relevance', args.q, filters, lambda: rank_organizations(query, args.q)), args.page, args.per_page)
+            else:
+                ordered = cached_result_ids('popularity', args.q, filters, lambda: popular_ids(query))
+                if ordered is not None:
+                    results, pag = hydrate_page(ordered, args.page, args.per_page)
+                else:
+                    rows, pag = paginate(query.with_entities(Organization.id).order_by(*POPULARITY_ORDER), args.page, args.per_page)
+                    results = organization_fragments([row.id for row in rows])
 
             try:
                 uid = get_jwt_identity()
@@ -49,7 +94,14 @@ class OrganizationSearch(Resource):
             except Exception:
                 pass
 
-            return {'results': [serialize_organization(o) for o in items], 'pagination': pag, 'search_meta': {'query': args.q, 'filters': {'category_id': args.category_id, 'location_id': args.location_id, 'verification_level': args.verification_level}}}
+            search_meta = {'query': args.q, 'filters': {'category_id': args.category_id, 'location_id': args.location_id, 'verification_level': args.verification_level}}
+            if near:
+                search_meta['near'] = {'lat': args.lat, 'lng': args.lng, 'radius_km': args.radius_km}
+            body = {'pagination': pag, 'search_meta': search_meta}
+            if args.facets:
+                body['facets'] = search_facets(query, args.q, filters)
+            return json_response(splice_list('results', results, body))
+        except HTTPException: raise
         except Exception: search_ns.abort(500, 'Search failed')
 
 @search_ns.route('/organizations/advanced')
@@ -59,6 +111,7 @@ class AdvancedOrganizationSearch(Resource):
         200: 'Advanced search results retrieved successfully',
         500: 'Advanced search failed'
     })
+    @read_replica
     def get(self):
         try:
             args = advanced_search_parser.parse_args()
@@ -68,12 +121,7 @@ class AdvancedOrganizationSearch(Resource):
             page = args.get('page')
             per_page = args.get('per_page')
 
-            base_query = Organization.query.options(
-                db.joinedload(Organization.category),
-                db.joinedload(Organization.location),
-                db.joinedload(Organization.photos),
-                db.joinedload(Organization.social_links)
-            ).filter(Organization.status == 'approved')
+            base_query = Organization.query.filter(Organization.status == 'approved')
 
             if query_param:
                 search_term = f"%{query_param}%"
@@ -98,17 +146,26 @@ class AdvancedOrganizationSearch(Resource):
                     )
                 )
 
-            paginated_query = base_query.order_by(
-                desc(Organization.view_count),
-                desc(Organization.created_at)
-            )
+            filters = {'category': (category_name or '').lower() or None, 'location': normalize_query(location_query) or None}
+            if query_param and relevance_enabled(args.get('sort')):
+                ordered = cached_result_ids('advanced-relevance', query_param, filters, lambda: rank_organizations(base_query, query_param))
+            else:
+                ordered = cached_result_ids('advanced-popularity', query_param, filters, lambda: popular_ids(
+                    base_query, (desc(Organization.view_count), desc(Organization.created_at))))
+
+            if ordered is not None:
+                results, pag = hydrate_page(ordered, page, per_page)
+            else:
+                paginated_query = base_query.with_entities(Organization.id).order_by(
+                    desc(Organization.view_count),
+                    desc(Organization.created_at)
+                )
 
-            items, pag = paginate(paginated_query, page, per_page)
+                rows, pag = paginate(paginated_query, page, per_page)
 
-            results = [serialize_organization(org) for org in items]
+                results = organization_fragments([row.id for row in rows])
 
-            return {
-                'results': results,
+            return json_response(splice_list('results', results, {
                 'pagination': pag,
                 'search_meta': {
                     'query': query_param,
@@ -117,7 +174,7 @@ class AdvancedOrganizationSearch(Resource):
                         'location': location_query
                     }
                 }
-            }, 200
+            }))
         except Exception as e:
             # current_app.logger.error(f"Advanced search failed: {e}")
             search_ns.abort(500, 'Advanced search failed')
@@ -125,6 +182,7 @@ class AdvancedOrganizationSearch(Resource):
 @search_ns.route('/suggestions')
 class SearchSuggestions(Resource):
     @search_ns.expect(search_suggestions_parser)
+    @read_replica
     def get(self):
         args = search_suggestions_parser.parse_args()
         q = args.q.strip()
@@ -155,6 +213,7 @@ class SearchSuggestions(Resource):
         }
 class SearchSuggestions(Resource):
     @search_ns.expect(search_suggestions_parser)
+    @read_replica
     def get(self):
         try:
             args = search_suggestions_parser.parse_args()
@@ -177,6 +236,7 @@ class SearchSuggestions(Resource):
 
 @search_ns.route('/popular')
 class PopularSearches(Resource):
+    @read_replica
     def get(self):
         searches = db.session.query(SearchHistory.search_query, func.count(SearchHistory.id).label('count')).group_by(SearchHistory.search_query).order_by(desc('count')).limit(10).all()
         return {'popular_searches': [{'query': s.search_query, 'count': s.count} for s in searches]}
@@ -1,7 +1,6 @@
-from flask import send_from_directory, current_app
 from flask_restx import Resource
 from ..core import api
-import os
+from ..file_serving import serve_upload
 
 uploads_ns = api.namespace('uploads', description='Serve uploaded files')
 
@@ -13,5 +12,4 @@ class ServeUpload(Resource):
     })
     def get(self, filename):
         """Serves a file from the upload directory."""
-        upload_dir = current_app.config['UPLOAD_FOLDER']
-        return send_from_directory(upload_dir, filename)
+        return serve_upload(filename)
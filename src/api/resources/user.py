@@ -8,7 +8,10 @@ from ..schemas import (
     user_donations_model, user_reviews_model, user_notifications_model,
     user_settings_model, organization_model
 )
-from ..models import db, User, ActivityLog, Bookmark, Donation, Review, Notification, UserSettings, Organization
+from ..models import db, User, ActivityLog, UserBookmark, Donation, Review, Notification, UserSettings, Organization
+from ..bookmarks import add_bookmark, remove_bookmark
+from ..list_view import organization_fragments
+from ..serialization import json_response, splice_list
 from ..utils import (
     serialize_user, serialize_activity, serialize_bookmark,
     serialize_donation, serialize_review, serialize_notification,
@@ -51,7 +54,7 @@ class UserBookmarks(Resource):
     @jwt_required()
     @users_ns.marshal_list_with(user_bookmarks_model)
     def get(self):
-        return [serialize_bookmark(b) for b in Bookmark.query.filter_by(user_id=get_jwt_identity()).all()]
+        return [serialize_bookmark(b) for b in UserBookmark.query.filter_by(user_id=get_jwt_identity()).all()]
 
     @jwt_required()
     def post(self):
@@ -61,30 +64,17 @@ class UserBookmarks(Resource):
         if not org_id:
             users_ns.abort(400, 'organization_id is required')
 
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         organization = Organization.query.get(org_id)
         if not organization:
             users_ns.abort(404, 'Organization not found')
 
-        # Prevent duplicate bookmarks
-        existing = Bookmark.query.filter_by(user_id=user_id, organization_id=org_id).first()
-        if existing:
-            return { 'bookmark': serialize_bookmark(existing) }, 200
-
         try:
-            bookmark = Bookmark(user_id=user_id, organization_id=org_id)
-            db.session.add(bookmark)
-            # increment organization's bookmark count
-            try:
-                organization.bookmark_count = (organization.bookmark_count or 0) + 1
-            except Exception:
-                # ignore if field not present
-                pass
-            db.session.commit()
-            return { 'bookmark': serialize_bookmark(bookmark) }, 201
+            bookmark, created = add_bookmark(user_id, org_id)
         except Exception as e:
             db.session.rollback()
             users_ns.abort(500, f'Failed to create bookmark: {e}')
+        return { 'bookmark': serialize_bookmark(bookmark) }, 201 if created else 200
 
 @users_ns.route('/donations')
 class UserDonations(Resource):
@@ -100,7 +90,7 @@ class UserMeBookmarks(Resource):
     @users_ns.marshal_list_with(user_bookmarks_model)
     def get(self):
         """Compatibility endpoint: return current user's bookmarks (same as /bookmarks)."""
-        return [serialize_bookmark(b) for b in Bookmark.query.filter_by(user_id=get_jwt_identity()).all()]
+        return [serialize_bookmark(b) for b in UserBookmark.query.filter_by(user_id=get_jwt_identity()).all()]
 
 
 @users_ns.route('/bookmarks/<int:bookmark_id>')
@@ -108,28 +98,19 @@ class UserBookmarkResource(Resource):
     @jwt_required()
     def delete(self, bookmark_id):
         """Remove a user's bookmark by id."""
-        user_id = get_jwt_identity()
-        bookmark = Bookmark.query.get(bookmark_id)
+        user_id = int(get_jwt_identity())
+        bookmark = UserBookmark.query.get(bookmark_id)
         if not bookmark:
             users_ns.abort(404, 'Bookmark not found')
         if bookmark.user_id != user_id:
             users_ns.abort(403, 'Not authorized to delete this bookmark')
 
         try:
-            # adjust organization's bookmark count if possible
-            organization = Organization.query.get(bookmark.organization_id)
-            db.session.delete(bookmark)
-            if organization:
-                try:
-                    if organization.bookmark_count and organization.bookmark_count > 0:
-                        organization.bookmark_count = organization.bookmark_count - 1
-                except Exception:
-                    pass
-            db.session.commit()
-            return { 'message': 'Bookmark removed' }, 200
+            remove_bookmark(bookmark)
         except Exception as e:
             db.session.rollback()
             users_ns.abort(500, f'Failed to remove bookmark: {e}')
+        return { 'message': 'Bookmark removed' }, 200
 
 @users_ns.route('/reviews')
 class UserReviews(Resource):
@@ -229,16 +210,10 @@ class UserOrganizations(Resource):
                 return []
 
             # Get the organizations administered by this user
-            organizations = Organization.query.options(
-                joinedload(Organization.photos),
-                joinedload(Organization.social_links),
-                joinedload(Organization.category),
-                joinedload(Organization.location)
-            ).filter_by(admin_user_id=user_id).all()
+            org_ids = [row.id for row in Organization.query.with_entities(Organization.id)
+                       .filter_by(admin_user_id=user_id).order_by(Organization.id)]
 
             # Return as an object with organizations array to match frontend expectations
-            return {
-                "organizations": [serialize_organization(org) for org in organizations]
-            }
+            return json_response(splice_list("organizations", organization_fragments(org_ids)))
         except Exception as e:
             users_ns.abort(500, f'Failed to fetch organizations: {str(e)}')
@@ -141,6 +141,11 @@ search_parser.add_argument('q', type=str, help='Search query')
 search_parser.add_argument('category_id', type=int, help='Category filter')
 search_parser.add_argument('location_id', type=int, help='Location filter')
 search_parser.add_argument('verification_level', type=str, help='Verification level filter')
+search_parser.add_argument('lat', type=float, help='Latitude for near-me search')
+search_parser.add_argument('lng', type=float, help='Longitude for near-me search')
+search_parser.add_argument('radius_km', type=float, default=25.0, help='Search radius in kilometres (with lat/lng)')
+search_parser.add_argument('sort', type=str, choices=('relevance', 'popularity'), help='Result order for text queries (default SEARCH_RANKING)')
+search_parser.add_argument('facets', type=inputs.boolean, default=False, help='Include category, state, verification level and is_verified counts')
 
 # AUTH PARSERS
 register_parser = api.parser()
@@ -194,6 +199,19 @@ org_signup_parser.add_argument('agreeToTerms', type=inputs.boolean, required=Tru
 org_signup_parser.add_argument('verifyInformation', type=inputs.boolean, required=True, help='You must verify that the information is accurate', location='form')
 
 
+org_import_parser = api.parser()
+org_import_parser.add_argument('file', location='files', type=FileStorage, required=True, help='CSV or JSON Lines file')
+org_import_parser.add_argument('format', type=str, choices=('csv', 'jsonl'), location='args', help='Defaults to the file extension')
+org_import_parser.add_argument('key', type=str, choices=('name', 'email'), default='name', location='args', help='Natural key for updates')
+org_import_parser.add_argument('dry_run', type=inputs.boolean, default=False, location='args', help='Validate without writing')
+
+
+org_export_parser = api.parser()
+org_export_parser.add_argument('format', type=str, choices=('csv', 'ndjson', 'jsonl'), default='csv', location='args', help='Export format')
+org_export_parser.add_argument('updated_since', type=str, location='args', help='ISO 8601 timestamp; only organizations changed after it')
+org_export_parser.add_argument('gzip', type=inputs.boolean, location='args', help='Force gzip on/off (defaults to Accept-Encoding)')
+
+
 org_create_parser = api.parser()
 org_create_parser.add_argument('name', type=str, required=True, help='Organization name', location='json')
 org_create_parser.add_argument('mission', type=str, required=True, help='Mission statement', location='json')
@@ -302,6 +320,7 @@ advanced_search_parser.add_argument('category', type=str, help='Category name')
 advanced_search_parser.add_argument('location', type=str, help='Location string (city, state, or country)')
 advanced_search_parser.add_argument('page', type=int, default=1, help='Page number')
 advanced_search_parser.add_argument('per_page', type=int, default=10, help='Items per page')
+advanced_search_parser.add_argument('sort', type=str, choices=('relevance', 'popularity'), help='Result order for text queries (default SEARCH_RANKING)')
 
 search_suggestions_parser = api.parser()
 search_suggestions_parser.add_argument('q', type=str, required=True, help='Search query')
@@ -0,0 +1,75 @@
+"""
+Search result cache.
+
+A search is reduced to the ordered list of matching organization ids. The
+list is stored in the response cache backend under the normalized query (case,
+accents and whitespace folded by ranking.normalize_query), the filter tuple,
+the ordering mode and the organizations / categories / locations tag versions.
+Every page, spelling variant and visitor of a popular query reuses one entry.
+Any committed change to those tables moves the tag version, so stale lists are
+never served; entries also expire after SEARCH_RESULT_CACHE_TIMEOUT seconds.
+
+Pages are hydrated from the encoded list cards in the organization entity
+cache (list_view.organization_fragments), so a cached query answers any page,
+however deep, from memory plus at most one projected query for the cards that
+are missing. Per-visitor fields (is_bookmarked, bookmark_id) are never
+cached, they are looked up for the whole page with one query and appended to
+the fragments.
+"""
+import hashlib
+
+from flask import current_app
+
+from .metrics import observe_cache_lookup
+from .list_view import organization_fragments
+from .ranking import normalize_query
+
+RESULT_TAGS = ('organizations', 'categories', 'locations')
+
+
+def _cache():
+    return current_app.extensions.get('response_cache')
+
+
+def result_cache_key(cache, kind, text, filters):
+    raw = repr((kind, normalize_query(text), sorted((k, v) for k, v in filters.items() if v is not None),
+                cache.tag_versions(RESULT_TAGS)))
+    return 'search:ids:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def cached_result_ids(kind, text, filters, compute):
+    """Ordered result list for a search, computed once per normalized query and filters.
+
+    `compute` returns the list, or None when the result is too large to cache
+    (the caller then falls back to paginating in SQL).
+    """
+    cache = _cache()
+    if cache is None:
+        return compute()
+    key = result_cache_key(cache, kind, text, filters)
+    ids = cache.backend.get(key)
+    observe_cache_lookup('search_results', ids is not None)
+    if ids is None:
+        ids = compute()
+        if ids is not None and len(ids) <= max_cached_ids():
+            cache.backend.set(key, ids, current_app.config.get('SEARCH_RESULT_CACHE_TIMEOUT', 120))
+    return ids
+
+
+def max_cached_ids():
+    return current_app.config.get('SEARCH_RESULT_CACHE_MAX_IDS', 10000)
+
+
+def page_window(ordered_ids, page, per_page):
+    """The ids on one page of an ordered id list and the pagination details."""
+    page, per_page = max(page or 1, 1), max(per_page or 1, 1)
+    pages = -(-len(ordered_ids) // per_page)
+    return ordered_ids[(page - 1) * per_page:page * per_page], {
+        'total': len(ordered_ids), 'pages': pages, 'current_page': page,
+        'next_page': page + 1 if page < pages else None, 'prev_page': page - 1 if page > 1 else None}
+
+
+def hydrate_page(ordered_ids, page, per_page, extra=None):
+    """Encoded results and pagination details for one page of a ranked id list."""
+    window, pag = page_window(ordered_ids, page, per_page)
+    return organization_fragments(window, extra), pag
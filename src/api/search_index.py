@@ -0,0 +1,430 @@
+"""
+In-process inverted index over approved organizations.
+
+Used by the organization search on databases without full-text search (SQLite,
+MySQL), where matching text would otherwise be an ILIKE scan of every row. Each
+organization's name, mission, description, category, city and state are
+tokenized like the ranking index (accent-folded, stopwords dropped). Every term
+maps to a sorted array of organization ids, so a query is an intersection of a
+few integer arrays, the last term matching as a prefix.
+
+All posting lists live in one int32 array addressed by per-term offsets. The
+index is saved as a snapshot directory (postings.npy, offsets.npy, terms.txt,
+meta.json) in SEARCH_INDEX_PATH. Workers memory-map postings.npy read-only, so
+they start without rebuilding and share its pages through the page cache.
+
+The index stays current as follows:
+
+- `after_insert` / `after_update` / `after_delete` on Organization record the
+  new terms of changed rows, and these are applied to the worker's index when
+  the session commits. The snapshot is untouched: changed ids are tombstoned
+  in the base arrays and served from a small in-memory delta.
+- Rows changed by other workers or by bulk writes are caught up with one query.
+  It runs when the 'organizations' response cache tag changes or every
+  SEARCH_INDEX_REFRESH seconds, and selects two kinds of row:
+  - ids above the highest id the index has seen, which catches inserts
+    whatever their timestamps;
+  - rows whose updated_at is within SEARCH_INDEX_CATCHUP_WINDOW seconds of
+    the watermark, or newer.
+  Timestamps come from application clocks and are not commit ordered. A
+  transaction that flushed before another worker advanced the watermark
+  commits "in the past", so the window re-checks that stretch. Rows already
+  applied at the same timestamp are skipped, so re-checking stays cheap.
+- Bulk writers (bench-seed, import_organizations) call
+  refresh_search_index() when they finish.
+
+`flask search-index build` rewrites the snapshot from a single streaming query.
+"""
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func, inspect as sa_inspect, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, object_session
+
+from .models import db, Organization, Category, Location
+from .ranking import tokenize
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+SNAPSHOT_VERSION = 2
+MAX_PREFIX_TERMS = 500
+BUILD_BATCH_SIZE = 2000
+# Columns whose change affects an organization's terms; counter bumps are ignored
+INDEXED_ATTRIBUTES = ('name', 'mission', 'description', 'status', 'category_id', 'location_id')
+
+_PENDING_KEY = 'search_index_pending'
+
+
+def document_terms(*texts):
+    """Distinct index terms for an organization's text fields."""
+    return set(tokenize(' '.join(text for text in texts if text)))
+
+
+class InvertedIndex:
+    """Sorted posting arrays for a snapshot plus an in-memory delta of later changes."""
+
+    def __init__(self, terms, offsets, postings, watermark=None, documents=0, max_id=None):
+        self.terms = terms
+        self._term_positions = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.watermark = watermark
+        self.max_id = max_id
+        self.documents = documents
+        # {id: changed_at} applied by catch-up within the re-check window
+        self.recent = {}
+        self.tombstones = set()
+        self._tombstone_array = np.empty(0, dtype=np.int32)
+        self.delta = {}
+        self.delta_documents = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(cls, rows, max_id=None):
+        """Build from (id, changed_at, *texts) rows ordered by id.
+
+        max_id is the highest organization id (any status) when the rows were
+        selected; later inserts are found by id during catch-up.
+        """
+        started = datetime.utcnow()
+        postings = {}
+        watermark = None
+        documents = 0
+        for row in rows:
+            documents += 1
+            for term in document_terms(*row[2:]):
+                postings.setdefault(term, []).append(row[0])
+            if row[1] is not None and (watermark is None or row[1] > watermark):
+                watermark = row[1]
+        if watermark is not None:
+            # Never past the build time, or catch-up would skip rows written right after it
+            watermark = min(watermark, started)
+        terms = sorted(postings)
+        lengths = np.fromiter((len(postings[term]) for term in terms), dtype=np.int64, count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = np.empty(int(offsets[-1]), dtype=np.int32)
+        for i, term in enumerate(terms):
+            flat[offsets[i]:offsets[i + 1]] = postings[term]
+        return cls(terms, offsets, flat, watermark, documents, max_id)
+
+    def save(self, path, database=None):
+        """Write the base arrays as a snapshot directory, replacing files atomically."""
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'database': database,
+            'documents': self.documents,
+            'terms': len(self.terms),
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'max_id': self.max_id,
+            'built_at': datetime.utcnow().isoformat(),
+        }
+        for name, write in (
+            ('postings.npy', lambda f: np.save(f, np.asarray(self.postings, dtype=np.int32))),
+            ('offsets.npy', lambda f: np.save(f, np.asarray(self.offsets, dtype=np.int64))),
+            ('terms.txt', lambda f: f.write('\n'.join(self.terms).encode('utf-8'))),
+            ('meta.json', lambda f: f.write(json.dumps(meta).encode('utf-8'))),
+        ):
+            tmp = os.path.join(path, f'.{name}.{os.getpid()}.tmp')
+            with open(tmp, 'wb') as f:
+                write(f)
+            os.replace(tmp, os.path.join(path, name))
+        return meta
+
+    @classmethod
+    def load(cls, path, database=None):
+        """Memory-map a snapshot; returns None when it is missing, outdated or for another database."""
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != SNAPSHOT_VERSION or meta.get('database') != database:
+                return None
+            postings = np.load(os.path.join(path, 'postings.npy'), mmap_mode='r')
+            offsets = np.load(os.path.join(path, 'offsets.npy'))
+            with open(os.path.join(path, 'terms.txt'), encoding='utf-8') as f:
+                terms = f.read().split('\n') if meta['terms'] else []
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(terms) + 1 != len(offsets):
+            return None
+        watermark = datetime.fromisoformat(meta['watermark']) if meta.get('watermark') else None
+        return cls(terms, offsets, postings, watermark, meta.get('documents', 0), meta.get('max_id'))
+
+    def _base(self, term):
+        i = self._term_positions.get(term)
+        if i is None:
+            return None
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff')
+        matched = self.terms[start:min(end, start + MAX_PREFIX_TERMS)]
+        return matched, [term for term in self.delta if term.startswith(prefix)]
+
+    def term_ids(self, term, prefix=False):
+        """Sorted ids of documents containing term (or any term starting with it)."""
+        with self.lock:
+            if prefix:
+                base_terms, delta_terms = self._expand(term)
+            else:
+                base_terms, delta_terms = [term], [term] if term in self.delta else []
+            arrays = [array for array in (self._base(t) for t in base_terms) if array is not None and len(array)]
+            base = np.unique(np.concatenate(arrays)) if len(arrays) > 1 else (
+                np.asarray(arrays[0]) if arrays else np.empty(0, dtype=np.int32))
+            if self.tombstones and len(base):
+                base = np.setdiff1d(base, self._tombstone_array, assume_unique=True)
+            extra = set()
+            for t in delta_terms:
+                extra |= self.delta[t]
+            if extra:
+                base = np.union1d(base, np.fromiter(extra, dtype=np.int32, count=len(extra)))
+            return base
+
+    def search(self, text):
+        """Ids matching every term of text, the last one as a prefix; None if text has no terms."""
+        terms = tokenize(text)
+        if not terms:
+            return None
+        result = None
+        for i, term in enumerate(dict.fromkeys(terms)):
+            ids = self.term_ids(term, prefix=(term == terms[-1]))
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result.tolist()
+
+    def update(self, doc_id, terms):
+        """Replace a document's terms; terms=None removes it."""
+        self.update_many(((doc_id, terms),))
+
+    def update_many(self, changes):
+        """Apply (doc_id, terms) pairs, rebuilding the tombstone array once."""
+        with self.lock:
+            tombstones = len(self.tombstones)
+            for doc_id, terms in changes:
+                self._apply(doc_id, terms)
+            if len(self.tombstones) != tombstones:
+                self._tombstone_array = np.fromiter(sorted(self.tombstones), dtype=np.int32, count=len(self.tombstones))
+
+    def _apply(self, doc_id, terms):
+        self.tombstones.add(doc_id)
+        for term in self.delta_documents.pop(doc_id, ()):
+            ids = self.delta.get(term)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.delta[term]
+        if terms:
+            self.delta_documents[doc_id] = terms
+            for term in terms:
+                self.delta.setdefault(term, set()).add(doc_id)
+
+    def stats(self):
+        return {
+            'documents': self.documents, 'terms': len(self.terms), 'postings': int(len(self.postings)),
+            'delta_documents': len(self.delta_documents), 'tombstones': len(self.tombstones),
+            'memory_mapped': isinstance(self.postings, np.memmap),
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'max_id': self.max_id,
+        }
+
+
+def _changed_at():
+    return func.coalesce(Organization.updated_at, Organization.created_at)
+
+
+def _document_query():
+    return db.session.query(
+        Organization.id, _changed_at(), Organization.status, Organization.name, Organization.mission,
+        Organization.description, Category.name, Location.city, Location.state_province,
+    ).outerjoin(Category, Organization.category_id == Category.id) \
+        .outerjoin(Location, Organization.location_id == Location.id)
+
+
+def build_index():
+    """Build from one streaming query over approved organizations."""
+    max_id = db.session.query(func.max(Organization.id)).scalar()
+    rows = _document_query().filter(Organization.status == 'approved').order_by(Organization.id) \
+        .execution_options(stream_results=True, yield_per=BUILD_BATCH_SIZE)
+    return InvertedIndex.build(((row[0], row[1], *row[3:]) for row in rows), max_id=max_id)
+
+
+def database_fingerprint(app=None):
+    uri = (app or current_app).config.get('SQLALCHEMY_DATABASE_URI') or ''
+    return hashlib.sha1(uri.encode('utf-8')).hexdigest()[:16]
+
+
+def catch_up(index, window=None):
+    """Apply rows inserted or changed since the index last looked (any status); returns how many."""
+    if window is None:
+        window = current_app.config.get('SEARCH_INDEX_CATCHUP_WINDOW', 600)
+    query = _document_query()
+    since = []
+    if index.watermark is not None:
+        since.append(_changed_at() >= index.watermark - timedelta(seconds=window))
+    if index.max_id is not None:
+        since.append(Organization.id > index.max_id)
+    if since:
+        query = query.filter(or_(*since))
+    started = datetime.utcnow()
+    changes = []
+    for row in query.execution_options(yield_per=BUILD_BATCH_SIZE):
+        doc_id, changed_at = row[0], row[1]
+        if index.max_id is None or doc_id > index.max_id:
+            index.max_id = doc_id
+        if changed_at is not None and index.recent.get(doc_id) == changed_at:
+            continue
+        changes.append((doc_id, document_terms(*row[3:]) if row[2] == 'approved' else None))
+        if changed_at is not None:
+            index.recent[doc_id] = changed_at
+            changed = min(changed_at, started)
+            if index.watermark is None or changed > index.watermark:
+                index.watermark = changed
+    index.update_many(changes)
+    if index.watermark is not None:
+        horizon = index.watermark - timedelta(seconds=window)
+        index.recent = {doc_id: changed for doc_id, changed in index.recent.items() if changed >= horizon}
+    return len(changes)
+
+
+def refresh_search_index(rebuild=False, app=None):
+    """Bring the index up to date after writes that bypassed the ORM events.
+
+    rebuild=True also rewrites the snapshot, so workers started afterwards load
+    it without a large catch-up. Returns the index, or None when disabled.
+    """
+    app = app or current_app._get_current_object()
+    if not index_enabled(app):
+        return None
+    index = app.extensions.get('search_index')
+    if rebuild or index is None:
+        return load_or_build(app, rebuild=rebuild)
+    catch_up(index)
+    app.extensions['search_index_state'] = (_tag_version(app), time.monotonic())
+    return index
+
+
+def index_enabled(app=None):
+    config = (app or current_app).config
+    mode = (config.get('SEARCH_INDEX') or 'auto').lower()
+    if mode == 'off' or np is None:
+        return False
+    if mode == 'auto':
+        return not (config.get('SQLALCHEMY_DATABASE_URI') or '').startswith('postgres')
+    return True
+
+
+def load_or_build(app, rebuild=False):
+    """Memory-map the snapshot (caught up to now) or build and save a fresh one."""
+    path = app.config['SEARCH_INDEX_PATH']
+    database = database_fingerprint(app)
+    index = None if rebuild else InvertedIndex.load(path, database)
+    if index is not None:
+        catch_up(index)
+    else:
+        index = build_index()
+        try:
+            index.save(path, database)
+            index = InvertedIndex.load(path, database) or index
+        except OSError as e:
+            app.logger.warning(f"Could not write search index snapshot to {path}: {e}")
+    app.extensions['search_index'] = index
+    app.extensions['search_index_state'] = (_tag_version(app), time.monotonic())
+    return index
+
+
+def _tag_version(app):
+    cache = app.extensions.get('response_cache')
+    return cache.tag_versions(('organizations',)) if cache is not None else None
+
+
+def get_search_index():
+    """The worker's index, caught up when organizations changed elsewhere; None when disabled."""
+    app = current_app._get_current_object()
+    if not index_enabled(app):
+        return None
+    index = app.extensions.get('search_index')
+    if index is None:
+        return load_or_build(app)
+    version = _tag_version(app)
+    state = app.extensions.get('search_index_state')
+    if state[0] != version or time.monotonic() - state[1] >= app.config.get('SEARCH_INDEX_REFRESH', 60):
+        app.extensions['search_index_state'] = (version, time.monotonic())
+        catch_up(index)
+    return index
+
+
+def text_search_ids(text):
+    """Ids of approved organizations matching text, or None to fall back to ILIKE."""
+    index = get_search_index()
+    return index.search(text) if index is not None else None
+
+
+def _record_change(mapper, connection, target):
+    session = object_session(target)
+    if session is None or target.id is None:
+        return
+    state = sa_inspect(target)
+    if state.has_identity and not state.pending and not any(
+            state.attrs[key].history.has_changes() for key in INDEXED_ATTRIBUTES):
+        return
+    terms = None
+    if target.status == 'approved':
+        category = connection.execute(select(Category.name).where(Category.id == target.category_id)).scalar() \
+            if target.category_id else None
+        place = connection.execute(select(Location.city, Location.state_province).where(
+            Location.id == target.location_id)).first() if target.location_id else None
+        terms = document_terms(target.name, target.mission, target.description, category, *(place or ()))
+    session.info.setdefault(_PENDING_KEY, {})[target.id] = terms
+
+
+def _record_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault(_PENDING_KEY, {})[target.id] = None
+
+
+def _make_commit_handler(app):
+    def _apply_after_commit(session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        index = app.extensions.get('search_index')
+        if pending and index is not None:
+            index.update_many(pending.items())
+    return _apply_after_commit
+
+
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_search_index(app):
+    """Hook incremental updates into Organization writes and load the snapshot at startup."""
+    if not index_enabled(app):
+        if np is None and (app.config.get('SEARCH_INDEX') or 'auto').lower() != 'off':
+            print("Warning: numpy not installed. Organization search will use ILIKE matching.")
+        return None
+    event.listen(Organization, 'after_insert', _record_change)
+    event.listen(Organization, 'after_update', _record_change)
+    event.listen(Organization, 'after_delete', _record_delete)
+    event.listen(Session, 'after_commit', _make_commit_handler(app))
+    event.listen(Session, 'after_soft_rollback', _discard_pending)
+    with app.app_context():
+        try:
+            return load_or_build(app)
+        except SQLAlchemyError as e:
+            # e.g. before the first migration; the index is built on first use instead
+            print(f"Warning: search index not built at startup ({e.__class__.__name__}).")
+            db.session.rollback()
+            return None
@@ -13,7 +13,6 @@ from .models import (
     Donation,
     UserBookmark,
     Advertisement,
-    Bookmark,
 )
 
 def seed_categories():
@@ -234,7 +233,7 @@ def seed_organizations_and_photos():
         except Exception:
             pass
 
-        # add a bookmark (if Bookmark model exists use it)
+        # add a bookmark
         try:
             b = UserBookmark(user_id=regular_user.id, organization_id=org.id)
             db.session.add(b)
@@ -0,0 +1,119 @@
+"""
+JSON encoding for API responses.
+
+Every Flask-RESTX response goes through `dumps`, which uses orjson when it is
+installed (JSON_ENCODER=auto, the default, or orjson) and the standard library
+otherwise (JSON_ENCODER=stdlib). Both produce compact UTF-8 bytes; datetimes
+are written in ISO 8601, Decimals as numbers and sets as lists.
+
+List endpoints avoid re-encoding rows altogether: each cached organization
+record carries its card already encoded as a JSON object (a fragment), and a
+page is assembled by joining fragments. Per-visitor fields are appended to the
+closing brace of each fragment, so fragments stay shareable between users.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    print("Warning: orjson not installed. Responses will be encoded with the standard json module.")
+
+MIMETYPE = 'application/json'
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _orjson_dumps(data):
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+ENCODERS = {'stdlib': _stdlib_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = _orjson_dumps
+
+
+def get_encoder(name=None):
+    """The dumps function for JSON_ENCODER (auto|orjson|stdlib)."""
+    if name is None:
+        try:
+            name = current_app.config.get('JSON_ENCODER')
+        except RuntimeError:
+            name = None
+    name = (name or 'auto').lower()
+    if name == 'auto':
+        return ENCODERS.get('orjson', _stdlib_dumps)
+    if name not in ENCODERS:
+        raise ValueError(f"JSON encoder {name!r} is not available; expected one of {', '.join(ENCODERS)}")
+    return ENCODERS[name]
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes with the configured encoder."""
+    return get_encoder()(data)
+
+
+def encode_fragment(data, encoder=None):
+    """Pre-encode one JSON object so it can be spliced into later responses."""
+    return (encoder or get_encoder())(data)
+
+
+def extend_fragment(fragment, fields, encoder=None):
+    """A fragment with extra fields appended, e.g. per-visitor bookmark status."""
+    if not fields:
+        return fragment
+    extra = (encoder or get_encoder())(fields)
+    return (fragment[:-1] + b',' + extra[1:]) if fragment != b'{}' else extra
+
+
+def splice_list(key, fragments, extra=None, encoder=None):
+    """Encode {key: [fragments...], **extra} without decoding the fragments."""
+    encoder = encoder or get_encoder()
+    body = b'{' + encoder(key) + b':[' + b','.join(fragments) + b']'
+    if extra:
+        body += b',' + encoder(extra)[1:-1]
+    return body + b'}'
+
+
+def splice_into(fragment, key, fragments, encoder=None):
+    """A fragment with {key: [fragments...]} appended as its last field."""
+    encoder = encoder or get_encoder()
+    field = encoder(key) + b':[' + b','.join(fragments) + b']'
+    return (fragment[:-1] + b',' + field + b'}') if fragment != b'{}' else b'{' + field + b'}'
+
+
+def join_array(fragments):
+    """Encode [fragments...] without decoding them."""
+    return b'[' + b','.join(fragments) + b']'
+
+
+def json_response(body, status=200, headers=None):
+    """A response for an already encoded body."""
+    return current_app.response_class(body, status=status, headers=headers, mimetype=MIMETYPE)
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTX representation for application/json."""
+    return json_response(dumps(data), status=code, headers=headers)
+
+
+def setup_json_encoder(app, api):
+    """Encode Flask-RESTX responses with the configured encoder."""
+    get_encoder(app.config.get('JSON_ENCODER'))  # fail fast on an unknown name
+    api.representations[MIMETYPE] = output_json
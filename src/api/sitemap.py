@@ -0,0 +1,145 @@
+"""
+Streaming sitemap generation for approved organizations.
+
+Only the columns needed for a <url> entry are selected and rows are streamed in
+batches, so memory stays flat regardless of directory size. Past the 50k URL
+limit of the sitemap protocol, /sitemap.xml becomes a sitemap index pointing at
+/sitemap-<n>.xml shards. Each shard's validators come from MAX(updated_at) and
+the org count, so crawlers revalidating an unchanged directory get a 304 and a
+changed one only pays for generation once per cache entry.
+"""
+import hashlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from flask import current_app, request, stream_with_context
+from sqlalchemy import func
+
+from .models import db, Organization
+
+SITEMAP_MAX_URLS = 50000
+SITEMAP_BATCH_SIZE = 1000
+SITEMAP_CACHE_TIMEOUT = 3600
+
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def _approved():
+    return Organization.status == 'approved'
+
+
+def sitemap_state():
+    """Return (org_count, last_modified) for approved organizations in one query."""
+    count, last = db.session.query(
+        func.count(Organization.id),
+        func.max(func.coalesce(Organization.updated_at, Organization.created_at)),
+    ).filter(_approved()).one()
+    return count, last
+
+
+def shard_count(org_count):
+    # +1 for the homepage entry, which lives at position 0 of the first shard
+    total_urls = org_count + 1
+    return max(1, -(-total_urls // SITEMAP_MAX_URLS))
+
+
+def _org_url_entry(base_url, org_id, name, updated_at, created_at, is_verified):
+    slug = (name or '').lower().replace(' ', '-')
+    parts = ['<url><loc>', escape(f"{base_url}/organizations/{org_id}-{slug}"), '</loc>']
+    last = updated_at or created_at
+    if last:
+        parts.extend(['<lastmod>', last.strftime('%Y-%m-%d'), '</lastmod>'])
+    # changefreq/priority heuristic: verified orgs change more and rank higher
+    parts.extend(['<changefreq>', 'weekly' if is_verified else 'monthly', '</changefreq>'])
+    parts.extend(['<priority>', '0.8' if is_verified else '0.5', '</priority>'])
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+def iter_urlset(base_url, shard=0):
+    """Yield the XML for one <urlset> shard in chunks of SITEMAP_BATCH_SIZE rows."""
+    start = shard * SITEMAP_MAX_URLS
+    end = start + SITEMAP_MAX_URLS
+    org_offset = max(start - 1, 0)
+    org_limit = end - 1 - org_offset
+
+    yield _XML_HEADER + _URLSET_OPEN
+    if start == 0:
+        yield f'<url><loc>{escape(base_url)}</loc></url>\n'
+
+    rows = db.session.query(
+        Organization.id, Organization.name, Organization.updated_at,
+        Organization.created_at, Organization.is_verified
+    ).filter(_approved()).order_by(Organization.id).offset(org_offset).limit(org_limit) \
+        .yield_per(SITEMAP_BATCH_SIZE)
+
+    batch = []
+    for row in rows:
+        batch.append(_org_url_entry(base_url, *row))
+        if len(batch) >= SITEMAP_BATCH_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+    yield '</urlset>\n'
+
+
+def iter_sitemap_index(base_url, shards, last_modified):
+    yield _XML_HEADER + _INDEX_OPEN
+    lastmod = f'<lastmod>{last_modified.strftime("%Y-%m-%d")}</lastmod>' if last_modified else ''
+    for n in range(shards):
+        yield f'<sitemap><loc>{escape(base_url)}/sitemap-{n}.xml</loc>{lastmod}</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def _cache_backend():
+    cache = current_app.extensions.get('response_cache')
+    return cache.backend if cache is not None else None
+
+
+def _caching_stream(chunks, backend, key):
+    """Pass chunks through to the client and store the full body once complete."""
+    collected = []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    if backend is not None:
+        backend.set(key, ''.join(collected).encode('utf-8'), SITEMAP_CACHE_TIMEOUT)
+
+
+def sitemap_response(shard=None):
+    """Build the response for /sitemap.xml (shard=None) or /sitemap-<shard>.xml."""
+    base_url = request.url_root.rstrip('/')
+    org_count, last_modified = sitemap_state()
+    shards = shard_count(org_count)
+
+    if shard is not None and not (0 <= shard < shards):
+        return current_app.response_class('Not Found', status=404)
+
+    kind = 'index' if shard is None and shards > 1 else f'shard-{shard or 0}'
+    stamp = last_modified.isoformat() if isinstance(last_modified, datetime) else str(last_modified)
+    etag = hashlib.sha1(f'{base_url}|{kind}|{org_count}|{stamp}'.encode('utf-8')).hexdigest()
+
+    backend = _cache_backend()
+    key = 'sitemap:' + etag
+    body = backend.get(key) if backend is not None else None
+
+    if body is not None:
+        response = current_app.response_class(body, mimetype='application/xml')
+    elif kind == 'index':
+        response = current_app.response_class(
+            _caching_stream(iter_sitemap_index(base_url, shards, last_modified), backend, key),
+            mimetype='application/xml')
+    else:
+        response = current_app.response_class(
+            stream_with_context(_caching_stream(iter_urlset(base_url, shard or 0), backend, key)),
+            mimetype='application/xml')
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
@@ -0,0 +1,248 @@
+"""
+Per-request SQL profiling and N+1 detection.
+
+Every statement executed while a profile is active is recorded with a normalized
+fingerprint (literals, bind parameters and IN-lists collapsed) and its duration.
+A fingerprint that runs `threshold` or more times in one profile is reported as
+a likely N+1: the same query issued once per row of an earlier result.
+
+Request mode (SQL_PROFILING=on, or =header with an `X-SQL-Profile: 1` request
+header sent by a platform admin or to a debug build) adds a `Server-Timing`
+header and an `X-SQL-Profile-Id` pointing at the JSON report under
+/debug/sql-profiles/<id>, which only admins can read. In tests, wrap code in
+`profile_sql()` and call `assert_no_n_plus_one()`, or set SQL_PROFILING_RAISE
+so any flagged request fails with NPlusOneError.
+"""
+import contextvars
+import hashlib
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = 'X-SQL-Profile'
+MAX_REPORTS = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?|__\[POSTCOMPILE_\w+\]')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+_active_profiles = contextvars.ContextVar('sql_profiles', default=())
+_listeners_installed = False
+_install_lock = threading.Lock()
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+class NPlusOneError(AssertionError):
+    """Raised when a profile contains repeated statements above the threshold."""
+
+
+def normalize_sql(statement):
+    """Collapse literals and parameter lists so equivalent statements share a fingerprint."""
+    sql = _STRING_LITERAL.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    sql = _VALUES_LIST.sub(r'VALUES \1', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+class SQLProfile:
+    """Statements recorded while active, grouped by fingerprint."""
+
+    def __init__(self, threshold=3, label=None):
+        self.threshold = threshold
+        self.label = label
+        self.statements = []
+        self._groups = OrderedDict()
+
+    def record(self, statement, duration):
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = {'fingerprint': key, 'statement': normalized, 'count': 0, 'total_ms': 0.0}
+        group['count'] += 1
+        group['total_ms'] += duration * 1000
+        self.statements.append((key, duration))
+
+    @property
+    def query_count(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration in self.statements) * 1000
+
+    def repeated(self, threshold=None):
+        threshold = threshold or self.threshold
+        return [group for group in self._groups.values() if group['count'] >= threshold]
+
+    def report(self):
+        groups = sorted(self._groups.values(), key=lambda group: group['total_ms'], reverse=True)
+        return {
+            'label': self.label,
+            'query_count': self.query_count,
+            'total_ms': round(self.total_ms, 3),
+            'threshold': self.threshold,
+            'repeated': [dict(group, total_ms=round(group['total_ms'], 3)) for group in self.repeated()],
+            'fingerprints': [dict(group, total_ms=round(group['total_ms'], 3)) for group in groups],
+        }
+
+    def server_timing(self):
+        parts = [f'db;dur={self.total_ms:.2f};desc="{self.query_count} queries"']
+        repeated = self.repeated()
+        if repeated:
+            parts.append(f'n1;desc="{len(repeated)} repeated statements"')
+        return ', '.join(parts)
+
+    def assert_no_n_plus_one(self, threshold=None):
+        repeated = self.repeated(threshold)
+        if repeated:
+            lines = [f"{group['count']}x {group['statement']}" for group in repeated]
+            raise NPlusOneError('Repeated SQL detected:\n' + '\n'.join(lines))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profiles.get() and context is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = _active_profiles.get()
+    if not profiles:
+        return
+    start = getattr(context, '_profile_start', None)
+    duration = time.perf_counter() - start if start is not None else 0.0
+    for profile in profiles:
+        profile.record(statement, duration)
+
+
+def _install_listeners():
+    global _listeners_installed
+    with _install_lock:
+        if not _listeners_installed:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            _listeners_installed = True
+
+
+def _push(profile):
+    return _active_profiles.set(_active_profiles.get() + (profile,))
+
+
+@contextmanager
+def profile_sql(threshold=3, label=None):
+    """Record every statement executed inside the block (nestable, usable in tests)."""
+    _install_listeners()
+    profile = SQLProfile(threshold=threshold, label=label)
+    token = _push(profile)
+    try:
+        yield profile
+    finally:
+        _active_profiles.reset(token)
+
+
+def _store_report(report_id, report):
+    with _reports_lock:
+        _reports[report_id] = report
+        while len(_reports) > MAX_REPORTS:
+            _reports.popitem(last=False)
+
+
+def get_report(report_id):
+    with _reports_lock:
+        return _reports.get(report_id)
+
+
+def recent_reports():
+    """Most recent request reports first."""
+    with _reports_lock:
+        return [dict(report, id=key) for key, report in reversed(_reports.items())]
+
+
+def _is_admin_request():
+    """True for a platform admin, by JWT or Flask-Login session (same rules as admin_required)."""
+    try:
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        from .models import User
+        if request.headers.get('Authorization', '').startswith('Bearer '):
+            verify_jwt_in_request()
+            user = User.query.get(get_jwt_identity())
+            return user is not None and user.role == 'platform_admin'
+        from flask_login import current_user
+        return current_user.is_authenticated and current_user.is_admin()
+    except Exception:
+        return False
+
+
+def _should_profile():
+    mode = (current_app.config.get('SQL_PROFILING') or 'off').lower()
+    if mode == 'on':
+        return True
+    # Opting in by header is limited to admins (or debug builds) so clients can't add overhead at will
+    return (mode == 'header' and request.headers.get(PROFILE_HEADER) == '1'
+            and (current_app.debug or _is_admin_request()))
+
+
+def _start_request_profile():
+    if not _should_profile():
+        return
+    profile = SQLProfile(threshold=current_app.config.get('SQL_PROFILING_THRESHOLD', 3),
+                         label=f'{request.method} {request.full_path.rstrip("?")}')
+    g.sql_profile = profile
+    g.sql_profile_token = _push(profile)
+
+
+def _finish_request_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    _active_profiles.reset(g.pop('sql_profile_token'))
+
+    report_id = uuid.uuid4().hex[:16]
+    _store_report(report_id, profile.report())
+    response.headers['Server-Timing'] = profile.server_timing()
+    response.headers['X-SQL-Profile-Id'] = report_id
+
+    repeated = profile.repeated()
+    if repeated:
+        current_app.logger.warning(
+            f"Possible N+1 in {profile.label}: " +
+            '; '.join(f"{group['count']}x {group['statement'][:120]}" for group in repeated))
+        if current_app.config.get('SQL_PROFILING_RAISE'):
+            profile.assert_no_n_plus_one()
+    return response
+
+
+def _discard_request_profile(exc):
+    # after_request is skipped for unhandled errors; never leave a profile active on the thread
+    token = g.pop('sql_profile_token', None)
+    g.pop('sql_profile', None)
+    if token is not None:
+        _active_profiles.reset(token)
+
+
+def setup_sql_profiler(app):
+    """Enable request profiling when SQL_PROFILING is 'on' or 'header'."""
+    if (app.config.get('SQL_PROFILING') or 'off').lower() == 'off':
+        return False
+    _install_listeners()
+    app.before_request(_start_request_profile)
+    app.after_request(_finish_request_profile)
+    app.teardown_request(_discard_request_profile)
+    return True
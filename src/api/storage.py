@@ -0,0 +1,251 @@
+"""
+Content-addressed upload storage.
+
+Uploaded files are copied from the request stream to a temporary file in fixed
+size chunks while being hashed, so memory use is bounded by the chunk size and
+a per-file limit is enforced before anything is kept. The final name is the
+SHA-256 of the content: re-uploading the same image reuses the existing blob
+instead of storing another copy.
+
+Backends implement a small interface so object storage can be added later;
+`LocalObjectStorage` is a local stand-in that uses bucket-style sharded keys.
+"""
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+from .models import db, Blob
+
+CHUNK_SIZE = 64 * 1024
+
+_PENDING_KEY = 'uploaded_blob_keys'
+
+StoredObject = namedtuple('StoredObject', ['sha256', 'size', 'key', 'created', 'temp_path'], defaults=(None,))
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded file exceeds UPLOAD_MAX_FILE_SIZE."""
+
+
+class BlobStorage:
+    """Interface for blob backends. Keys are opaque, URL-safe relative paths."""
+
+    name = 'base'
+
+    def key_for(self, sha256, ext):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def commit_temp(self, temp_path, key):
+        """Move a fully written temp file into place under key."""
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Filesystem path for key, or None if the backend is remote."""
+        return None
+
+    def open(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def temp_dir(self):
+        return tempfile.gettempdir()
+
+    def save_stream(self, stream, ext='', max_size=None, existing_key=None, keep_temp=False):
+        """Stream to a temp file while hashing; dedupe on the resulting content hash.
+
+        `existing_key(sha256)` may return the key content with that hash is
+        already stored under, in which case nothing is written. When the key
+        exists without being known to `existing_key` and keep_temp is set, the
+        temp file is kept and returned as temp_path; the caller removes it.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        keep = False
+        fd, temp_path = tempfile.mkstemp(prefix='upload-', dir=self.temp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise UploadTooLargeError(f'File exceeds the maximum upload size of {max_size} bytes')
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            sha256 = digest.hexdigest()
+            key = existing_key(sha256) if existing_key else None
+            if key is not None:
+                return StoredObject(sha256, size, key, False)
+            key = self.key_for(sha256, ext)
+            os.chmod(temp_path, 0o644)
+            if self.exists(key):
+                keep = keep_temp
+                return StoredObject(sha256, size, key, False, temp_path if keep else None)
+            self.commit_temp(temp_path, key)
+            return StoredObject(sha256, size, key, True)
+        finally:
+            if not keep and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+class LocalBlobStorage(BlobStorage):
+    """Flat files in UPLOAD_FOLDER named <sha256><ext>; served by /api/uploads/<key>."""
+
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def key_for(self, sha256, ext):
+        return f"{sha256}{ext}"
+
+    def local_path(self, key):
+        return safe_join(self.root, key)
+
+    def exists(self, key):
+        path = self.local_path(key)
+        return path is not None and os.path.isfile(path)
+
+    def commit_temp(self, temp_path, key):
+        os.replace(temp_path, self.local_path(key))
+
+    def open(self, key):
+        return open(self.local_path(key), 'rb')
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if path and os.path.isfile(path):
+            os.remove(path)
+
+    def temp_dir(self):
+        # Same filesystem as the final location so commit_temp is an atomic rename
+        return self.root
+
+
+class LocalObjectStorage(LocalBlobStorage):
+    """Local stand-in for an object store: bucket-style keys blobs/<ab>/<sha256><ext>."""
+
+    name = 'object-local'
+
+    def key_for(self, sha256, ext):
+        return f"blobs/{sha256[:2]}/{sha256}{ext}"
+
+    def commit_temp(self, temp_path, key):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+
+def create_storage(app):
+    backend = (app.config.get('UPLOAD_STORAGE_BACKEND') or 'local').lower()
+    if backend == 'object-local':
+        return LocalObjectStorage(app.config.get('UPLOAD_OBJECT_ROOT') or app.config['UPLOAD_FOLDER'])
+    return LocalBlobStorage(app.config['UPLOAD_FOLDER'])
+
+
+def get_storage():
+    storage = current_app.extensions.get('blob_storage')
+    if storage is None:
+        storage = current_app.extensions['blob_storage'] = create_storage(current_app)
+    return storage
+
+
+def _existing_blob_key(sha256):
+    return db.session.query(Blob.storage_key).filter_by(sha256=sha256).scalar()
+
+
+def _committed_blob_uses(key):
+    """True if a committed Blob row references key; read outside the session's transaction."""
+    with db.engine.connect() as connection:
+        return connection.execute(select(Blob.id).where(Blob.storage_key == key).limit(1)).first() is not None
+
+
+def _discard_temp(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def store_upload(file_storage):
+    """Persist a werkzeug FileStorage as a deduplicated Blob and return the Blob row.
+
+    Content already stored under another extension is found by hash before
+    anything is written. A newly written file is removed again if its Blob
+    loses an insert race or the surrounding transaction does not commit, unless
+    a committed Blob from another request has come to reference it meanwhile.
+    A file that already existed without a committed Blob belongs to another
+    request's open transaction, so this upload keeps its own copy until commit
+    and puts it back if that transaction rolled back and removed the file.
+    """
+    storage = get_storage()
+    ext = os.path.splitext(secure_filename(file_storage.filename or ''))[1].lower()
+    stored = storage.save_stream(file_storage.stream, ext, max_size=current_app.config.get('UPLOAD_MAX_FILE_SIZE'),
+                                 existing_key=_existing_blob_key, keep_temp=True)
+
+    blob = Blob.query.filter_by(sha256=stored.sha256).first()
+    if blob is not None:
+        _discard_temp(stored.temp_path)
+        return blob
+
+    blob = Blob(sha256=stored.sha256, size=stored.size, content_type=file_storage.mimetype,
+                storage_backend=storage.name, storage_key=stored.key)
+    try:
+        # Savepoint so a concurrent insert of the same hash doesn't poison the outer transaction
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        blob = Blob.query.filter_by(sha256=stored.sha256).one()
+        if stored.created and blob.storage_key != stored.key:
+            storage.delete(stored.key)
+        _discard_temp(stored.temp_path)
+        return blob
+    if stored.created or stored.temp_path:
+        db.session.info.setdefault(_PENDING_KEY, []).append((storage, stored.key, stored.temp_path))
+    return blob
+
+
+def _keep_uploads(session):
+    for storage, key, temp_path in session.info.pop(_PENDING_KEY, ()):
+        try:
+            if temp_path and not storage.exists(key):
+                # The request that wrote the file rolled back and removed it before this Blob committed
+                storage.commit_temp(temp_path, key)
+            _discard_temp(temp_path)
+        except OSError as e:
+            print(f"Warning: could not restore upload {key}: {e}")
+
+
+def _remove_uncommitted_uploads(session, transaction):
+    # Only the outermost transaction decides; files still pending here were never committed
+    if transaction.parent is not None or transaction.nested:
+        return
+    for storage, key, temp_path in session.info.pop(_PENDING_KEY, ()):
+        try:
+            if temp_path:
+                _discard_temp(temp_path)
+            elif not _committed_blob_uses(key):
+                storage.delete(key)
+        except Exception as e:
+            print(f"Warning: could not remove uncommitted upload {key}: {e}")
+
+
+def setup_storage(app):
+    """Create the upload storage backend and remove files whose Blob row was rolled back."""
+    app.extensions['blob_storage'] = create_storage(app)
+    event.listen(Session, 'after_commit', _keep_uploads)
+    event.listen(Session, 'after_transaction_end', _remove_uncommitted_uploads)
@@ -3,6 +3,7 @@ from flask_restx import Api
 from flask_jwt_extended import get_jwt_identity
 import json
 from .models import db, AuditLog
+from .image_pipeline import variant_urls, variant_urls_from
 
 
 def log_action(user_id, action_type, target_type=None, target_id=None, old_value=None, new_value=None):
@@ -138,38 +139,20 @@ def serialize_location(location):
         'postal_code': location.postal_code
     }
 
-def serialize_organization(org, include_details=False):
+def serialize_organization(org, include_details=False, include_bookmark=True):
     """
     Helper function to serialize an organization object.
 
     :param org: The Organization object to serialize.
     :param include_details: If True, includes more detailed fields like photos and social links.
+    :param include_bookmark: If False, skips the per-user is_bookmarked / bookmark_id lookup
+        (callers serializing many organizations add it with one query, see org_cache.bookmark_status).
     """
     if not org:
         return None
 
-    # Find the primary photo URL
-    primary_photo_url = None
-    if org.photos:
-        primary_photo = next((p for p in org.photos if p.is_primary), None)
-        if primary_photo:
-            if primary_photo.file_path:
-                primary_photo_url = primary_photo.file_path
-            else:
-                try:
-                    primary_photo_url = url_for('uploaded_file', filename=primary_photo.file_name, _external=False)
-                except:
-                    primary_photo_url = f"/uploads/{primary_photo.file_name}"
-        elif org.photos:
-            # Fallback to the first photo if no primary is set
-            first_photo = org.photos[0]
-            if first_photo.file_path:
-                primary_photo_url = first_photo.file_path
-            else:
-                try:
-                    primary_photo_url = url_for('uploaded_file', filename=first_photo.file_name, _external=False)
-                except:
-                    primary_photo_url = f"/uploads/{first_photo.file_name}"
+    # Primary photo is resolved and stored on the organization (see primary_photo.py)
+    primary_photo_variants, primary_photo_srcset = variant_urls_from(org.primary_photo_variants)
 
     logo_full_url = None
     if org.logo_url:
@@ -189,7 +172,10 @@ def serialize_organization(org, include_details=False):
         'category_id': org.category.id if org.category else None,
         'location': serialize_location(org.location),
         'logo_url': logo_full_url,
-        'primary_photo_url': primary_photo_url,
+        'primary_photo_url': org.primary_photo_url,
+        'primary_photo_thumb_url': org.primary_photo_thumb_url,
+        'primary_photo_variants': primary_photo_variants,
+        'primary_photo_srcset': primary_photo_srcset,
         'email': org.email,
         'phone': org.phone,
         'address': org.address,
@@ -207,21 +193,22 @@ def serialize_organization(org, include_details=False):
     }
 
     # Add bookmark status if a user is logged in
-    try:
-        from flask_jwt_extended import get_jwt_identity
-        from .models import UserBookmark
-        current_user_id = get_jwt_identity()
-        if current_user_id:
-            bookmark = UserBookmark.query.filter_by(user_id=current_user_id, organization_id=org.id).first()
-            data['is_bookmarked'] = bookmark is not None
-            data['bookmark_id'] = bookmark.id if bookmark else None
-        else:
+    if include_bookmark:
+        try:
+            from flask_jwt_extended import get_jwt_identity
+            from .models import UserBookmark
+            current_user_id = get_jwt_identity()
+            if current_user_id:
+                bookmark = UserBookmark.query.filter_by(user_id=current_user_id, organization_id=org.id).first()
+                data['is_bookmarked'] = bookmark is not None
+                data['bookmark_id'] = bookmark.id if bookmark else None
+            else:
+                data['is_bookmarked'] = False
+                data['bookmark_id'] = None
+        except Exception:
+            # If any error happens (e.g., no JWT), default to not bookmarked
             data['is_bookmarked'] = False
             data['bookmark_id'] = None
-    except Exception:
-        # If any error happens (e.g., no JWT), default to not bookmarked
-        data['is_bookmarked'] = False
-        data['bookmark_id'] = None
 
     if include_details:
         photos = []
@@ -232,7 +219,9 @@ def serialize_organization(org, include_details=False):
                     url = url_for('uploaded_file', filename=p.file_name, _external=False)
                 except:
                     url = f"/uploads/{p.file_name}"
-            photos.append({'id': p.id, 'url': url, 'alt_text': p.alt_text})
+            variants, srcset = variant_urls(p)
+            photos.append({'id': p.id, 'url': url, 'alt_text': p.alt_text, 'width': p.width, 'height': p.height,
+                           'variants': variants, 'srcset': srcset})
 
         data['photos'] = photos
         data['social_links'] = [{'platform': s.platform, 'url': s.url} for s in org.social_links]
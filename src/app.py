@@ -1,6 +1,7 @@
 """
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
+import hmac
 import os
 from flask import Flask, request, jsonify, url_for, send_from_directory, render_template
 from markupsafe import escape
@@ -12,11 +13,26 @@ from flask_login import LoginManager
 from flask_mail import Mail
 from datetime import timedelta
 from api.utils import APIException, generate_sitemap
-from api.decorators import login_required_hybrid
+from api.decorators import admin_required, login_required_hybrid
 from api.models import db
 from api.routes import api_bp
 from api.admin import setup_admin
 from api.commands import setup_commands
+from api.cache import setup_response_cache
+from api.sitemap import sitemap_response
+from api.prerender import get_prerendered_page
+from api.file_serving import serve_upload
+from api.db_pool import build_engine_options, setup_pool_metrics, pool_stats
+from api.db_routing import replica_bind_options, setup_db_routing, read_replica
+from api.metrics import setup_metrics, metrics_response
+from api.sql_profiler import setup_sql_profiler, recent_reports, get_report
+from api.search_index import setup_search_index
+from api.org_cache import setup_org_cache
+from api.primary_photo import setup_primary_photos
+from api.bookmarks import setup_bookmarks
+from api.storage import setup_storage
+from api.serialization import setup_json_encoder
+from api.core import api
 import logging
 import sqlalchemy
 # seed_all removed from direct imports; seeding should be run via CLI when needed
@@ -164,15 +180,93 @@ db_url = os.getenv("DATABASE_URL")
 if not db_url:
     raise ValueError("DATABASE_URL environment variable is required")
 app.config['SQLALCHEMY_DATABASE_URI'] = db_url
+# Pool sizing, pre-ping, recycle and statement timeout per worker (DB_* env vars)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(db_url)
+app.config['DB_POOL_SATURATION_WARN'] = float(os.getenv('DB_POOL_SATURATION_WARN', 0.9))
+# Optional read replica for read-only handlers (see api/db_routing.py)
+app.config['DATABASE_REPLICA_URL'] = os.getenv('DATABASE_REPLICA_URL')
+app.config['DB_REPLICA_STICKY_SECONDS'] = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+app.config['SQLALCHEMY_BINDS'] = replica_bind_options(app, build_engine_options)
 
 # Define the upload folder
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True) # Ensure the folder exists
 
+# Upload offload to a front proxy: 'x-sendfile' (Apache/lighttpd), 'x-accel' (nginx) or unset
+app.config['UPLOAD_OFFLOAD'] = os.getenv('UPLOAD_OFFLOAD')
+app.config['UPLOAD_ACCEL_PREFIX'] = os.getenv('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+app.config['USE_X_SENDFILE'] = (app.config['UPLOAD_OFFLOAD'] or '').lower() == 'x-sendfile'
+
+# Content-addressed upload storage: 'local' (flat in UPLOAD_FOLDER) or 'object-local' (bucket-style stand-in)
+app.config['UPLOAD_STORAGE_BACKEND'] = os.getenv('UPLOAD_STORAGE_BACKEND', 'local')
+app.config['UPLOAD_OBJECT_ROOT'] = os.getenv('UPLOAD_OBJECT_ROOT')
+app.config['UPLOAD_MAX_FILE_SIZE'] = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 10 * 1024 * 1024))
+# Whole-request cap; werkzeug answers 413 before the body is parsed
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+
+# Prerendered crawler pages (see `flask prerender`); base URL defaults to the request host
+app.config['PRERENDER_CACHE_DIR'] = os.getenv('PRERENDER_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prerender_cache'))
+app.config['PRERENDER_BASE_URL'] = os.getenv('PRERENDER_BASE_URL')
+
+# Near-me search (/search/organizations?lat=&lng=&radius_km=): 'memory' grid per worker or 'database' bounding-box query
+app.config['GEO_SEARCH_BACKEND'] = os.getenv('GEO_SEARCH_BACKEND', 'memory')
+app.config['GEO_INDEX_TTL'] = int(os.getenv('GEO_INDEX_TTL', 300))
+app.config['GEO_GRID_CELL_DEGREES'] = float(os.getenv('GEO_GRID_CELL_DEGREES', 0.5))
+app.config['GEO_MAX_RADIUS_KM'] = float(os.getenv('GEO_MAX_RADIUS_KM', 500))
+
+# Search ordering for text queries: 'relevance' (BM25 + popularity/verification/recency boosts) or 'popularity'
+app.config['SEARCH_RANKING'] = os.getenv('SEARCH_RANKING', 'relevance')
+app.config['SEARCH_RANK_WEIGHTS'] = os.getenv('SEARCH_RANK_WEIGHTS', '')
+app.config['SEARCH_BM25_K1'] = float(os.getenv('SEARCH_BM25_K1', 1.2))
+app.config['SEARCH_BM25_B'] = float(os.getenv('SEARCH_BM25_B', 0.75))
+app.config['SEARCH_RECENCY_HALF_LIFE_DAYS'] = float(os.getenv('SEARCH_RECENCY_HALF_LIFE_DAYS', 365))
+app.config['SEARCH_RANKING_TTL'] = int(os.getenv('SEARCH_RANKING_TTL', 300))
+app.config['SEARCH_RANKING_REBUILD_INTERVAL'] = int(os.getenv('SEARCH_RANKING_REBUILD_INTERVAL', 30))
+
+# In-process inverted index for organization text search: 'auto' (on unless PostgreSQL), 'on' or 'off'
+app.config['SEARCH_INDEX'] = os.getenv('SEARCH_INDEX', 'auto')
+app.config['SEARCH_INDEX_PATH'] = os.getenv('SEARCH_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_index'))
+app.config['SEARCH_INDEX_REFRESH'] = int(os.getenv('SEARCH_INDEX_REFRESH', 60))
+app.config['SEARCH_INDEX_CATCHUP_WINDOW'] = int(os.getenv('SEARCH_INDEX_CATCHUP_WINDOW', 600))
+
+# Facet counts (/search/organizations?facets=true) are cached per normalized query for this many seconds
+app.config['SEARCH_FACETS_TIMEOUT'] = int(os.getenv('SEARCH_FACETS_TIMEOUT', 300))
+
+# Search result cache: ordered id lists per normalized query/filters
+app.config['SEARCH_RESULT_CACHE_TIMEOUT'] = int(os.getenv('SEARCH_RESULT_CACHE_TIMEOUT', 120))
+app.config['SEARCH_RESULT_CACHE_MAX_IDS'] = int(os.getenv('SEARCH_RESULT_CACHE_MAX_IDS', 10000))
+
+# Per-worker organization entity cache (detail, summary, contact, photos, prerender, search pages)
+app.config['ORG_CACHE_MAX_BYTES'] = int(os.getenv('ORG_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+app.config['ORG_CACHE_TTL'] = int(os.getenv('ORG_CACHE_TTL', 300))
+
+# API response encoder: auto (orjson when installed), orjson or stdlib
+app.config['JSON_ENCODER'] = os.getenv('JSON_ENCODER', 'auto')
+
+# Stored `flask bench` runs for comparison across commits
+app.config['BENCH_RESULTS_DIR'] = os.getenv('BENCH_RESULTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results'))
+
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Response cache for public GET endpoints: 'memory' (per worker), 'redis' (shared) or 'none'
+app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL')
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2048))
+app.config['RESPONSE_CACHE_DEFAULT_TIMEOUT'] = int(os.getenv('RESPONSE_CACHE_DEFAULT_TIMEOUT', 60))
+
+# Prometheus metrics on /metrics, readable by platform admins or scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+# SQL profiling / N+1 detection: 'off', 'on' (every request) or 'header' (admin requests sending X-SQL-Profile: 1)
+app.config['SQL_PROFILING'] = os.getenv('SQL_PROFILING', 'off')
+app.config['SQL_PROFILING_THRESHOLD'] = int(os.getenv('SQL_PROFILING_THRESHOLD', 3))
+app.config['SQL_PROFILING_RAISE'] = os.getenv('SQL_PROFILING_RAISE', 'false').lower() == 'true'
+
 MIGRATE = Migrate(app, db, compare_type=True)
 db.init_app(app)
+setup_pool_metrics(app, db)
 
 # add the admin
 setup_admin(app)
@@ -180,6 +274,36 @@ setup_admin(app)
 # Setup custom commands
 setup_commands(app)
 
+# Setup response caching for public read endpoints
+setup_response_cache(app)
+
+# Sticky-primary tracking for read-replica routing
+setup_db_routing(app)
+
+# Request latency / SQL / cache / email metrics
+METRICS_ACTIVE = setup_metrics(app)
+
+# Per-request SQL fingerprints, Server-Timing and N+1 warnings (SQL_PROFILING)
+setup_sql_profiler(app)
+
+# Inverted index for organization search (memory-mapped snapshot + incremental updates)
+setup_search_index(app)
+
+# Read-through organization cache, invalidated on commits touching an organization
+setup_org_cache(app)
+
+# Keep organizations' denormalized primary photo in step with their photos
+setup_primary_photos(app)
+
+# Maintain organizations' bookmark_count with atomic increments
+setup_bookmarks(app)
+
+# Upload storage; files written for rolled back uploads are removed again
+setup_storage(app)
+
+# Encode API responses with orjson (JSON_ENCODER)
+setup_json_encoder(app, api)
+
 # Add all endpoints form the API with a "api" prefix
 app.register_blueprint(api_bp, url_prefix='/api')
 
@@ -198,21 +322,73 @@ def protect_api_docs():
 def health_check():
     """Health check endpoint — also verifies DB connectivity.
 
-    Returns 200 when app + DB are reachable, 503 when DB is down.
+    Returns 200 when app + DB are reachable, 503 when DB is down. The check
+    runs on the request's pooled session connection and reports pool saturation.
     """
     # Basic app health
     status = {'status': 'healthy', 'message': 'API is running'}
     # Attempt a minimal DB operation to verify connectivity
     try:
         # run a lightweight SELECT 1
-        with db.engine.connect() as conn:
-            conn.execute(sqlalchemy.text('SELECT 1'))
+        db.session.execute(sqlalchemy.text('SELECT 1'))
     except Exception as e:
         logging.exception('Database health check failed')
         return jsonify({'status': 'unhealthy', 'message': 'database unreachable'}), 503
+
+    pool = pool_stats(db.engine)
+    status['pool'] = pool
+    if pool.get('saturation', 0) >= app.config['DB_POOL_SATURATION_WARN']:
+        status['status'] = 'degraded'
+        status['message'] = 'database pool is near capacity'
     return jsonify(status), 200
 
 
+@app.route('/db/pool/stats')
+@admin_required
+def db_pool_stats():
+    """Connection pool usage for this worker, per engine."""
+    engines = {key or 'default': pool_stats(engine) for key, engine in db.engines.items()}
+    return jsonify(engines), 200
+
+
+@app.route('/cache/stats')
+@admin_required
+def cache_stats():
+    """Response cache hit-rate statistics for this worker."""
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(cache.stats(), enabled=True)), 200
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (aggregated across workers in multiprocess mode)."""
+    if not METRICS_ACTIVE:
+        return jsonify({'message': 'metrics are disabled'}), 404
+    token = app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return metrics_response(app)
+    return admin_required(metrics_response)(app)
+
+
+@app.route('/debug/sql-profiles')
+@admin_required
+def sql_profiles():
+    """Recent per-request SQL profiling reports from this worker."""
+    return jsonify(recent_reports()), 200
+
+
+@app.route('/debug/sql-profiles/<report_id>')
+@admin_required
+def sql_profile(report_id):
+    """One SQL profiling report, as referenced by the X-SQL-Profile-Id header."""
+    report = get_report(report_id)
+    if report is None:
+        return jsonify({'message': 'report not found'}), 404
+    return jsonify(report), 200
+
+
 # Capture DB connection errors and surface a friendly 503 JSON
 @app.errorhandler(sqlalchemy.exc.OperationalError)
 def handle_db_operational_error(error):
@@ -223,7 +399,7 @@ def handle_db_operational_error(error):
 # Serve uploaded files
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(filename)
 
 # Also handle /api/uploads/ for frontend compatibility
 @app.route('/api/uploads/<path:filename>')
@@ -231,7 +407,7 @@ def api_uploaded_file(filename):
     # If the path already has /uploads/ in it, we need to extract just the filename
     if filename.startswith('uploads/'):
         filename = filename.replace('uploads/', '')
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_upload(filename)
 
 # Handle/serialize errors like a JSON object
 @app.errorhandler(APIException)
@@ -263,47 +439,23 @@ def sitemap():
 
 
 @app.route('/sitemap.xml')
+@read_replica
 def public_sitemap_xml():
-    """Public sitemap XML including organization pages."""
-    # Attempt to generate a basic sitemap using app.url_map and organization IDs
+    """Public sitemap XML including organization pages (a sitemap index past 50k URLs)."""
     try:
-        from api.models import Organization
-        from xml.etree.ElementTree import Element, SubElement, tostring
-        root = Element('urlset', xmlns='http://www.sitemaps.org/schemas/sitemap/0.9')
-        # Add homepage
-        url = SubElement(root, 'url')
-        loc = SubElement(url, 'loc')
-        loc.text = request.url_root.rstrip('/')
-
-        # add each approved organization
-        orgs = Organization.query.filter_by(status='approved').all()
-        for o in orgs:
-            u = SubElement(root, 'url')
-            loc = SubElement(u, 'loc')
-            slug = (o.name or '').lower().replace(' ', '-')
-            path = f"/organizations/{o.id}-{slug}"
-            loc.text = f"{request.url_root.rstrip('/')}{path}"
-
-            # lastmod (use updated_at or created_at)
-            last = getattr(o, 'updated_at', None) or getattr(o, 'created_at', None)
-            if last:
-                lastmod = SubElement(u, 'lastmod')
-                lastmod.text = last.strftime('%Y-%m-%d')
-
-            # changefreq heuristic: frequent for verified orgs, monthly otherwise
-            cf = SubElement(u, 'changefreq')
-            cf.text = 'weekly' if getattr(o, 'is_verified', False) else 'monthly'
-
-            # priority heuristic: higher for verified organizations
-            pr = SubElement(u, 'priority')
-            pr.text = '0.8' if getattr(o, 'is_verified', False) else '0.5'
-
-        xml_str = tostring(root, encoding='utf-8', method='xml')
-        return app.response_class(xml_str, mimetype='application/xml')
+        return sitemap_response()
     except Exception as e:
+        logging.exception('Sitemap generation failed')
         return generate_sitemap(app)
 
 
+@app.route('/sitemap-<int:shard>.xml')
+@read_replica
+def public_sitemap_shard(shard):
+    """One <urlset> shard referenced from the sitemap index."""
+    return sitemap_response(shard)
+
+
 @app.route('/robots.txt')
 def robots_txt():
     """Provide robots.txt optimized for AI crawlers while protecting sensitive paths."""
@@ -341,104 +493,30 @@ def api_docs_ai():
 
 
 @app.route('/prerender/organizations/<int:org_id>')
+@read_replica
 def prerender_organization(org_id):
     """Return a small server-rendered HTML snippet with meta tags and JSON-LD for bots.
 
     This keeps the payload minimal and is intended for crawlers and LLM scrapers that
-    do not execute client-side JavaScript. It mirrors key fields from the Organization
-    model and normalizes image URLs to the /api/uploads/ route when necessary.
+    do not execute client-side JavaScript. Pages are cached by org id and updated_at
+    (memory, then PRERENDER_CACHE_DIR) and only rebuilt when the organization changes.
     """
     try:
-        from api.models import Organization
-        o = Organization.query.get(org_id)
-        if not o or getattr(o, 'status', '') != 'approved':
+        page = get_prerendered_page(org_id)
+        if page is None:
             return app.response_class('Not Found', status=404)
 
-        # Build basic fields with safe fallbacks
-        name = o.name or ''
-        description = (getattr(o, 'description', None) or getattr(o, 'mission', '') or '')
-        description = description.strip()[:300]  # keep it short
-        website = getattr(o, 'website', '') or ''
-
-        # Select image: prefer logo_url, otherwise first OrganizationPhoto.file_path or file_name
-        image = ''
-        if getattr(o, 'logo_url', None):
-            image = o.logo_url
-        else:
-            photos = getattr(o, 'photos', None) or []
-            if isinstance(photos, (list, tuple)) and photos:
-                first = photos[0]
-                # OrganizationPhoto has file_path and file_name
-                if hasattr(first, 'file_path') and first.file_path:
-                    image = first.file_path
-                elif hasattr(first, 'file_name') and first.file_name:
-                    image = first.file_name
-
-        # Normalize image path: if DB stored "/ads/..." or "uploads/...", map to /api/uploads/<filename>
-        def normalize_image_url(img):
-            if not img:
-                return ''
-            # If it already looks like an absolute URL, return as-is
-            if isinstance(img, str) and (img.startswith('http://') or img.startswith('https://')):
-                return img
-            # Strip leading slash if present
-            candidate = img.lstrip('/') if isinstance(img, str) else ''
-            # If candidate now looks like an absolute URL, return original img
-            if candidate.startswith('http://') or candidate.startswith('https://'):
-                return img
-            # Otherwise treat last path segment as filename and serve via api_uploaded_file
-            filename = candidate.split('/')[-1] if candidate else ''
-            if not filename:
-                return ''
-            return url_for('api_uploaded_file', filename=filename, _external=True)
-
-        image_url = normalize_image_url(image)
-
-        # JSON-LD
-        jsonld = {
-            "@context": "https://schema.org",
-            "@type": "Organization",
-            "name": name,
-            "description": description,
-        }
-        if website:
-            jsonld["url"] = website
-        if image_url:
-            jsonld["logo"] = image_url
-
-        # Minimal HTML payload with meta tags and JSON-LD script
-        html_parts = [
-            '<!doctype html>',
-            '<html lang="en">',
-            '<head>',
-            f'  <meta charset="utf-8">',
-            f'  <title>{escape(name) if name else "Organization"}</title>',
-            f'  <meta name="description" content="{escape(description)}">',
-        ]
-
-        if image_url:
-            html_parts.append(f'  <meta property="og:image" content="{image_url}">')
-            html_parts.append(f'  <meta name="twitter:image" content="{image_url}">')
-
-        if website:
-            html_parts.append(f'  <link rel="canonical" href="{website}">')
-
-        html_parts.append(f'  <script type="application/ld+json">')
-        import json
-        html_parts.append(json.dumps(jsonld))
-        html_parts.append('  </script>')
-        html_parts.append('</head>')
-        html_parts.append('<body>')
-        html_parts.append(f'<h1>{escape(name)}</h1>')
-        if description:
-            html_parts.append(f'<p>{escape(description)}</p>')
-        html_parts.append('</body>')
-        html_parts.append('</html>')
-
-        content = '\n'.join(html_parts)
-        return app.response_class(content, mimetype='text/html')
+        content, updated_at, key = page
+        response = app.response_class(content, mimetype='text/html')
+        response.set_etag(key)
+        if updated_at:
+            response.last_modified = updated_at
+        response.cache_control.public = True
+        response.cache_control.max_age = 3600
+        return response.make_conditional(request)
     except Exception:
         # In production, avoid leaking internals; return a generic 500.
+        logging.exception('Prerender failed for organization %s', org_id)
         return app.response_class('Server Error', status=500)
 
 @app.route('/')
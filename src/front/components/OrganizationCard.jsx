@@ -60,6 +60,9 @@ const OrganizationCard = ({ organization, onCardClick }) => {
       <div className="card-img-container">
         <img
           src={`/api/uploads/${organization.primary_photo_url}`}
+          srcSet={organization.primary_photo_srcset || undefined}
+          sizes={organization.primary_photo_srcset ? '(max-width: 576px) 100vw, 480px' : undefined}
+          loading="lazy"
           alt={organization.name}
           className="card-img-top"
         />
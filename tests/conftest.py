@@ -0,0 +1,93 @@
+"""
+Shared fixtures: the Flask app on a throwaway SQLite database with a small data set.
+
+app.py reads its configuration at import time, so the environment is set up
+before it is imported. The response cache and search index are disabled so
+every request reaches the handlers and their SQL; tests that exercise the cache
+enable it with the response_cache fixture.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+TMP = tempfile.mkdtemp(prefix='charity-tests-')
+
+sys.path.insert(0, SRC)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP, 'test.db')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+os.environ['SEARCH_INDEX'] = 'off'
+os.environ['METRICS_ENABLED'] = 'false'
+os.environ['PRERENDER_CACHE_DIR'] = os.path.join(TMP, 'prerender_cache')
+os.environ['AI_API_KEYS'] = 'test-key'
+
+API_KEY = 'test-key'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    from api.models import db, User, Category, Location, Organization, UserBookmark
+
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        categories = [Category(name=f'Category {i}') for i in range(3)]
+        locations = [Location(country='USA', state_province='CA', city=f'City {i}', is_active=True) for i in range(5)]
+        db.session.add_all(categories + locations)
+        db.session.flush()
+        organizations = [
+            Organization(name=f'Food Bank {i}', mission='Feeding neighbors', description='Community pantry',
+                         status='approved', category_id=categories[i % 3].id, location_id=locations[i % 5].id)
+            for i in range(12)
+        ]
+        user = User(name='Member', email='member@example.com', role='visitor')
+        other = User(name='Other member', email='other@example.com', role='visitor')
+        db.session.add_all(organizations + [user, other])
+        db.session.flush()
+        db.session.add_all(UserBookmark(user_id=user.id, organization_id=org.id) for org in organizations[:6])
+        db.session.commit()
+    yield flask_app
+
+
+@pytest.fixture
+def client(app):
+    from api.org_cache import get_org_cache
+    # Start each test cold so record and card loads are profiled too
+    get_org_cache(app).clear()
+    return app.test_client()
+
+
+@pytest.fixture
+def response_cache(app):
+    """An in-process response cache for the duration of one test."""
+    from api.cache import LRUCacheBackend, ResponseCache
+    app.extensions['response_cache'] = ResponseCache(LRUCacheBackend())
+    yield app.extensions['response_cache']
+    del app.extensions['response_cache']
+
+
+def _token_for(app, email):
+    from flask_jwt_extended import create_access_token
+    from api.models import User
+    with app.app_context():
+        user = User.query.filter_by(email=email).one()
+        return create_access_token(identity=str(user.id))
+
+
+@pytest.fixture(scope='session')
+def user_token(app):
+    return _token_for(app, 'member@example.com')
+
+
+@pytest.fixture
+def auth_headers(user_token):
+    return {'Authorization': f'Bearer {user_token}'}
+
+
+@pytest.fixture
+def other_auth_headers(app):
+    """Headers for a second signed-in user without bookmarks."""
+    return {'Authorization': f'Bearer {_token_for(app, "other@example.com")}'}
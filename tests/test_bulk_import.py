@@ -0,0 +1,16 @@
+"""
+Malformed import rows are reported per row instead of aborting the import.
+"""
+import io
+
+from api.bulk_import import import_organizations, read_records
+
+
+def test_jsonl_rows_with_wrong_types_are_reported(app):
+    lines = [b'[1]', b'{"name": "A", "email": 123}', b'{"name": "B", "website": 5}',
+             b'{"name": "C", "city": 5}', b'{"name": "Valid", "established_year": 1990}']
+    with app.app_context():
+        report = import_organizations(read_records(io.BytesIO(b'\n'.join(lines)), 'jsonl'), dry_run=True)
+    assert (report.total, report.created, report.failed) == (5, 1, 4)
+    assert [error['errors'] for error in report.errors] == [
+        ['row is not a JSON object'], ['email must be text'], ['website must be text'], ['city must be text']]
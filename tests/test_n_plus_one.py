@@ -0,0 +1,65 @@
+"""
+Handlers that used to issue one query per row must keep a constant number of
+statements: each runs inside profile_sql() and fails on any repeated fingerprint.
+"""
+from flask_jwt_extended import verify_jwt_in_request
+
+from api.sql_profiler import profile_sql
+from conftest import API_KEY
+
+
+def test_organization_list_bookmarks(client, response_cache, auth_headers, other_auth_headers):
+    with profile_sql(label='organization list') as profile:
+        response = client.get('/api/organizations?per_page=12', headers=auth_headers)
+    assert response.status_code == 200
+    organizations = response.get_json()['organizations']
+    assert len(organizations) == 12
+    assert sum(org['is_bookmarked'] for org in organizations) == 6
+    assert all(org['bookmark_id'] for org in organizations if org['is_bookmarked'])
+    profile.assert_no_n_plus_one()
+
+    # A second user must not be served the first user's bookmark fields from the cache
+    other = client.get('/api/organizations?per_page=12', headers=other_auth_headers).get_json()['organizations']
+    assert not any(org['is_bookmarked'] or org['bookmark_id'] for org in other)
+
+
+def test_organization_bookmark_status_for_signed_in_user(app, client, auth_headers):
+    from api.list_view import organization_fragments
+    from api.org_cache import get_organization_records
+    from api.models import Organization
+
+    with app.test_request_context(headers=auth_headers):
+        verify_jwt_in_request()
+        ids = [row.id for row in Organization.query.with_entities(Organization.id)]
+        with profile_sql(label='organization bookmarks') as profile:
+            fragments = organization_fragments(ids)
+            records = get_organization_records(ids)
+    assert len(fragments) == len(records) == len(ids)
+    assert sum(b'"is_bookmarked":true' in fragment for fragment in fragments) == 6
+    profile.assert_no_n_plus_one()
+
+
+def test_location_list(client):
+    with profile_sql(label='LocationList') as profile:
+        response = client.get('/api/locations')
+    assert response.status_code == 200
+    locations = response.get_json()['locations']
+    assert len(locations) == 5
+    assert sum(location['organization_count'] for location in locations) == 12
+    profile.assert_no_n_plus_one()
+
+
+def test_organization_ai_search(client):
+    with profile_sql(label='OrganizationAiSearch') as profile:
+        response = client.get('/api/organizations/ai-search?q=food&limit=12', headers={'X-API-KEY': API_KEY})
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == 12
+    profile.assert_no_n_plus_one()
+
+
+def test_user_bookmarks(client, auth_headers):
+    with profile_sql(label='/users/bookmarks') as profile:
+        response = client.get('/api/users/bookmarks', headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == 6
+    profile.assert_no_n_plus_one()
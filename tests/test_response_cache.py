@@ -0,0 +1,27 @@
+"""
+Cached public endpoints must never hand one visitor's per-user fields to another.
+"""
+
+
+def _bookmarked(response):
+    return [org['is_bookmarked'] for org in response.get_json()['organizations']]
+
+
+def test_cached_list_keeps_bookmarks_per_user(client, response_cache, auth_headers, other_auth_headers):
+    anonymous = client.get('/api/organizations?per_page=12')
+    member = client.get('/api/organizations?per_page=12', headers=auth_headers)
+    other = client.get('/api/organizations?per_page=12', headers=other_auth_headers)
+    assert sum(_bookmarked(anonymous)) == 0
+    assert sum(_bookmarked(member)) == 6
+    assert sum(_bookmarked(other)) == 0
+    assert all(org['bookmark_id'] is None for org in other.get_json()['organizations'])
+    # Anonymous responses are still served from the cache
+    assert client.get('/api/organizations?per_page=12').get_data() == anonymous.get_data()
+    assert response_cache.stats()['hits'] == 1
+
+
+def test_cached_search_keeps_bookmarks_per_user(client, response_cache, auth_headers, other_auth_headers):
+    member = client.get('/api/search/organizations?q=food&per_page=12', headers=auth_headers)
+    other = client.get('/api/search/organizations?q=food&per_page=12', headers=other_auth_headers)
+    assert sum(org['is_bookmarked'] for org in member.get_json()['results']) == 6
+    assert not any(org['is_bookmarked'] for org in other.get_json()['results'])